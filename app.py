@@ -4,8 +4,10 @@
 Page d’accueil principale (Synthèse, Profil IA, Navigation)
 """
 
+import os
 import streamlit as st
-from lib import get_profile_params, load_profile, save_profile
+import scheduler
+from lib import get_profile_params, load_profile, save_profile, sentiment_ready, ensure_vader_lexicon
 
 # ---------------------------------------------------------
 # 🧠 CONFIGURATION GÉNÉRALE
@@ -36,6 +38,36 @@ if profil != profil_actuel:
 
 params = get_profile_params(profil)
 
+# Lexique VADER : jamais téléchargé implicitement, installation sur demande
+if not sentiment_ready():
+    st.sidebar.warning("Lexique VADER absent : le sentiment des actualités se limite aux mots-clés.")
+    if st.sidebar.button("⬇️ Installer le lexique VADER"):
+        if ensure_vader_lexicon():
+            st.sidebar.success("Lexique installé.")
+        else:
+            st.sidebar.error("Téléchargement impossible (connexion ?).")
+
+# ---------------------------------------------------------
+# ⏰ PLANIFICATEUR DE PRÉCHARGEMENT
+# ---------------------------------------------------------
+if os.environ.get("DASH_SCHEDULER", "") not in ("", "0"):
+    scheduler.start_in_background()
+
+with st.sidebar.expander("⏰ Préchargement"):
+    sched = scheduler.status()
+    if not sched:
+        st.caption("Aucun passage enregistré (`python scheduler.py` ou DASH_SCHEDULER=1).")
+    else:
+        st.caption(f"Mode : {sched.get('mode', '—')} · dernier signe de vie : {sched.get('heartbeat') or '—'}")
+        for g, rec in sched.get("groups", {}).items():
+            etat = "⏳ en cours" if rec.get("running") else ("✅" if rec.get("ok") else "❌")
+            st.markdown(f"**{g}** {etat} — {rec.get('finished_at') or '—'} "
+                        f"({rec.get('total_s', 0):.0f} s) · prochain : {sched.get('next_run', {}).get(g, '—')}")
+            if rec.get("durations"):
+                st.caption(" · ".join(f"{k} {v:.1f} s" for k, v in rec["durations"].items()))
+            if rec.get("error"):
+                st.caption(f"Erreur : {rec['error']}")
+
 # ---------------------------------------------------------
 # 🏠 PAGE D’ACCUEIL / SYNTHÈSE
 # ---------------------------------------------------------
@@ -89,6 +121,12 @@ st.markdown("""
 - 🔍 **Recherche universelle**  
   Analyse complète d’une action : indicateurs techniques, **Synthèse IA**, actualités datées, ajout direct au portefeuille.
 
+- 🧮 **Screener**  
+  Filtre et classement libres sur tous les marchés à la fois (ex. `pct_30d > 5% and Volatilité < vol_max`, classé par `trend_score`).
+
+- 📡 **Mode live**  
+  Cours en séance du portefeuille et de la watchlist LS, rafraîchis par lots ; seules les valeurs qui bougent sont recalculées.
+
 - 📈 **(Bientôt)** Détail par Indice  
   Vue IA dédiée pour CAC40, DAX, NASDAQ et S&P500 (TOP5 IA + leaders sectoriels).
 """)
@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+"""
+Backtest du signal IA (decision_labels) et des niveaux Entrée / Objectif / Stop de chaque profil,
+sur l’historique journalier des membres actuels d’un indice.
+
+    python backtest.py --index "S&P 500" --years 5            # tous les profils, tous les cœurs
+    python backtest.py --index "CAC 40" --profile Prudent --trades trades.csv
+"""
+import sys, argparse, time
+import lib
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--index", default="CAC 40", choices=["CAC 40", "DAX", "NASDAQ 100", "S&P 500", "LS Exchange"])
+    ap.add_argument("--years", type=float, default=5)
+    ap.add_argument("--profile", action="append", choices=sorted(lib.PROFILE_PARAMS), help="répétable ; tous par défaut")
+    ap.add_argument("--max-hold", type=int, default=lib.BACKTEST_MAX_HOLD, help="séances avant sortie forcée")
+    ap.add_argument("--entry-days", type=int, default=lib.BACKTEST_ENTRY_DAYS, help="validité de l’ordre d’achat")
+    ap.add_argument("--workers", type=int, default=None, help="processus (défaut : nombre de cœurs)")
+    ap.add_argument("--trades", help="export CSV des transactions")
+    a = ap.parse_args(argv)
+
+    t0 = time.perf_counter()
+    res = lib.backtest_index(a.index, years=a.years, profiles=a.profile, max_hold=a.max_hold,
+                             entry_days=a.entry_days, workers=a.workers)
+    if not len(res["trades"]) and res["summary"].empty:
+        print("Aucune donnée (membres ou historique indisponibles).")
+        return 1
+    out = res["summary"].copy()
+    pct = ["hit_rate", "target_rate", "stop_rate", "avg_return", "median_return", "total_return", "max_drawdown", "exposure"]
+    out[pct] = (out[pct] * 100).round(2)
+    print(f"{a.index} — {a.years:g} an(s), sortie forcée après {a.max_hold} séances "
+          f"({time.perf_counter() - t0:.1f} s)\n")
+    print(out.round(2).to_string())
+    if a.trades:
+        res["trades"].to_csv(a.trades, index=False)
+        print(f"\n→ {a.trades}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,2 @@
+# -*- coding: utf-8 -*-
+"""Banc de performance hors ligne (générateur de marché synthétique + scénarios chronométrés)."""
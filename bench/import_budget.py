@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""
+Budget d’import : chaque module est importé dans un interpréteur neuf, dossier courant vide,
+réseau coupé. Échec (code 1) si le temps médian dépasse le budget, si un module lourd
+(pandas, yfinance, nltk…) est chargé, si un fichier est créé ou si une connexion est tentée.
+
+    python -m bench.import_budget
+    python -m bench.import_budget --budget-ms 30 --modules lib,http_client
+"""
+import os, sys, json, argparse, statistics, subprocess, tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_MODULES = ("lib", "http_client", "diagnostics", "scheduler", "backtest", "optimize")
+HEAVY = ("pandas", "numpy", "yfinance", "nltk", "requests", "urllib3", "pyarrow", "sqlite3", "streamlit")
+DEFAULT_BUDGET_MS = 50.0
+
+_PROBE = r"""
+import sys, os, json, time, socket
+sys.path.insert(0, {root!r})
+calls = []
+def _deny(*a, **k):
+    calls.append(repr(a[:2])); raise OSError("réseau interdit pendant l’import")
+socket.socket.connect = _deny
+socket.create_connection = _deny
+before = set(sys.modules)
+t0 = time.perf_counter()
+import {module}
+dt = (time.perf_counter() - t0) * 1000
+print(json.dumps({{"ms": dt, "heavy": sorted(m for m in {heavy!r} if m in sys.modules and m not in before),
+                  "files": sorted(os.listdir(".")), "network": calls}}))
+"""
+
+
+def probe(module, runs=5):
+    """Importe `module` `runs` fois (un processus par essai) → dict de mesures."""
+    times, last = [], None
+    for _ in range(runs):
+        with tempfile.TemporaryDirectory(prefix="dash-import-") as work:
+            code = _PROBE.format(root=ROOT, module=module, heavy=HEAVY)
+            r = subprocess.run([sys.executable, "-c", code], cwd=work, capture_output=True, text=True, timeout=120)
+            if r.returncode != 0:
+                return {"module": module, "error": r.stderr.strip().splitlines()[-1:] or ["?"]}
+            last = json.loads(r.stdout.strip().splitlines()[-1])
+            times.append(last["ms"])
+    return {"module": module, "ms_median": statistics.median(times), "ms_max": max(times),
+            "heavy": last["heavy"], "files": last["files"], "network": last["network"]}
+
+
+def check(modules=DEFAULT_MODULES, budget_ms=DEFAULT_BUDGET_MS, runs=5, log=print):
+    ok = True
+    for m in modules:
+        r = probe(m, runs)
+        problems = []
+        if "error" in r:
+            problems.append(f"import en erreur : {r['error'][0]}")
+        else:
+            if r["ms_median"] > budget_ms: problems.append(f"{r['ms_median']:.1f} ms > {budget_ms:.0f} ms")
+            if r["heavy"]: problems.append("modules lourds : " + ", ".join(r["heavy"]))
+            if r["files"]: problems.append("fichiers créés : " + ", ".join(r["files"]))
+            if r["network"]: problems.append("connexion tentée")
+        ok = ok and not problems
+        ms = f"{r['ms_median']:7.1f} ms" if "ms_median" in r else "      —   "
+        log(f"{m:<16} {ms}  " + ("OK" if not problems else "ÉCHEC — " + " ; ".join(problems)))
+    return ok
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--modules", default=",".join(DEFAULT_MODULES))
+    ap.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    ap.add_argument("--runs", type=int, default=5)
+    a = ap.parse_args(argv)
+    ok = check([m for m in a.modules.split(",") if m], a.budget_ms, a.runs)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
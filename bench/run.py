@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+"""
+Banc de performance hors ligne des chemins chauds de lib.py.
+
+    python -m bench.run                              # 40, 500, 2 000, 10 000 tickers
+    python -m bench.run --sizes 40,500 --repeat 5
+    python -m bench.run --compare bench/results/precedent.json
+
+Chaque scénario est chronométré (`repeat` exécutions, médiane et minimum) puis rejoué
+une fois sous tracemalloc pour le pic mémoire. Résultats écrits en JSON.
+"""
+import os, sys, json, time, argparse, platform, statistics, subprocess, tempfile, tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+DEFAULT_SIZES = (40, 500, 2000, 10000)
+
+
+def _git_rev():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True, timeout=5).stdout.strip()
+    except Exception:
+        return ""
+
+
+def _measure(fn, setup, repeat):
+    times = []
+    for _ in range(repeat):
+        args = setup()
+        t0 = time.perf_counter()
+        fn(*args)
+        times.append(time.perf_counter() - t0)
+    args = setup()
+    tracemalloc.start()
+    fn(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"seconds_median": statistics.median(times), "seconds_min": min(times),
+            "repeats": repeat, "peak_mem_mb": round(peak / 2**20, 3)}
+
+
+def scenarios(lib, synthetic, n_tickers, n_days, seed):
+    """(nom, fonction, préparation) — la préparation n’est pas chronométrée."""
+    import shutil
+    import numpy as np
+    memberships = synthetic.synthetic_tickers(n_tickers)
+    market = synthetic.synthetic_market(n_tickers, n_days, seed=seed)
+    metrics = lib.compute_metrics(market)
+    factors = lib.factor_table(metrics)
+    holdings = metrics[["Ticker"]].assign(Type=np.where(np.arange(len(metrics)) % 2, "CTO", "PEA"), Qty=10.0)
+    last = market.groupby("Ticker").tail(1)[["Ticker", "Date", "Close"]]
+    markets = [(idx, None) for idx in synthetic.INDICES]
+    rng = np.random.default_rng(seed)
+    news_pairs = [(f"Société {t}", t) for t in rng.choice(metrics["Ticker"], size=min(20, len(metrics)), replace=False)]
+
+    def reset_caches(drop_store):
+        lib.clear_caches()
+        lib._MEMBERS_MEM.clear()
+        shutil.rmtree(lib.MEMBERS_DIR, ignore_errors=True)
+        if drop_store:
+            shutil.rmtree(lib.PRICE_STORE_DIR, ignore_errors=True)
+            lib._STREAM = None
+            try: os.remove(lib.INDICATOR_STATE_PATH)
+            except OSError: pass
+
+    def cold():
+        reset_caches(True)
+        return (markets, n_days)
+
+    def warm():
+        reset_caches(False)
+        return (markets, n_days)
+
+    def stream_setup():
+        st = lib.IndicatorStream()
+        st.sync(market[market["Date"] < market["Date"].max()].sort_values(["Ticker", "Date"]))
+        return (market, st)
+
+    def search_setup():
+        for idx in synthetic.INDICES:
+            lib.refresh_members(idx)
+        lib.search_index()
+        return ("societe u0001",)
+
+    def news_setup():
+        lib.clear_caches()
+        lib._HEADLINE_MEM.clear(); lib._HEADLINE_UNSCORED.clear()
+        return (news_pairs,)
+
+    return memberships, market, [
+        ("compute_metrics", lib.compute_metrics, lambda: (market,)),
+        ("compute_metrics_stream", lambda m, st: lib.compute_metrics(m, stream=st), stream_setup),
+        ("calendar_returns", lib._calendar_returns, lambda: (last.copy(), market)),
+        ("select_top_actions", lambda m: lib.select_top_actions(m, "Neutre", 10), lambda: (metrics,)),
+        ("screen", lambda t: lib.screen("pct_30d > 5% and Volatilité < vol_max", rank_by="trend_score",
+                                        k=20, table=t), lambda: (factors,)),
+        ("portfolio_nav", lib.portfolio_nav, lambda: (holdings, market)),
+        ("backtest", lambda m: lib.backtest(m, workers=1), lambda: (market,)),
+        ("optimize_profiles", lambda m: lib.optimize_profiles(m, n=4, workers=1), lambda: (market,)),
+        ("fetch_all_markets_cold", lambda m, d: lib.fetch_all_markets(m, days_hist=d), cold),
+        ("fetch_all_markets_warm", lambda m, d: lib.fetch_all_markets(m, days_hist=d), warm),
+        ("search_instruments", lambda q: lib.search_instruments(q, limit=10), search_setup),
+        ("news_summary_batch", lambda p: lib.news_summary_batch(p, deadline=60), news_setup),
+    ]
+
+
+def run(sizes, n_days=120, repeat=3, seed=42, only=None, log=print):
+    import shutil
+    here, work = os.getcwd(), tempfile.mkdtemp(prefix="dash-bench-")
+    os.chdir(work)                       # data/ (stock Parquet, snapshots…) isolé dans un dossier jetable
+    import lib
+    from bench import synthetic
+    results = []
+    try:
+        for n in sizes:
+            memberships, market, scen = scenarios(lib, synthetic, n, n_days, seed)
+            restore = synthetic.install_stubs(lib, market, memberships)
+            try:
+                for name, fn, setup in scen:
+                    if only and name not in only:
+                        continue
+                    r = _measure(fn, setup, repeat)
+                    r.update({"scenario": name, "n_tickers": n, "n_days": n_days, "rows": int(len(market))})
+                    results.append(r)
+                    log(f"{name:<24} {n:>6} tickers  {r['seconds_median']*1000:10.1f} ms  {r['peak_mem_mb']:9.1f} Mo")
+            finally:
+                restore()
+    finally:
+        os.chdir(here)
+        shutil.rmtree(work, ignore_errors=True)
+    import numpy, pandas
+    return {
+        "meta": {"timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "git_rev": _git_rev(),
+                 "python": platform.python_version(), "platform": platform.platform(),
+                 "numpy": numpy.__version__, "pandas": pandas.__version__,
+                 "n_days": n_days, "repeat": repeat, "seed": seed},
+        "results": results,
+    }
+
+
+def compare(current, baseline_path, log=print):
+    base = json.load(open(baseline_path, "r", encoding="utf-8"))
+    ref = {(r["scenario"], r["n_tickers"]): r for r in base.get("results", [])}
+    for r in current["results"]:
+        b = ref.get((r["scenario"], r["n_tickers"]))
+        if not b or not b["seconds_median"]:
+            continue
+        ratio = r["seconds_median"] / b["seconds_median"]
+        log(f"{r['scenario']:<24} {r['n_tickers']:>6}  ×{ratio:5.2f}  ({b['seconds_median']*1000:.1f} → {r['seconds_median']*1000:.1f} ms)")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)))
+    ap.add_argument("--days", type=int, default=120)
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--only", default="", help="scénarios séparés par des virgules")
+    ap.add_argument("--out", default="")
+    ap.add_argument("--compare", default="", help="JSON d’une exécution précédente")
+    a = ap.parse_args(argv)
+
+    out = a.out or os.path.join(ROOT, "bench", "results", f"bench-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    out = os.path.abspath(out)
+    baseline = os.path.abspath(a.compare) if a.compare else ""
+    res = run([int(x) for x in a.sizes.split(",") if x], a.days, a.repeat, a.seed,
+              only={x for x in a.only.split(",") if x})
+    os.makedirs(os.path.dirname(out), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(res, f, ensure_ascii=False, indent=2)
+    print(f"→ {out}")
+    if baseline:
+        compare(res, baseline)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+Marché synthétique déterministe + sources bouchonnées (yfinance, Wikipedia, Google News)
+pour exécuter lib.py hors ligne.
+"""
+import numpy as np, pandas as pd
+
+INDICES = ("CAC 40", "DAX", "NASDAQ 100", "S&P 500")
+_SUFFIX = {"CAC 40": ".PA", "DAX": ".DE", "NASDAQ 100": "", "S&P 500": ""}
+
+
+def synthetic_tickers(n_tickers):
+    """Répartit n tickers sur les 4 indices (NASDAQ 100 ⊂ S&P 500 pour ~20 % des US, comme en vrai)."""
+    n_eu = max(2, n_tickers // 5)
+    n_us = n_tickers - n_eu
+    cac = [f"C{i:05d}.PA" for i in range(n_eu // 2)]
+    dax = [f"D{i:05d}.DE" for i in range(n_eu - n_eu // 2)]
+    us = [f"U{i:05d}" for i in range(n_us)]
+    ndx = us[: max(1, n_us // 5)]
+    return {"CAC 40": cac, "DAX": dax, "NASDAQ 100": ndx, "S&P 500": us}
+
+
+def synthetic_market(n_tickers=500, n_days=120, seed=42, end=None,
+                     gap_prob=0.01, nan_prob=0.002, split_prob=0.02, tickers=None):
+    """
+    Frame long OHLCV (Date, Open, High, Low, Close, Volume, Ticker) :
+    marche aléatoire log-normale, séances manquantes (gap_prob), valeurs NaN (nan_prob)
+    et splits non ajustés (split_prob par ticker, ratio 2 ou 3).
+    """
+    rng = np.random.default_rng(seed)
+    if tickers is None:
+        tickers = [t for lst in synthetic_tickers(n_tickers).values() for t in lst]
+        tickers = list(dict.fromkeys(tickers))
+    n = len(tickers)
+    end = pd.Timestamp(end or pd.Timestamp.today()).normalize()
+    dates = pd.bdate_range(end=end, periods=n_days)
+
+    rets = rng.normal(0.0003, 0.018, size=(n_days, n))
+    close = 20 + 180 * rng.random(n) * np.exp(np.cumsum(rets, axis=0))
+    for j in np.flatnonzero(rng.random(n) < split_prob):
+        k = rng.integers(1, n_days)
+        close[k:, j] /= rng.choice([2.0, 3.0])
+    spread = np.abs(rng.normal(0, 0.01, size=(n_days, n)))
+    high = close * (1 + spread)
+    low = close * (1 - spread)
+    open_ = np.clip(close * (1 + rng.normal(0, 0.005, size=(n_days, n))), low, high)
+    vol = rng.integers(1_000, 1_000_000, size=(n_days, n)).astype(float)
+
+    df = pd.DataFrame({
+        "Date": np.repeat(dates.values, n),
+        "Open": open_.ravel(), "High": high.ravel(), "Low": low.ravel(),
+        "Close": close.ravel(), "Volume": vol.ravel(),
+        "Ticker": np.tile(np.array(tickers, dtype=object), n_days),
+    })
+    keep = rng.random(len(df)) >= gap_prob
+    df = df[keep]
+    nan_rows = rng.random(len(df)) < nan_prob
+    df.loc[df.index[nan_rows], "Close"] = np.nan
+    return df.sort_values(["Ticker", "Date"]).reset_index(drop=True)
+
+
+def members_frame(index_name, tickers):
+    return pd.DataFrame({"ticker": tickers, "name": [f"Société {t}" for t in tickers], "index": index_name})
+
+
+def _rss(query, n=8):
+    items = "".join(
+        f"<item><title>{query} relève sa guidance #{i}</title><link>https://example.invalid/{i}</link>"
+        f"<pubDate>Fri, 16 Oct 2026 08:0{i % 10}:00 GMT</pubDate></item>" for i in range(n))
+    return f"<?xml version='1.0'?><rss><channel>{items}</channel></rss>"
+
+
+def install_stubs(lib, market, memberships=None):
+    """
+    Branche lib.py sur le marché synthétique :
+    yf.Ticker(...).history → tranches de `market`, scrapers Wikipedia → `memberships`,
+    http_client.get → flux RSS factices. Renvoie une fonction qui restaure l’état initial.
+    """
+    import http_client
+    by_ticker = {t: g.set_index("Date")[["Open", "High", "Low", "Close", "Volume"]]
+                 for t, g in market.groupby("Ticker", sort=False)}
+
+    class _Ticker:
+        def __init__(self, t):
+            self.t = t
+
+        def history(self, start=None, period=None, **kw):
+            df = by_ticker.get(self.t)
+            if df is None:
+                return pd.DataFrame()
+            if start is not None:
+                df = df[df.index >= pd.Timestamp(start)]
+            return df.copy()
+
+    saved = {"Ticker": lib.yf.Ticker, "get": http_client.get, "scrapers": dict(lib._MEMBER_SCRAPERS)}
+    lib.yf.Ticker = _Ticker
+    if memberships:
+        for idx, tks in memberships.items():
+            lib._MEMBER_SCRAPERS[idx] = (lambda i=idx, t=tks: members_frame(i, t))
+    http_client.get = lambda url, **kw: http_client.Response(url, 200, _rss(url[-20:]).encode())
+
+    def restore():
+        lib.yf.Ticker = saved["Ticker"]
+        http_client.get = saved["get"]
+        lib._MEMBER_SCRAPERS.clear()
+        lib._MEMBER_SCRAPERS.update(saved["scrapers"])
+    return restore
@@ -0,0 +1,239 @@
+# -*- coding: utf-8 -*-
+"""
+Instrumentation légère de lib.py et des pages :
+- temps (total / max), appels, erreurs par fonction publique de lib.py
+- hits / misses des caches, octets HTTP et lignes Yahoo attribués à la fonction en cours
+- chronométrage des sections de page + panneau « ⏱ Diagnostics » et journal JSON
+Compteurs cumulés pour le processus (snapshot) ; chaque rendu de page ouvre en plus sa propre
+portée (contextvars), si bien que deux sessions simultanées ne se remettent pas à zéro l’une l’autre.
+Désactivé : un test booléen par appel. Activation : case de la barre latérale ou DASH_DIAGNOSTICS=1.
+"""
+import os, json, time, threading, contextvars
+from functools import wraps
+
+LOG_PATH = os.path.join("data", "diagnostics.jsonl")
+LOG_MAX_BYTES = 2_000_000     # au-delà, le journal est tronqué à sa seconde moitié
+
+ON = os.environ.get("DASH_DIAGNOSTICS", "") not in ("", "0")
+
+_stats = {}
+_lock = threading.Lock()
+_local = threading.local()
+_scope = contextvars.ContextVar("diagnostics_scope", default=None)   # {"functions": {}, "http": {}} du rendu en cours
+
+
+def enable(flag=True):
+    global ON
+    ON = bool(flag)
+
+def _row(name, table=None):
+    table = _stats if table is None else table
+    st = table.get(name)
+    if st is None:
+        st = table[name] = {"calls": 0, "errors": 0, "total_s": 0.0, "max_s": 0.0,
+                            "cache_hits": 0, "cache_misses": 0, "bytes": 0, "rows": 0}
+    return st
+
+def _tables():
+    sc = _scope.get()
+    return (_stats,) if sc is None else (_stats, sc["functions"])
+
+def _stack():
+    s = getattr(_local, "stack", None)
+    if s is None:
+        s = _local.stack = []
+    return s
+
+
+# ---------------- Collecte ----------------
+def instrument(fn, name=None):
+    """Enveloppe chronométrée ; conserve les attributs de fn (cache_clear…)."""
+    name = name or fn.__name__
+
+    @wraps(fn)
+    def wrapper(*args, **kw):
+        if not ON:
+            return fn(*args, **kw)
+        stack = _stack()
+        stack.append(name)
+        t0 = time.perf_counter()
+        err = 0
+        try:
+            return fn(*args, **kw)
+        except BaseException:
+            err = 1
+            raise
+        finally:
+            dt = time.perf_counter() - t0
+            stack.pop()
+            with _lock:
+                for t in _tables():
+                    st = _row(name, t)
+                    st["calls"] += 1; st["errors"] += err
+                    st["total_s"] += dt; st["max_s"] = max(st["max_s"], dt)
+    wrapper.__wrapped_diag__ = True
+    return wrapper
+
+def instrument_module(ns, private=()):
+    """Instrumente les fonctions publiques définies dans le module `ns` (globals()) + `private`."""
+    mod = ns.get("__name__")
+    for k, v in list(ns.items()):
+        if not callable(v) or isinstance(v, type) or getattr(v, "__wrapped_diag__", False):
+            continue
+        if getattr(v, "__module__", None) != mod:
+            continue
+        if k.startswith("_") and k not in private:
+            continue
+        ns[k] = instrument(v, k)
+
+def current():
+    """Fonction instrumentée en cours dans ce thread (ou None)."""
+    s = getattr(_local, "stack", None)
+    return s[-1] if s else None
+
+def count(key=None, **inc):
+    """Incrémente des compteurs (cache_hits, bytes, rows…) de `key` ou de la fonction en cours."""
+    if not ON:
+        return
+    key = key or current() or "(hors fonction)"
+    with _lock:
+        for t in _tables():
+            st = _row(key, t)
+            for k, v in inc.items():
+                st[k] = st.get(k, 0) + v
+
+def cache_event(name, hit):
+    if ON:
+        count(name, **({"cache_hits": 1} if hit else {"cache_misses": 1}))
+
+
+def scope():
+    """Portée du rendu de page en cours (ou None) ; http_client y ajoute ses compteurs par hôte."""
+    return _scope.get()
+
+def carry(fn):
+    """fn destinée à un pool de threads : ses compteurs restent attribués à la page qui l’a lancée."""
+    sc = _scope.get()
+    if sc is None:
+        return fn
+
+    @wraps(fn)
+    def run(*args, **kw):
+        tok = _scope.set(sc)
+        try:
+            return fn(*args, **kw)
+        finally:
+            _scope.reset(tok)
+    return run
+
+
+# ---------------- Lecture ----------------
+def snapshot():
+    with _lock:
+        return {k: dict(v) for k, v in _stats.items()}
+
+def reset():
+    """Remet à zéro les compteurs cumulés du processus (les portées de page ne sont pas touchées)."""
+    with _lock:
+        _stats.clear()
+    try:
+        import http_client
+        http_client.reset_stats()
+    except Exception:
+        pass
+
+def frame(stats=None):
+    """DataFrame trié par temps total (temps inclusif : une fonction compte aussi ses appels internes)."""
+    import pandas as pd
+    stats = snapshot() if stats is None else stats
+    if not stats:
+        return pd.DataFrame()
+    df = pd.DataFrame.from_dict(stats, orient="index")
+    df.index.name = "fonction"
+    df["mean_ms"] = (df["total_s"] / df["calls"].where(df["calls"] > 0)) * 1000
+    return df.sort_values("total_s", ascending=False).reset_index()
+
+def dump(record, path=LOG_PATH):
+    """Ajoute un enregistrement au journal JSON (une ligne par rendu de page)."""
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        if os.path.exists(path) and os.path.getsize(path) > LOG_MAX_BYTES:
+            with open(path, "r", encoding="utf-8") as f:
+                lines = f.readlines()
+            with open(path, "w", encoding="utf-8") as f:
+                f.writelines(lines[len(lines) // 2:])
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+    except Exception:
+        pass
+
+
+# ---------------- Pages Streamlit ----------------
+class PageTimer:
+    """
+    Chronomètre de rendu : mark("Section") attribue le temps écoulé depuis la marque précédente.
+    Ouvre la portée des compteurs du rendu ; finish() affiche le panneau dans la barre latérale,
+    écrit le journal et referme la portée.
+    """
+
+    def __init__(self, page, st):
+        self.page, self.st = page, st
+        self.sections = []
+        self.scope = {"functions": {}, "http": {}}
+        self._tok = _scope.set(self.scope) if ON else None
+        self.t0 = self.last = time.perf_counter()
+
+    def mark(self, section):
+        if not ON:
+            return
+        now = time.perf_counter()
+        self.sections.append((section, now - self.last))
+        self.last = now
+
+    def finish(self):
+        if not ON:
+            return
+        total = time.perf_counter() - self.t0
+        with _lock:
+            stats = {k: dict(v) for k, v in self.scope["functions"].items()}
+            hosts = {k: dict(v) for k, v in self.scope["http"].items()}
+        if self._tok is not None:
+            try:
+                _scope.reset(self._tok)
+            except ValueError:      # finish() appelé depuis un autre contexte
+                pass
+            self._tok = None
+        dump({"ts": time.strftime("%Y-%m-%dT%H:%M:%S"), "page": self.page, "total_s": round(total, 4),
+              "sections": {k: round(v, 4) for k, v in self.sections}, "functions": stats, "http": hosts})
+        self._render(total, stats, hosts)
+
+    def _render(self, total, stats, hosts):
+        import pandas as pd
+        sb = self.st.sidebar
+        with sb.expander(f"⏱ Diagnostics — {total*1000:.0f} ms", expanded=True):
+            if self.sections:
+                sec = pd.DataFrame(self.sections, columns=["Section", "s"])
+                sec["ms"] = (sec["s"] * 1000).round(1)
+                self.st.dataframe(sec[["Section", "ms"]], hide_index=True, use_container_width=True)
+            df = frame(stats)
+            if not df.empty:
+                df = df[df["calls"] > 0].copy()
+                df["total ms"] = (df["total_s"] * 1000).round(1)
+                df["moy ms"] = df["mean_ms"].round(2)
+                df["cache"] = df["cache_hits"].astype(int).astype(str) + "/" + \
+                              (df["cache_hits"] + df["cache_misses"]).astype(int).astype(str)
+                df["Ko"] = (df["bytes"] / 1024).round(1)
+                self.st.dataframe(df[["fonction", "calls", "total ms", "moy ms", "cache", "Ko", "rows", "errors"]],
+                                  hide_index=True, use_container_width=True)
+            if hosts:
+                h = pd.DataFrame.from_dict(hosts, orient="index")
+                h["Ko"] = (h["bytes"] / 1024).round(1)
+                self.st.dataframe(h[["requests", "network", "cache_hits", "Ko", "errors"]],
+                                  use_container_width=True)
+            self.st.caption(f"Journal : {LOG_PATH}")
+
+
+def page(name, st):
+    """Case « ⏱ Diagnostics » dans la barre latérale ; compteurs propres à ce rendu (PageTimer)."""
+    enable(st.sidebar.checkbox("⏱ Diagnostics", value=ON, key="diag_on"))
+    return PageTimer(name, st)
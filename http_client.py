@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+"""
+Client HTTP partagé par lib.py et les pages :
+- une Session requests unique (keep-alive, pool de connexions par hôte, gzip)
+- relances bornées avec backoff exponentiel (429 / 5xx / erreurs réseau)
+- revalidation ETag / If-Modified-Since adossée à un cache disque (data/http_cache),
+  sur demande seulement (max_age / revalidate) : un fichier par URL, méta + corps
+- compteurs par hôte : requêtes, hits cache, octets, latence (cumulés, et par rendu de page via diagnostics)
+requests / urllib3 ne sont importés qu’à la première requête.
+"""
+import os, json, time, hashlib, threading
+from urllib.parse import urlsplit, urlencode
+
+import diagnostics
+
+CACHE_DIR = os.path.join("data", "http_cache")
+UA = {"User-Agent": "Mozilla/5.0", "Accept-Encoding": "gzip, deflate"}
+POOL_SIZE = 16
+RETRIES = 3
+BACKOFF = 0.5
+
+_session = None
+_session_lock = threading.Lock()
+_stats = {}
+_stats_lock = threading.Lock()
+
+
+class Response:
+    """Réponse minimale (réseau ou cache) : status_code, content, text, json(), raise_for_status()."""
+
+    def __init__(self, url, status_code, content, encoding="utf-8", headers=None, from_cache=False):
+        self.url = url
+        self.status_code = status_code
+        self.content = content or b""
+        self.encoding = encoding or "utf-8"
+        self.headers = headers or {}
+        self.from_cache = from_cache
+
+    @property
+    def text(self):
+        return self.content.decode(self.encoding, errors="replace")
+
+    def json(self):
+        return json.loads(self.text)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            import requests
+            raise requests.HTTPError(f"{self.status_code} pour {self.url}")
+
+
+def session():
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+                from urllib3.util.retry import Retry
+                s = requests.Session()
+                retry = Retry(total=RETRIES, backoff_factor=BACKOFF,
+                              status_forcelist=(429, 500, 502, 503, 504),
+                              allowed_methods=frozenset({"GET", "HEAD"}))
+                adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE, max_retries=retry)
+                s.mount("https://", adapter)
+                s.mount("http://", adapter)
+                s.headers.update(UA)
+                _session = s
+    return _session
+
+
+# ---------------- Cache disque ----------------
+# Fichier unique par URL : une ligne JSON (méta) puis le corps brut ; un seul os.replace,
+# un lecteur ne voit donc jamais une méta (ETag) d’une version et le corps d’une autre.
+def _cache_path(url):
+    h = hashlib.sha1(url.encode("utf-8")).hexdigest()
+    return os.path.join(CACHE_DIR, f"{h}.cache")
+
+def _cache_load(url):
+    try:
+        with open(_cache_path(url), "rb") as f:
+            meta = json.loads(f.readline())
+            meta["content"] = f.read()
+        return meta
+    except Exception:
+        return None
+
+def _cache_save(url, meta):
+    path = _cache_path(url)
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(json.dumps({k: v for k, v in meta.items() if k != "content"}).encode("utf-8") + b"\n")
+            f.write(meta["content"])
+        os.replace(tmp, path)
+    except Exception:
+        pass
+
+
+# ---------------- Compteurs ----------------
+def _count(host, **inc):
+    sc = diagnostics.scope()
+    with _stats_lock:
+        for table in (_stats,) if sc is None else (_stats, sc["http"]):
+            st = table.setdefault(host, {"requests": 0, "network": 0, "cache_hits": 0, "not_modified": 0,
+                                         "errors": 0, "bytes": 0, "latency_s": 0.0, "latency_max_s": 0.0})
+            for k, v in inc.items():
+                if k == "latency_max_s":
+                    st[k] = max(st[k], v)
+                else:
+                    st[k] += v
+
+def stats():
+    """Compteurs par hôte (copie). latence moyenne = latency_s / network."""
+    with _stats_lock:
+        return {h: dict(v) for h, v in _stats.items()}
+
+def reset_stats():
+    with _stats_lock:
+        _stats.clear()
+
+
+# ---------------- GET ----------------
+def get(url, params=None, timeout=12, headers=None, max_age=0, revalidate=False):
+    """
+    GET partagé. Sans max_age ni revalidate, rien n’est lu ni écrit sur disque.
+    max_age (s) : réponse disque servie sans réseau si plus récente.
+    revalidate : requête conditionnelle (ETag / Last-Modified) ; 304 → corps du cache.
+    Dans ces deux cas, la dernière copie en cache est servie en cas d’erreur réseau.
+    """
+    if params:
+        url = f"{url}{'&' if '?' in url else '?'}{urlencode(params)}"
+    host = urlsplit(url).netloc
+    _count(host, requests=1)
+    cached = _cache_load(url) if (revalidate or max_age) else None
+    if cached and max_age and time.time() - cached.get("fetched_at", 0) < max_age:
+        _count(host, cache_hits=1)
+        return Response(url, 200, cached["content"], cached.get("encoding"), from_cache=True)
+
+    cond = dict(headers or {})
+    if cached and revalidate:
+        if cached.get("etag"): cond["If-None-Match"] = cached["etag"]
+        if cached.get("last_modified"): cond["If-Modified-Since"] = cached["last_modified"]
+
+    t0 = time.perf_counter()
+    try:
+        r = session().get(url, headers=cond, timeout=timeout)
+    except Exception:
+        _count(host, errors=1)
+        if cached:
+            _count(host, cache_hits=1)
+            return Response(url, 200, cached["content"], cached.get("encoding"), from_cache=True)
+        raise
+    dt = time.perf_counter() - t0
+    wire = int(r.headers.get("Content-Length") or len(r.content))
+    _count(host, network=1, bytes=wire, latency_s=dt, latency_max_s=dt)
+    diagnostics.count(bytes=wire)
+
+    if r.status_code == 304 and cached:
+        _count(host, cache_hits=1, not_modified=1)
+        cached["fetched_at"] = time.time()
+        _cache_save(url, cached)
+        return Response(url, 200, cached["content"], cached.get("encoding"), from_cache=True)
+
+    enc = r.encoding or r.apparent_encoding or "utf-8"
+    if r.status_code == 200 and (revalidate or max_age):
+        _cache_save(url, {"url": url, "etag": r.headers.get("ETag"),
+                          "last_modified": r.headers.get("Last-Modified"),
+                          "encoding": enc, "fetched_at": time.time(), "content": r.content})
+    return Response(url, r.status_code, r.content, enc, dict(r.headers))
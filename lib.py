@@ -1,8 +1,38 @@
 # -*- coding: utf-8 -*-
-import os, json, math, requests, numpy as np, pandas as pd, yfinance as yf
-from functools import lru_cache
-import nltk
-from nltk.sentiment import SentimentIntensityAnalyzer
+from __future__ import annotations
+import os, re, json, math, time, atexit, hashlib, threading, unicodedata, importlib
+from urllib.parse import quote
+from functools import wraps
+from collections import OrderedDict
+from datetime import datetime, timedelta, time as dtime
+from zoneinfo import ZoneInfo
+import http_client
+import diagnostics
+
+# =========================
+# IMPORTS DIFFÉRÉS
+# =========================
+# L’import de lib ne fait ni E/S ni réseau : pandas, numpy, yfinance, nltk, sqlite3
+# ne sont chargés qu’au premier usage (une page qui n’affiche que des réglages reste instantanée).
+_IMPORT_LOCK = threading.RLock()
+
+class _LazyModule:
+    """Module importé au premier accès à l’un de ses attributs (puis attribut mémorisé)."""
+    def __init__(self, name):
+        self.__dict__["_name"]=name
+    def __getattr__(self, attr):
+        if attr.startswith("__") and attr.endswith("__"): raise AttributeError(attr)
+        with _IMPORT_LOCK:   # import unique même si le 1er accès vient de plusieurs threads
+            val=getattr(importlib.import_module(self._name), attr)
+        self.__dict__[attr]=val
+        return val
+    def __repr__(self):
+        return f"<module {self._name!r} (différé)>"
+
+np = _LazyModule("numpy")
+pd = _LazyModule("pandas")
+yf = _LazyModule("yfinance")
+sqlite3 = _LazyModule("sqlite3")
 
 # =========================
 # FICHIERS & PRESETS
@@ -12,36 +42,133 @@ MAPPING_PATH = os.path.join(DATA_DIR, "id_mapping.json")
 WL_PATH = os.path.join(DATA_DIR, "watchlist_ls.json")
 PROFILE_PATH = os.path.join(DATA_DIR, "profile.json")
 LAST_SEARCH_PATH = os.path.join(DATA_DIR, "last_search.json")
+DEFAULT_LAST_SEARCH = "TTE.PA"
 
-os.makedirs(DATA_DIR, exist_ok=True)
-_defaults = [
-    (MAPPING_PATH, {}),
-    (WL_PATH, []),
-    (PROFILE_PATH, {"profil": "Neutre"}),
-    (LAST_SEARCH_PATH, {"last": "TTE.PA"}),
-]
-for p, default in _defaults:
-    if not os.path.exists(p):
-        with open(p, "w", encoding="utf-8") as f:
-            json.dump(default, f)
-
-UA = {"User-Agent": "Mozilla/5.0"}
+# Fichiers absents → valeurs par défaut à la lecture ; le dossier n’est créé qu’à la 1re écriture.
+def _ensure_data_dir():
+    os.makedirs(DATA_DIR, exist_ok=True)
 
 # =========================
 # SENTIMENT (VADER)
 # =========================
-try:
-    nltk.data.find("sentiment/vader_lexicon.zip")
-except LookupError:
+_SIA = None
+_SIA_READY = False
+
+def _get_sia():
+    """VADER construit au premier titre à évaluer ; lexique absent → None (aucun téléchargement implicite)."""
+    global _SIA, _SIA_READY
+    if not _SIA_READY:
+        with _IMPORT_LOCK:
+            if not _SIA_READY:
+                try:
+                    from nltk.sentiment import SentimentIntensityAnalyzer
+                    _SIA = SentimentIntensityAnalyzer()
+                except Exception:
+                    _SIA = None
+                _SIA_READY = True
+    return _SIA
+
+def sentiment_ready():
+    return _get_sia() is not None
+
+def ensure_vader_lexicon():
+    """
+    Téléchargement explicite du lexique VADER (bouton de l’accueil ou
+    python -c "import lib; lib.ensure_vader_lexicon()"). Renvoie True si le lexique est disponible.
+    """
+    global _SIA_READY
+    import nltk
     try:
-        nltk.download("vader_lexicon")
-    except Exception:
-        pass
+        nltk.data.find("sentiment/vader_lexicon.zip")
+    except LookupError:
+        try:
+            nltk.download("vader_lexicon", quiet=True)
+        except Exception:
+            pass
+    with _IMPORT_LOCK:
+        _SIA_READY = False
+    return sentiment_ready()
+
+# =========================
+# CACHE TTL & SÉANCES DE MARCHÉ
+# =========================
+# suffixe Yahoo → (fuseau, ouverture, clôture)
+_SESSIONS = {
+    ".PA": ("Europe/Paris", (9, 0), (17, 30)),
+    ".DE": ("Europe/Berlin", (9, 0), (17, 30)),
+    ".F":  ("Europe/Berlin", (8, 0), (22, 0)),
+    ".L":  ("Europe/London", (8, 0), (16, 30)),
+}
+_INDEX_SESSIONS = {"^FCHI": ".PA", "^GDAXI": ".DE"}
+_US_SESSION = ("America/New_York", (9, 30), (16, 0))
+SESSION_SETTLE_MIN = 20      # délai de publication de la barre journalière après la clôture
+
+def _session_of(ticker):
+    t=_norm(ticker); t=_INDEX_SESSIONS.get(t, t)
+    for suf, sess in _SESSIONS.items():
+        if t.endswith(suf): return sess
+    return _US_SESSION
+
+def session_state(ticker, now=None):
+    """
+    (date locale de la dernière séance close, prochaine clôture [epoch], marché ouvert ?)
+    Jours ouvrés uniquement (fériés non gérés) ; clôture = heure officielle + SESSION_SETTLE_MIN.
+    """
+    tz, op, cl = _session_of(ticker)
+    z=ZoneInfo(tz)
+    now=datetime.now(z) if now is None else now.astimezone(z)
+    close_on=lambda d: datetime.combine(d, dtime(*cl), z)+timedelta(minutes=SESSION_SETTLE_MIN)
+    today=now.date()
+    last=today
+    while last.weekday()>=5 or close_on(last)>now: last-=timedelta(days=1)
+    nxt=today
+    while nxt.weekday()>=5 or close_on(nxt)<=now: nxt+=timedelta(days=1)
+    is_open=today.weekday()<5 and datetime.combine(today, dtime(*op), z)<=now<close_on(today)
+    return pd.Timestamp(last), close_on(nxt).timestamp(), is_open
 
-try:
-    SIA = SentimentIntensityAnalyzer()
-except Exception:
-    SIA = None
+_CACHES = []
+
+def _is_empty(v):
+    if v is None: return True
+    if isinstance(v, pd.DataFrame): return v.empty
+    if isinstance(v, (list, tuple, dict, str)): return len(v)==0
+    return False
+
+def ttl_cache(ttl=3600, maxsize=256, expires=None, empty_ttl=60):
+    """
+    Remplace lru_cache avec expiration : `ttl` secondes, ou `expires(*args, **kw)` → epoch
+    (ex. prochaine clôture de séance). Les résultats vides ne sont gardés que `empty_ttl` s.
+    """
+    def deco(fn):
+        data=OrderedDict(); lock=threading.Lock()
+        @wraps(fn)
+        def wrapper(*args, **kw):
+            key=(args, tuple(sorted(kw.items())))
+            now=time.time()
+            with lock:
+                hit=data.get(key)
+                if hit is not None and hit[0]>now:
+                    data.move_to_end(key)
+                    diagnostics.cache_event(fn.__name__, True)
+                    return hit[1]
+            diagnostics.cache_event(fn.__name__, False)
+            val=fn(*args, **kw)
+            exp=now+empty_ttl if _is_empty(val) else (expires(*args, **kw) if expires else now+ttl)
+            with lock:
+                data[key]=(exp, val); data.move_to_end(key)
+                while len(data)>maxsize: data.popitem(last=False)
+            return val
+        def cache_clear():
+            with lock: data.clear()
+        wrapper.cache_clear=cache_clear
+        _CACHES.append(wrapper)
+        return wrapper
+    return deco
+
+def clear_caches():
+    """Vide tous les caches TTL (bouton 🔄 Rafraîchir)."""
+    for c in _CACHES: c.cache_clear()
+    with _ID_LOCK: _ID_NEG.clear()
 
 # =========================
 # PROFILS IA
@@ -63,6 +190,7 @@ def load_profile():
 
 def save_profile(p):
     try:
+        _ensure_data_dir()
         json.dump({"profil": p}, open(PROFILE_PATH, "w", encoding="utf-8"), ensure_ascii=False, indent=2)
     except Exception:
         pass
@@ -71,10 +199,11 @@ def load_last_search():
     try:
         return json.load(open(LAST_SEARCH_PATH, "r", encoding="utf-8")).get("last", "")
     except Exception:
-        return ""
+        return DEFAULT_LAST_SEARCH
 
 def save_last_search(t):
     try:
+        _ensure_data_dir()
         json.dump({"last": t}, open(LAST_SEARCH_PATH, "w", encoding="utf-8"), ensure_ascii=False, indent=2)
     except Exception:
         pass
@@ -82,14 +211,106 @@ def save_last_search(t):
 # =========================
 # MAPPING / WATCHLIST
 # =========================
-def load_mapping():
+# Index identifiant → ticker Yahoo : id_mapping.json relu seulement quand il change sur disque,
+# écritures différées (regroupées après ID_FLUSH_DELAY s, et à la sortie), échecs mémorisés
+# ID_NEG_TTL s. Chaque processus (pages, planificateur) n’écrit que ses propres modifications,
+# fusionnées dans la version courante du fichier.
+ID_FLUSH_DELAY = 2.0
+ID_NEG_TTL = 6*3600           # identifiant invalide (Yahoo ne renvoie rien)
+ID_NEG_ERR_TTL = 300          # erreur réseau : nouvel essai plus tôt
+_ID_MAP = None
+_ID_MTIME = None              # mtime de id_mapping.json à la dernière lecture / écriture
+_ID_DIRTY = {}                # modifications locales pas encore écrites (None = suppression)
+_ID_NEG = {}                  # identifiant → expiration epoch
+_ID_LOCK = threading.RLock()
+_ID_FLUSH = None              # Timer d’écriture en attente
+
+def _id_mtime():
+    try:
+        return os.stat(MAPPING_PATH).st_mtime_ns
+    except OSError:
+        return None
+
+def _id_read():
     try:
-        return json.load(open(MAPPING_PATH, "r", encoding="utf-8"))
+        m=json.load(open(MAPPING_PATH, "r", encoding="utf-8"))
     except Exception:
-        return {}
+        m={}
+    return {_norm(k): v for k, v in m.items()} if isinstance(m, dict) else {}
+
+def _id_apply(m):
+    for k, v in _ID_DIRTY.items():
+        if v is None: m.pop(k, None)
+        else: m[k]=v
+    return m
+
+def _id_index():
+    global _ID_MAP, _ID_MTIME
+    with _ID_LOCK:
+        mt=_id_mtime()
+        if _ID_MAP is None or mt!=_ID_MTIME:   # premier accès, ou fichier réécrit par un autre processus
+            if _ID_MAP is not None: invalidate_search_index()
+            _ID_MAP=_id_apply(_id_read()); _ID_MTIME=mt
+        return _ID_MAP
+
+def _id_set(k, v):
+    """Modification locale de l’index (v=None : suppression), écrite au prochain flush."""
+    with _ID_LOCK:
+        idx=_id_index()
+        if v is None: idx.pop(k, None)
+        else: idx[k]=v
+        _ID_DIRTY[k]=v
+
+def flush_mapping():
+    """Relit id_mapping.json, y fusionne les modifications locales et l’écrit (Timer différé, sortie du processus)."""
+    global _ID_FLUSH, _ID_MAP, _ID_MTIME
+    with _ID_LOCK:
+        if _ID_FLUSH is None: return
+        _ID_FLUSH.cancel(); _ID_FLUSH=None
+        snap=_id_apply(_id_read())
+        def write(tmp):
+            with open(tmp, "w", encoding="utf-8") as f: json.dump(snap, f, ensure_ascii=False, indent=2)
+        try:
+            _write_atomic(MAPPING_PATH, write)
+        except Exception:
+            return
+        _ID_DIRTY.clear()
+        _ID_MAP=snap; _ID_MTIME=_id_mtime()
+
+def _id_schedule_flush():
+    global _ID_FLUSH
+    with _ID_LOCK:
+        if _ID_FLUSH is None:
+            _ID_FLUSH=threading.Timer(ID_FLUSH_DELAY, flush_mapping)
+            _ID_FLUSH.daemon=True
+            _ID_FLUSH.start()
+
+atexit.register(flush_mapping)
+
+def load_mapping():
+    """Copie de l’index (relu seulement si le fichier a changé)."""
+    with _ID_LOCK:
+        return dict(_id_index())
 
 def save_mapping(m):
-    json.dump(m, open(MAPPING_PATH, "w", encoding="utf-8"), ensure_ascii=False, indent=2)
+    """Remplace l’index ; l’écriture de id_mapping.json est différée."""
+    new={_norm(k): v for k, v in m.items()}
+    with _ID_LOCK:
+        for k in set(_id_index())-set(new): _id_set(k, None)
+        for k, v in new.items():
+            _id_set(k, v); _ID_NEG.pop(k, None)
+    _id_schedule_flush()
+    invalidate_search_index()
+
+def map_identifier(src, dst):
+    """Ajoute / remplace une correspondance identifiant → ticker Yahoo."""
+    src=_norm(src)
+    if not src or not dst: return
+    with _ID_LOCK:
+        _id_set(src, _norm(dst))
+        _ID_NEG.pop(src, None)
+    _id_schedule_flush()
+    invalidate_search_index()
 
 def load_watchlist_ls():
     try:
@@ -98,6 +319,7 @@ def load_watchlist_ls():
         return []
 
 def save_watchlist_ls(lst):
+    _ensure_data_dir()
     json.dump(lst, open(WL_PATH, "w", encoding="utf-8"), ensure_ascii=False, indent=2)
 
 # =========================
@@ -126,36 +348,90 @@ def guess_yahoo_from_ls(ticker: str):
 
 def maybe_guess_yahoo(s):
     s = _norm(s)
-    m = load_mapping().get(s)
+    m = _id_index().get(s)
     return m or guess_yahoo_from_ls(s)
 
 def resolve_identifier(id_or_ticker):
     raw = _norm(id_or_ticker)
     if not raw: return None, {}
-    mapping = load_mapping()
-    if raw in mapping:
-        return mapping[raw], {"source": "mapping"}
-    guess = maybe_guess_yahoo(raw)
+    hit = _id_index().get(raw)
+    if hit:
+        diagnostics.cache_event("resolve_identifier", True)
+        return hit, {"source": "mapping"}
+    known = search_index()["exact"].get(raw)
+    if known and len(known) == 1:          # symbole / code déjà connu localement : pas de validation réseau
+        diagnostics.cache_event("resolve_identifier", True)
+        return search_index()["docs"][next(iter(known))]["symbol"], {"source": "index"}
+    if _ID_NEG.get(raw, 0) > time.time():
+        diagnostics.cache_event("resolve_identifier", True)
+        return None, {"source": "negative"}
+    diagnostics.cache_event("resolve_identifier", False)
+    guess = guess_yahoo_from_ls(raw)
+    ttl = ID_NEG_TTL
     if guess:
         try:
             hist = yf.download(guess, period="5d", interval="1d", auto_adjust=False, progress=False, threads=False)
             if not hist.empty:
-                mapping[raw] = guess
-                save_mapping(mapping)
+                map_identifier(raw, guess)
                 return guess, {"source": "heuristic"}
         except Exception:
-            pass
+            ttl = ID_NEG_ERR_TTL
+    with _ID_LOCK:
+        _ID_NEG[raw] = time.time() + ttl
     return None, {}
 
+LS_SUFFIXES = (".PA", ".DE", ".F", ".L")     # candidats alternatifs, dans cet ordre après l’heuristique
+
+def _ls_candidates(t):
+    base=t[:-3] if t.endswith(".LS") else t.split(".")[0]
+    return list(dict.fromkeys(c for c in (guess_yahoo_from_ls(t), *(base+suf for suf in LS_SUFFIXES)) if c))
+
+def _valid_symbols(symbols):
+    """Historique 5 séances via le pool borné de _yf_download (DL_CHUNK / DL_WORKERS) → symboles ayant au moins un cours."""
+    if not symbols: return set()
+    try:
+        raw=_yf_download(list(symbols), period="5d")
+    except Exception:
+        return set()
+    return {str(t).upper() for t, df in raw.items() if "Close" in df.columns and df["Close"].notna().any()}
+
+def resolve_watchlist_ls(entries=None, record=True):
+    """
+    Résolution groupée de la watchlist LS (load_watchlist_ls() par défaut) :
+    index → heuristique + suffixes .PA/.DE/.F/.L validés par un téléchargement groupé (pool borné).
+    Les gagnants sont enregistrés dans id_mapping.json (record=True), les échecs en cache négatif.
+    → {"resolved": {ls: yahoo}, "unresolved": [ls…], "validated": nb de candidats testés}
+    """
+    entries=[e for e in dict.fromkeys(_norm(x) for x in (load_watchlist_ls() if entries is None else entries)) if e]
+    idx=_id_index(); now=time.time()
+    resolved={e: idx[e] for e in entries if idx.get(e)}
+    todo=[e for e in entries if e not in resolved and _ID_NEG.get(e, 0)<=now]
+    cands={e: _ls_candidates(e) for e in todo}
+    valid=_valid_symbols(list(dict.fromkeys(c for cs in cands.values() for c in cs)))
+    for e, cs in cands.items():
+        win=next((c for c in cs if c in valid), None)
+        if win is None: continue
+        resolved[e]=win
+        if record:
+            with _ID_LOCK:
+                _id_set(e, win); _ID_NEG.pop(e, None)
+    if record and any(e in resolved for e in cands):
+        _id_schedule_flush(); invalidate_search_index()
+    unresolved=[e for e in entries if e not in resolved]
+    with _ID_LOCK:
+        for e in cands:
+            if e not in resolved: _ID_NEG[e]=now+(ID_NEG_TTL if valid else ID_NEG_ERR_TTL)
+    return {"resolved": resolved, "unresolved": unresolved, "validated": sum(len(c) for c in cands.values())}
+
 # =========================
 # RECHERCHE YAHOO
 # =========================
-@lru_cache(maxsize=256)
+@ttl_cache(ttl=86400, maxsize=256)
 def yahoo_search(query: str, region="FR", lang="fr-FR", quotesCount=20):
     url = "https://query2.finance.yahoo.com/v1/finance/search"
     params = {"q": query, "quotesCount": quotesCount, "newsCount": 0, "lang": lang, "region": region}
     try:
-        r = requests.get(url, params=params, headers=UA, timeout=12)
+        r = http_client.get(url, params=params, timeout=12)
         r.raise_for_status()
         data = r.json()
         quotes = data.get("quotes", [])
@@ -172,31 +448,46 @@ def yahoo_search(query: str, region="FR", lang="fr-FR", quotesCount=20):
     except Exception:
         return []
 
-def find_ticker_by_name(company_name: str, prefer_markets=("Paris","XETRA","Frankfurt","NasdaqGS","NYSE")):
+PREFER_MARKETS = ("Paris","XETRA","Frankfurt","NasdaqGS","NYSE")
+
+def _rank_score(q, r, prefer_markets=PREFER_MARKETS):
+    score = 0
+    exch = (r.get("exchDisp") or "").lower()
+    name = (r.get("shortname") or r.get("longname") or "").lower()
+    sym  = (r.get("symbol") or "").upper()
+    if any(pm.lower() in exch for pm in prefer_markets): score += 3
+    if q.lower() in name: score += 2
+    if q.lower() in sym.lower(): score += 1
+    return score
+
+def find_ticker_by_name(company_name: str, prefer_markets=PREFER_MARKETS, local=True):
+    """
+    Index local d’abord (search_instruments) : servi seul s’il contient une correspondance exacte
+    ou par préfixe ; sinon Yahoo, suivi des correspondances locales approchées.
+    """
     if not company_name: return []
     q = company_name.strip()
+    hits = search_instruments(q, limit=20, prefer_markets=prefer_markets) if local else []
+    if hits and hits[0]["match"] >= SEARCH_SURE_QUALITY: return hits
     res = yahoo_search(q)
-    if not res: return []
-    eq = [r for r in res if (r.get("typeDisp","").lower() in ("equity","action","stock","actions") or r.get("symbol",""))]
-    ranked=[]
-    for r in eq:
-        score = 0
-        exch = (r.get("exchDisp") or "").lower()
-        name = (r.get("shortname") or r.get("longname") or "").lower()
-        sym  = (r.get("symbol") or "").upper()
-        if any(pm.lower() in exch for pm in prefer_markets): score += 3
-        if q.lower() in name: score += 2
-        if q.lower() in sym.lower(): score += 1
-        ranked.append((score, r))
+    eq = [r for r in (res or []) if (r.get("typeDisp","").lower() in ("equity","action","stock","actions") or r.get("symbol",""))]
+    learn_instruments(eq)
+    ranked=[(_rank_score(q, r, prefer_markets), r) for r in eq]
     ranked.sort(key=lambda x: x[0], reverse=True)
-    return [r for _, r in ranked]
+    seen = {r.get("symbol") for _, r in ranked}
+    return [r for _, r in ranked] + [h for h in hits if h["symbol"] not in seen]
 
 # =========================
 # MEMBRES D’INDICES — CAC40, DAX, NASDAQ100, S&P500
 # =========================
-@lru_cache(maxsize=32)
+MEMBERS_DIR = os.path.join(DATA_DIR, "members")
+MEMBERS_TTL_DAYS = 7          # les compositions changent quelques fois par an
+_MEMBERS_MEM = {}             # indice → (horodatage, DataFrame)
+_MEMBERS_REFRESHING = set()
+_MEMBERS_LOCK = threading.Lock()
+
 def _read_tables(url: str):
-    html = requests.get(url, headers=UA, timeout=20).text
+    html = http_client.get(url, timeout=20, revalidate=True).text
     return pd.read_html(html)
 
 def _extract_name_ticker(tables):
@@ -213,29 +504,25 @@ def _extract_name_ticker(tables):
     out["ticker"]=out["ticker"].astype(str).str.strip()
     return out.dropna().drop_duplicates(subset=["ticker"])
 
-@lru_cache(maxsize=8)
-def members_cac40():
+def _scrape_cac40():
     df=_extract_name_ticker(_read_tables("https://en.wikipedia.org/wiki/CAC_40"))
     df["ticker"]=df["ticker"].apply(lambda x: x if "." in x else f"{x}.PA")
     df["index"]="CAC 40"
     return df
 
-@lru_cache(maxsize=8)
-def members_dax():
+def _scrape_dax():
     df=_extract_name_ticker(_read_tables("https://en.wikipedia.org/wiki/DAX"))
     df["ticker"]=df["ticker"].apply(lambda x: x if "." in x else f"{x}.DE")
     df["index"]="DAX"
     return df
 
-@lru_cache(maxsize=8)
-def members_nasdaq100():
+def _scrape_nasdaq100():
     df=_extract_name_ticker(_read_tables("https://en.wikipedia.org/wiki/NASDAQ-100"))
     # Yahoo utilise tel quel (AAPL, MSFT...). Pas de suffixe à ajouter.
     df["index"]="NASDAQ 100"
     return df
 
-@lru_cache(maxsize=8)
-def members_sp500():
+def _scrape_sp500():
     df=_extract_name_ticker(_read_tables("https://en.wikipedia.org/wiki/List_of_S%26P_500_companies"))
     # Ajustement ponctuel pour Yahoo (BRK.B -> BRK-B, BF.B -> BF-B, etc.)
     def _fix(sym:str):
@@ -245,81 +532,530 @@ def members_sp500():
     df["index"]="S&P 500"
     return df
 
-def members(index_name: str):
-    if index_name=="CAC 40": return members_cac40()
-    if index_name=="DAX": return members_dax()
-    if index_name=="NASDAQ 100": return members_nasdaq100()
-    if index_name=="S&P 500": return members_sp500()
+_MEMBER_SCRAPERS = {
+    "CAC 40": _scrape_cac40,
+    "DAX": _scrape_dax,
+    "NASDAQ 100": _scrape_nasdaq100,
+    "S&P 500": _scrape_sp500,
+}
+MEMBER_INDEXES = tuple(_MEMBER_SCRAPERS)   # indices dont la composition est scrapée / mise en snapshot
+
+def _members_path(index_name):
+    return os.path.join(MEMBERS_DIR, f"{quote(index_name, safe='')}.json")
+
+def _members_load(index_name):
+    try:
+        snap=json.load(open(_members_path(index_name), "r", encoding="utf-8"))
+        df=pd.DataFrame(snap["rows"], columns=["ticker","name","index"])
+        return (float(snap["fetched_at"]), df) if not df.empty else None
+    except Exception:
+        return None
+
+def _members_save(index_name, fetched_at, df):
+    try:
+        os.makedirs(MEMBERS_DIR, exist_ok=True)
+        path=_members_path(index_name); tmp=f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"fetched_at": fetched_at, "rows": df[["ticker","name","index"]].to_dict(orient="records")},
+                      f, ensure_ascii=False, indent=2)
+        os.replace(tmp, path)
+    except Exception:
+        pass
+
+def refresh_members(index_name):
+    """Re-scrape Wikipedia ; en cas d’échec ou de table vide, le dernier snapshot reste en place."""
+    try:
+        df=_MEMBER_SCRAPERS[index_name]()
+    except Exception:
+        df=None
+    finally:
+        with _MEMBERS_LOCK: _MEMBERS_REFRESHING.discard(index_name)
+    if df is None or df.empty: return None
+    now=time.time()
+    with _MEMBERS_LOCK: _MEMBERS_MEM[index_name]=(now, df)
+    _members_save(index_name, now, df)
+    invalidate_search_index()
+    return df
+
+def _members_refresh_async(index_name):
+    with _MEMBERS_LOCK:
+        if index_name in _MEMBERS_REFRESHING: return
+        _MEMBERS_REFRESHING.add(index_name)
+    threading.Thread(target=refresh_members, args=(index_name,), daemon=True).start()
+
+def _members_snapshot(index_name):
+    """Snapshot disque servi immédiatement ; rafraîchi en tâche de fond au-delà de MEMBERS_TTL_DAYS."""
+    hit=_MEMBERS_MEM.get(index_name)
+    if hit is None:
+        hit=_members_load(index_name)
+        if hit is not None:
+            with _MEMBERS_LOCK: _MEMBERS_MEM.setdefault(index_name, hit)
+    if hit is None:   # premier démarrage : scrape synchrone
+        df=refresh_members(index_name)
+        return df.copy() if df is not None else pd.DataFrame(columns=["ticker","name","index"])
+    fetched_at, df = hit
+    if time.time()-fetched_at > MEMBERS_TTL_DAYS*86400:
+        _members_refresh_async(index_name)
+    return df.copy()
+
+def members_cac40(): return _members_snapshot("CAC 40")
+def members_dax(): return _members_snapshot("DAX")
+def members_nasdaq100(): return _members_snapshot("NASDAQ 100")
+def members_sp500(): return _members_snapshot("S&P 500")
+
+def members(index_name: str, offline=False):
+    """
+    Membres d’un indice (MEMBER_INDEXES) ou de la watchlist « LS Exchange » → DataFrame ticker / name / index.
+    offline=True : snapshot mémoire / disque et id_mapping seulement, ni scraping ni appel Yahoo.
+    """
+    if index_name in _MEMBER_SCRAPERS:
+        if not offline: return _members_snapshot(index_name)
+        hit=_MEMBERS_MEM.get(index_name) or _members_load(index_name)
+        if hit is not None: return hit[1].copy()
+    elif index_name=="LS Exchange":
+        ls_list=load_watchlist_ls()
+        if offline:
+            idx=_id_index(); resolved={_norm(x): idx[_norm(x)] for x in ls_list if idx.get(_norm(x))}
+        else:
+            resolved=resolve_watchlist_ls(ls_list)["resolved"] if ls_list else {}
+        names=[x for x in ls_list if _norm(x) in resolved]   # non résolues : pas de téléchargement voué à l’échec
+        return pd.DataFrame({"ticker": [resolved[_norm(x)] for x in names], "name": names, "index": index_name},
+                            columns=["ticker","name","index"])
     return pd.DataFrame(columns=["ticker","name","index"])
 
+def members_age(index_name: str):
+    """Âge (s) du snapshot local des membres, None s’il n’y en a pas (ou si l’indice n’est pas scrapé)."""
+    if index_name not in _MEMBER_SCRAPERS: return None
+    hit=_MEMBERS_MEM.get(index_name) or _members_load(index_name)
+    return None if hit is None else time.time()-hit[0]
+
+# =========================
+# INDEX DE RECHERCHE LOCAL (typeahead)
+# =========================
+# Instruments déjà connus (snapshots d’indices, portefeuille, id_mapping — codes LS / ISIN / WKN —,
+# résultats Yahoo déjà vus) : correspondance exacte, préfixe (bisect sur le vocabulaire trié)
+# et approchée (trigrammes), sans accents ni casse. Reconstruit paresseusement après invalidation.
+SEARCH_INDEX_TTL = 3600
+SEARCH_MIN_QUALITY = 0.5      # en dessous, la correspondance locale est jugée trop faible → Yahoo
+SEARCH_SURE_QUALITY = 0.8     # exact / préfixe : l’index local suffit ; en dessous (trigrammes) Yahoo est aussi interrogé
+_SUFFIX_EXCH = {".PA": "Paris", ".DE": "XETRA", ".F": "Frankfurt", ".L": "London", ".AS": "Amsterdam",
+                ".MI": "Milan", ".MC": "Madrid", ".SW": "Swiss"}
+_SEARCH = {"idx": None, "built": 0.0, "gen": -1}
+_SEARCH_GEN = 0
+_SEARCH_LEARNED = {}          # symbole → résultat Yahoo (survit aux reconstructions)
+_SEARCH_LOCK = threading.Lock()
+
+def _fold(s):
+    s=unicodedata.normalize("NFKD", str(s or "")).encode("ascii", "ignore").decode("ascii").lower()
+    return re.sub(r"[^a-z0-9]+", " ", s).strip()
+
+def _trigrams(tok):
+    t=f" {tok} "
+    return {t[i:i+3] for i in range(len(t)-2)}
+
+def invalidate_search_index():
+    global _SEARCH_GEN
+    _SEARCH_GEN+=1
+
+def learn_instruments(results):
+    """Mémorise des résultats yahoo_search pour les recherches suivantes."""
+    new=False
+    for r in results or []:
+        sym=_norm(r.get("symbol"))
+        if sym and sym not in _SEARCH_LEARNED:
+            _SEARCH_LEARNED[sym]=dict(r, symbol=sym); new=True
+    if new: invalidate_search_index()
+
+def _exch_of(sym):
+    if "." not in sym: return "NasdaqGS/NYSE"       # membres S&P 500 / NASDAQ 100 sans suffixe
+    return _SUFFIX_EXCH.get("."+sym.rsplit(".", 1)[-1], "")
+
+def _search_docs():
+    docs={}
+    def add(sym, name="", exch="", alias=None, typ="", source=""):
+        sym=_norm(sym)
+        if not sym or sym=="NAN": return
+        d=docs.setdefault(sym, {"symbol": sym, "shortname": "", "longname": "", "typeDisp": typ or "Equity",
+                                "exchDisp": exch or _exch_of(sym), "aliases": set(), "source": source})
+        if name and not d["shortname"]: d["shortname"]=d["longname"]=str(name)
+        if alias: d["aliases"].add(_norm(alias))
+    for idx in _MEMBER_SCRAPERS:                          # snapshots seulement : jamais de scraping ici
+        hit=_MEMBERS_MEM.get(idx) or _members_load(idx)
+        if hit is not None:
+            for t, n in zip(hit[1]["ticker"], hit[1]["name"]): add(t, n, source=idx)
+    if os.path.exists(PORTFOLIO_DB):
+        for t, n in zip(*(load_portfolio()[c] for c in ("Ticker", "Name"))): add(t, n, source="portefeuille")
+    for alias, sym in _id_index().items(): add(sym, alias=alias, source="mapping")
+    for sym, r in list(_SEARCH_LEARNED.items()):
+        add(sym, r.get("shortname") or r.get("longname"), r.get("exchDisp"), typ=r.get("typeDisp"), source="yahoo")
+    return list(docs.values())
+
+def _build_search_index():
+    docs=_search_docs()
+    exact, tok_docs = {}, {}
+    for i, d in enumerate(docs):
+        sym=d["symbol"]
+        for k in {sym, sym.split(".")[0], *d["aliases"]}:
+            exact.setdefault(k, set()).add(i)
+        for tok in set(_fold(d["shortname"]).split()) | set(_fold(sym.split(".")[0]).split()) | {_fold(a) for a in d["aliases"]}:
+            if tok: tok_docs.setdefault(tok, set()).add(i)
+    grams={}
+    for tok in tok_docs:
+        if len(tok)>=3:
+            for g in _trigrams(tok): grams.setdefault(g, set()).add(tok)
+    return {"docs": docs, "exact": exact, "tok_docs": tok_docs, "vocab": sorted(tok_docs), "grams": grams}
+
+def search_index():
+    now=time.time()
+    with _SEARCH_LOCK:
+        if _SEARCH["idx"] is None or _SEARCH["gen"]!=_SEARCH_GEN or now-_SEARCH["built"]>SEARCH_INDEX_TTL:
+            gen=_SEARCH_GEN
+            _SEARCH.update(idx=_build_search_index(), built=now, gen=gen)
+        return _SEARCH["idx"]
+
+def _token_matches(ix, qt):
+    """Jeton de requête → {doc: qualité} : préfixe (0.8–1.0), sinon trigrammes (Dice, < 0.8)."""
+    import bisect
+    out={}
+    vocab=ix["vocab"]
+    i=bisect.bisect_left(vocab, qt)
+    while i<len(vocab) and vocab[i].startswith(qt):
+        tok=vocab[i]; q=0.8+0.2*len(qt)/len(tok)
+        for d in ix["tok_docs"][tok]:
+            if q>out.get(d, 0): out[d]=q
+        i+=1
+    if not out and len(qt)>=3:
+        qg=_trigrams(qt); common={}
+        for g in qg:
+            for tok in ix["grams"].get(g, ()): common[tok]=common.get(tok, 0)+1
+        for tok, c in common.items():
+            sim=min(2*c/(len(qg)+len(tok)), 0.79)   # une correspondance approchée ne dépasse jamais un préfixe
+            if sim<SEARCH_MIN_QUALITY: continue
+            for d in ix["tok_docs"][tok]:
+                if sim>out.get(d, 0): out[d]=sim
+    return out
+
+def search_instruments(query, limit=10, prefer_markets=PREFER_MARKETS, min_quality=SEARCH_MIN_QUALITY):
+    """
+    Recherche locale (nom, ticker, code LS, ISIN, WKN) → résultats au format yahoo_search
+    (+ "source", "match"), classés par qualité de correspondance puis comme find_ticker_by_name.
+    """
+    q=(query or "").strip()
+    if not q: return []
+    ix=search_index()
+    scores={d: 1.0 for d in ix["exact"].get(_norm(q), ())}
+    qtoks=_fold(q).split()
+    if qtoks:
+        per=sorted((_token_matches(ix, t) for t in qtoks), key=len)
+        common=[d for d in per[0] if all(d in p for p in per[1:])]
+        for d in common:
+            scores[d]=max(scores.get(d, 0), sum(p[d] for p in per)/len(per))
+    hits=[(qual, d) for d, qual in scores.items() if qual>=min_quality]
+    if not hits: return []
+    ranked=sorted(hits, key=lambda x: (x[0]*10+_rank_score(q, ix["docs"][x[1]], prefer_markets)), reverse=True)[:limit]
+    out=[]
+    for qual, d in ranked:
+        doc=ix["docs"][d]
+        out.append({k: doc[k] for k in ("symbol", "shortname", "longname", "exchDisp", "typeDisp", "source")}
+                   | {"match": round(qual, 3)})
+    return out
+
 # =========================
 # PRIX (AJUSTÉS) & MÉTRIQUES
 # =========================
-@lru_cache(maxsize=64)
-def fetch_prices_cached(tickers_tuple, period="120d"):
-    tickers=list(tickers_tuple)
-    if not tickers: return pd.DataFrame()
+PRICE_STORE_DIR = os.path.join(DATA_DIR, "prices")
+_ADJ_TOL = 0.005   # écart max toléré sur la barre de recouvrement (sinon dividende/split → rechargement)
+
+DL_WORKERS = 8     # pool borné de téléchargements simultanés
+DL_CHUNK = 25      # tickers par tâche
+
+def _history_chunk(chunk, **kw):
+    """Un lot de tickers → {ticker: OHLCV brut}. yf.Ticker est indépendant par thread (contrairement à yf.download)."""
+    out={}
+    for t in chunk:
+        try:
+            h=yf.Ticker(t).history(interval="1d", auto_adjust=True, **kw)   # ✅ ajustés (anti faux +/−)
+        except Exception:
+            continue
+        if h is not None and len(h):
+            out[t]=h[[c for c in ("Open","High","Low","Close","Volume") if c in h.columns]].copy()
+    return out
+
+def _yf_download(tickers, **kw):
+    """Téléchargement par lots parallèles → {ticker: DataFrame(Date, Open, High, Low, Close, Volume)} (lignes vides retirées)."""
+    tickers=list(dict.fromkeys(tickers))
+    if not tickers: return {}
+    chunks=[tickers[i:i+DL_CHUNK] for i in range(0, len(tickers), DL_CHUNK)]
+    raw={}
+    if len(chunks)==1:
+        raw=_history_chunk(chunks[0], **kw)
+    else:
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=min(DL_WORKERS, len(chunks))) as ex:
+            for part in ex.map(diagnostics.carry(lambda c: _history_chunk(c, **kw)), chunks):
+                raw.update(part)
+    out={}
+    for t, df in raw.items():
+        df=df.dropna(how="all", subset=[c for c in ("Open","High","Low","Close") if c in df.columns])
+        if df.empty: continue
+        df.columns.name=None; df.index.name="Date"
+        df=df.reset_index()
+        d=pd.to_datetime(df["Date"])
+        df["Date"]=(d.dt.tz_localize(None) if d.dt.tz is not None else d).dt.normalize()
+        out[t]=df
+    diagnostics.count(rows=sum(len(df) for df in out.values()))
+    return out
+
+def _store_path(ticker: str):
+    return os.path.join(PRICE_STORE_DIR, f"{quote(_norm(ticker), safe='')}.parquet")
+
+def _store_load(ticker: str):
+    """Historique local d’un ticker → (table Arrow, début couvert) ou (None, None)."""
+    path=_store_path(ticker)
+    if not os.path.exists(path): return None, None
     try:
-        data=yf.download(
-            tickers, period=period, interval="1d",
-            auto_adjust=True,        # ✅ ajustés (anti faux +/−)
-            group_by="ticker", threads=False, progress=False
-        )
+        import pyarrow.parquet as pq
+        tbl=pq.read_table(path)
+        if tbl.num_rows==0: return None, None
+        meta=tbl.schema.metadata or {}
+        covered=pd.Timestamp(meta[b"covered_from"].decode() if b"covered_from" in meta else tbl["Date"][0].as_py())
+        return tbl, covered
     except Exception:
-        return pd.DataFrame()
-    if data is None or len(data)==0: return pd.DataFrame()
-    frames=[]
-    if isinstance(data,pd.DataFrame) and {"Open","High","Low","Close"}.issubset(data.columns):
-        df=data.copy(); df["Ticker"]=tickers[0]; frames.append(df)
-    else:
-        for t in tickers:
-            try:
-                if t in data and isinstance(data[t],pd.DataFrame):
-                    df=data[t].copy(); df["Ticker"]=t; frames.append(df)
-            except Exception:
-                continue
+        return None, None
+
+def _store_load_many(tickers):
+    """Lecture parallèle du stock (pyarrow libère le GIL) → {ticker: (table, début couvert)}."""
+    if len(tickers)<=DL_CHUNK:
+        return {t: _store_load(t) for t in tickers}
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(max_workers=DL_WORKERS) as ex:
+        return dict(zip(tickers, ex.map(_store_load, tickers)))
+
+def _tables_to_frame(tables):
+    """[(ticker, table)] → un seul DataFrame long (une conversion pandas pour tout le lot)."""
+    import pyarrow as pa
+    parts=[tbl.replace_schema_metadata(None).append_column("Ticker", pa.array([t]*tbl.num_rows, pa.string()))
+           for t, tbl in tables]
+    return pa.concat_tables(parts, promote_options="permissive").to_pandas()
+
+def _store_save(ticker: str, df: pd.DataFrame, covered_from):
+    """Écriture atomique (fichier temporaire + os.replace) d’un Parquet par ticker."""
+    try:
+        import pyarrow as pa, pyarrow.parquet as pq
+        os.makedirs(PRICE_STORE_DIR, exist_ok=True)
+        tbl=pa.Table.from_pandas(df.reset_index(drop=True), preserve_index=False)
+        meta=dict(tbl.schema.metadata or {})
+        meta[b"covered_from"]=str(pd.Timestamp(covered_from).date()).encode()
+        tbl=tbl.replace_schema_metadata(meta)
+        path=_store_path(ticker)
+        tmp=f"{path}.{os.getpid()}.tmp"
+        pq.write_table(tbl, tmp)
+        os.replace(tmp, path)
+    except Exception:
+        pass
+
+def _fetch_with_store(tickers, days=120):
+    """
+    Lit d’abord le stock Parquet local puis ne demande à Yahoo que les barres manquantes :
+    - historique absent / trop court → téléchargement complet de la fenêtre
+    - sinon delta depuis la dernière séance stockée (recouvrement d’1 barre pour détecter les ajustements)
+    Seules les séances closes sont persistées ; marché fermé et stock à jour → aucun appel réseau.
+    """
+    today=pd.Timestamp.today().normalize()
+    start=today-pd.Timedelta(days=days)
+    uniq=list(dict.fromkeys(tickers))
+    loaded=_store_load_many(uniq)
+    stored, full_need, delta_need, done_upto = {}, [], {}, {}
+    for t in uniq:
+        last_done, _, is_open = session_state(t)
+        done_upto[t]=last_done
+        tbl, covered = loaded[t]
+        if tbl is None or covered > start:
+            full_need.append(t); continue
+        stored[t]=(tbl, covered)
+        last=pd.Timestamp(tbl["Date"][-1].as_py())
+        if last<last_done or is_open:
+            delta_need.setdefault(last, []).append(t)
+
+    fresh={}
+    if full_need:
+        fresh.update(_yf_download(full_need, start=start.strftime("%Y-%m-%d")))
+    for last, group in delta_need.items():
+        got=_yf_download(group, start=last.strftime("%Y-%m-%d"))
+        redo=[]
+        for t, new in got.items():
+            old=stored[t][0].to_pandas()
+            o=old.loc[old["Date"]==last, "Close"]
+            n=new.loc[new["Date"]==last, "Close"]
+            if len(o) and len(n) and o.iloc[-1]>0 and abs(n.iloc[-1]/o.iloc[-1]-1)>_ADJ_TOL:
+                redo.append(t); continue
+            merged=pd.concat([old, new], ignore_index=True, sort=False)
+            fresh[t]=merged.drop_duplicates(subset=["Date"], keep="last").sort_values("Date")
+        if redo:   # ajustement rétroactif (dividende/split) → on recharge tout l’historique couvert
+            since=min([start]+[stored[t][1] for t in redo])
+            fresh.update(_yf_download(redo, start=since.strftime("%Y-%m-%d")))
+
+    frames, kept = [], []
+    for t in uniq:
+        if t in fresh:
+            df=fresh[t]
+            covered=min(start, stored[t][1]) if t in stored else start
+            done=df[df["Date"]<=done_upto[t]]
+            if not done.empty: _store_save(t, done, covered)
+            df=df[df["Date"]>=start].copy()
+            if df.empty: continue
+            df["Ticker"]=t; frames.append(df)
+        elif t in stored:
+            kept.append((t, stored[t][0]))
+    if kept:   # stock à jour : une seule conversion pandas et un seul filtre pour tout le lot
+        df=_tables_to_frame(kept)
+        frames.insert(0, df[df["Date"]>=start].reset_index(drop=True))
+    frames=[f for f in frames if not f.empty]
     if not frames: return pd.DataFrame()
-    out=pd.concat(frames); out.reset_index(inplace=True); return out
+    out=pd.concat(frames, ignore_index=True, sort=False)
+    if kept and len(frames)>1:   # stock + téléchargés : retour à l’ordre des tickers demandés (dates déjà croissantes)
+        rank={t: i for i, t in enumerate(uniq)}
+        out=out.iloc[np.argsort(out["Ticker"].map(rank).to_numpy(), kind="stable")].reset_index(drop=True)
+    return out
+
+# Cache mémoire par ticker : toute demande (sous-ensemble de tickers, fenêtre plus courte,
+# ordre quelconque) est servie par découpage ; seuls les tickers absents, expirés ou dont
+# l’historique est trop court sont redemandés au stock / à Yahoo.
+_PRICE_MEM = {}               # ticker → (DataFrame, début couvert, expiration epoch)
+_PRICE_LOCK = threading.Lock()
 
 def fetch_prices(tickers, days=120):
-    return fetch_prices_cached(tuple(tickers), period=f"{days}d")
+    tickers=[t for t in dict.fromkeys(tickers) if t]
+    if not tickers: return pd.DataFrame()
+    start=pd.Timestamp.today().normalize()-pd.Timedelta(days=days)
+    now=time.time()
+    with _PRICE_LOCK:
+        missing=[t for t in tickers
+                 if t not in _PRICE_MEM or _PRICE_MEM[t][1]>start or _PRICE_MEM[t][2]<=now]
+    diagnostics.count("fetch_prices", cache_hits=len(tickers)-len(missing), cache_misses=len(missing))
+    if missing:
+        px=_fetch_with_store(missing, days=days)
+        got=dict(tuple(px.groupby("Ticker", sort=False))) if not px.empty else {}
+        with _PRICE_LOCK:
+            for t in missing:
+                if t in got:
+                    _PRICE_MEM[t]=(got[t].reset_index(drop=True), start, session_state(t)[1])
+                else:   # échec de téléchargement : nouvel essai dans une minute
+                    _PRICE_MEM[t]=(None, start, now+60)
+    frames=[]
+    with _PRICE_LOCK:
+        hits=[_PRICE_MEM[t][0] for t in tickers]
+    for df in hits:
+        if df is None: continue
+        df=df[df["Date"]>=start]
+        if not df.empty: frames.append(df)
+    if not frames: return pd.DataFrame()
+    return pd.concat(frames, ignore_index=True, sort=False)
+
+def _clear_price_mem():
+    with _PRICE_LOCK: _PRICE_MEM.clear()
+fetch_prices.cache_clear=_clear_price_mem
+_CACHES.append(fetch_prices)
 
-def _calendar_returns(last_rows: pd.DataFrame, full_df: pd.DataFrame) -> pd.DataFrame:
-    """Variations calendaire J/7j/30j (anti biais séances)."""
+def fetch_prices_cached(tickers_tuple, period="120d"):
+    return fetch_prices(list(tickers_tuple), days=int(str(period).rstrip("d")))
+
+# Horizons calendaires : jours glissants ou "ytd" (dernier cours de l’année précédente)
+CALENDAR_HORIZONS = {
+    "pct_1d": 1, "pct_7d": 7, "pct_30d": 30,
+    "pct_90d": 90, "pct_ytd": "ytd", "pct_1y": 365,
+}
+_FALLBACK_MAX_DAYS = 30   # au-delà, pas de repli sur le 1er cours (historique trop court → NaN)
+
+def _calendar_returns(last_rows: pd.DataFrame, full_df: pd.DataFrame, horizons=None) -> pd.DataFrame:
+    """
+    Variations calendaires (anti biais séances) pour tous les tickers en une passe merge_asof.
+    Cours de référence = dernière clôture ≤ date cible ; si l’historique ne remonte pas jusque-là,
+    repli sur le 1er cours connu pour les horizons courts (≤ 30 j), NaN au-delà.
+    """
+    horizons=horizons or CALENDAR_HORIZONS
     if full_df.empty or last_rows.empty:
-        for k in ("pct_1d","pct_7d","pct_30d"): last_rows[k]=np.nan
+        for k in horizons: last_rows[k]=np.nan
         return last_rows
-    full=full_df.copy()
+    full=full_df[["Ticker","Date","Close"]].copy()
     full["Ticker"]=full["Ticker"].astype(str).str.upper()
     full=full.sort_values(["Ticker","Date"])
+    first=full.drop_duplicates(subset=["Ticker"]).set_index("Ticker")["Close"]
+    hist=full.dropna().sort_values("Date", kind="stable")
     last=last_rows.copy()
     last["Ticker"]=last["Ticker"].astype(str).str.upper()
 
-    def lookup_price(tkr, ref_date, days_back):
-        target=pd.to_datetime(ref_date)-pd.Timedelta(days=days_back)
-        hist=full[full["Ticker"]==tkr][["Date","Close"]].dropna().sort_values("Date")
-        if hist.empty: return np.nan
-        hist=hist[hist["Date"]<=target]
-        if hist.empty:
-            return float(full[full["Ticker"]==tkr]["Close"].iloc[0])
-        return float(hist["Close"].iloc[-1])
-
-    vals_1, vals_7, vals_30 = [], [], []
-    for _, r in last.iterrows():
-        tkr, dref, pref = r["Ticker"], r["Date"], float(r["Close"])
-        p1, p7, p30 = lookup_price(tkr, dref, 1), lookup_price(tkr, dref, 7), lookup_price(tkr, dref, 30)
-        v1  = (pref/p1-1)  if (np.isfinite(pref) and np.isfinite(p1)  and p1>0)  else np.nan
-        v7  = (pref/p7-1)  if (np.isfinite(pref) and np.isfinite(p7)  and p7>0)  else np.nan
-        v30 = (pref/p30-1) if (np.isfinite(pref) and np.isfinite(p30) and p30>0) else np.nan
+    n=len(last)
+    ref=pd.to_datetime(last["Date"]).reset_index(drop=True)
+    tkr=last["Ticker"].reset_index(drop=True)
+    pref=pd.to_numeric(last["Close"], errors="coerce").to_numpy(dtype=float)
+    targets=[]
+    for k, h in horizons.items():
+        if h=="ytd":
+            t=pd.to_datetime((ref.dt.year-1).astype(str)+"-12-31")
+        else:
+            t=ref-pd.Timedelta(days=h)
+        targets.append(t.astype(hist["Date"].dtype))
+    q=pd.DataFrame({
+        "Ticker": pd.concat([tkr]*len(horizons), ignore_index=True),
+        "Date": pd.concat(targets, ignore_index=True),
+        "_pos": np.arange(n*len(horizons)),
+    }).sort_values("Date", kind="stable")
+    m=pd.merge_asof(q, hist, on="Date", by="Ticker", direction="backward").sort_values("_pos")
+    past=m["Close"].to_numpy(dtype=float).reshape(len(horizons), n)
+    has_hist=tkr.isin(hist["Ticker"].unique()).to_numpy()
+    first_px=tkr.map(first).to_numpy(dtype=float)
+
+    for i, (k, h) in enumerate(horizons.items()):
+        p=past[i]
+        if h!="ytd" and h<=_FALLBACK_MAX_DAYS:
+            p=np.where(np.isnan(p), first_px, p)
+        p=np.where(has_hist, p, np.nan)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            v=np.where(np.isfinite(pref) & np.isfinite(p) & (p>0), pref/p-1, np.nan)
         # clamp anti-délires sur J (splits non détectés, etc.)
-        if np.isfinite(v1) and abs(v1)>0.4: v1=np.nan
-        vals_1.append(v1); vals_7.append(v7); vals_30.append(v30)
-    last["pct_1d"], last["pct_7d"], last["pct_30d"] = vals_1, vals_7, vals_30
+        if h==1: v=np.where(np.abs(v)>0.4, np.nan, v)
+        last[k]=v
     return last
 
-def compute_metrics(df: pd.DataFrame) -> pd.DataFrame:
-    """Retourne 1 ligne par ticker avec indicateurs + variations J/7j/30j."""
-    cols=["Ticker","Date","Close","ATR14","MA20","MA50","gap20","gap50","trend_score","pct_1d","pct_7d","pct_30d"]
+def _panel_index(df: pd.DataFrame):
+    """
+    Positions (séance, ticker) d’un frame long trié Ticker/Date : chaque ticker est aligné
+    sur sa dernière séance (bas du tableau) et complété par des NaN en tête.
+    """
+    codes=df.groupby("Ticker", sort=True).ngroup().to_numpy()
+    back=df.groupby("Ticker", sort=True).cumcount(ascending=False).to_numpy()
+    n_rows=int(back.max())+1 if len(back) else 0
+    return codes, n_rows-1-back, n_rows, int(codes.max())+1 if len(codes) else 0
+
+def _to_wide(values, codes, rows, n_rows, n_tk):
+    out=np.full((n_rows, n_tk), np.nan)
+    out[rows, codes]=pd.to_numeric(values, errors="coerce").to_numpy(dtype=float)
+    return out
+
+def _rolling_mean(a, window, min_periods):
+    return pd.DataFrame(a).rolling(window, min_periods=min_periods).mean().to_numpy()
+
+def indicator_panel(close, high, low):
+    """
+    Indicateurs sur tableaux denses (séances × tickers), fenêtres glissantes colonne par colonne :
+    TR, ATR14, MA20, MA50 (mêmes min_periods que l’historique long format).
+    """
+    prev=np.vstack([np.full((1, close.shape[1]), np.nan), close[:-1]])
+    tr=np.maximum(high-low, np.maximum(np.abs(high-prev), np.abs(low-prev)))
+    return {
+        "TR": tr,
+        "ATR14": _rolling_mean(tr, 14, 5),
+        "MA20": _rolling_mean(close, 20, 5),
+        "MA50": _rolling_mean(close, 50, 10),
+    }
+
+def compute_metrics(df: pd.DataFrame, stream=None) -> pd.DataFrame:
+    """
+    Retourne 1 ligne par ticker avec indicateurs + variations calendaires (J/7j/30j/90j/YTD/1 an).
+    stream (IndicatorStream) : ATR14 / MA20 / MA50 tirés de l’état incrémental, synchronisé sur df.
+    """
+    cols=["Ticker","Date","Close","ATR14","MA20","MA50","gap20","gap50","trend_score",*CALENDAR_HORIZONS]
     if df is None or df.empty: return pd.DataFrame(columns=cols)
     df=df.copy()
     if "Date" not in df.columns:
@@ -328,14 +1064,19 @@ def compute_metrics(df: pd.DataFrame) -> pd.DataFrame:
     if need - set(df.columns): return pd.DataFrame(columns=cols)
 
     df["Ticker"]=df["Ticker"].astype(str).str.upper()
-    df=df.sort_values(["Ticker","Date"])
-    df["PrevClose"]=df.groupby("Ticker")["Close"].shift(1)
-    df["TR"]=np.maximum(df["High"]-df["Low"], np.maximum((df["High"]-df["PrevClose"]).abs(), (df["Low"]-df["PrevClose"]).abs()))
-    df["ATR14"]=df.groupby("Ticker")["TR"].transform(lambda s:s.rolling(14,min_periods=5).mean())
-    df["MA20"]=df.groupby("Ticker")["Close"].transform(lambda s:s.rolling(20,min_periods=5).mean())
-    df["MA50"]=df.groupby("Ticker")["Close"].transform(lambda s:s.rolling(50,min_periods=10).mean())
-
-    last=df.groupby("Ticker").tail(1)[["Ticker","Date","Close","ATR14","MA20","MA50"]].copy()
+    df=df.sort_values(["Ticker","Date"]).reset_index(drop=True)
+    last=df.groupby("Ticker").tail(1)[["Ticker","Date","Close"]].copy()
+    if stream is not None:
+        ind=stream.sync(df)
+        for k in ("ATR14","MA20","MA50"):
+            last[k]=last["Ticker"].map(ind[k]).to_numpy(dtype=float)
+    else:
+        codes, rows, n_rows, n_tk = _panel_index(df)
+        wide=lambda col: _to_wide(df[col], codes, rows, n_rows, n_tk)
+        ind=indicator_panel(wide("Close"), wide("High"), wide("Low"))
+        last_codes=codes[last.index.to_numpy()]
+        for k in ("ATR14","MA20","MA50"):
+            last[k]=ind[k][-1, last_codes]
     last["gap20"]=np.where(np.isfinite(last["MA20"]) & (last["MA20"]!=0), last["Close"]/last["MA20"]-1, np.nan)
     last["gap50"]=np.where(np.isfinite(last["MA50"]) & (last["MA50"]!=0), last["Close"]/last["MA50"]-1, np.nan)
     last["trend_score"]=0.6*last["gap20"]+0.4*last["gap50"]
@@ -343,10 +1084,203 @@ def compute_metrics(df: pd.DataFrame) -> pd.DataFrame:
     last=_calendar_returns(last, df)
     return last.reset_index(drop=True)
 
+# =========================
+# INDICATEURS EN FLUX (état incrémental)
+# =========================
+# Par ticker : anneaux des 50 dernières clôtures et des 14 derniers TR + sommes / effectifs
+# courants → ajout d’une barre en O(1), mêmes valeurs que indicator_panel (mêmes min_periods,
+# NaN ignorés). La dernière barre de chaque ticker reste provisoire (séance en cours) :
+# elle est évaluée sans être intégrée, l’état ne contient que des barres closes.
+INDICATOR_STATE_PATH = os.path.join(DATA_DIR, "indicators.npz")
+
+class IndicatorStream:
+    W_CLOSE, W_MA20, W_TR = 50, 20, 14
+    MIN_PERIODS = {"ATR14": 5, "MA20": 5, "MA50": 10}
+
+    def __init__(self):
+        self.pos={}                                   # ticker → ligne
+        self.close=np.full((0, self.W_CLOSE), np.nan); self.tr=np.full((0, self.W_TR), np.nan)
+        self.h50=np.zeros(0, dtype=np.int64); self.h14=np.zeros(0, dtype=np.int64)
+        self.sums=np.zeros((0, 3)); self.cnts=np.zeros((0, 3), dtype=np.int64)   # TR14, MA20, MA50
+        self.prev=np.zeros(0); self.last_date=np.zeros(0, dtype="datetime64[ns]")
+        self.lock=threading.Lock()
+
+    # ---------- stockage ----------
+    def _rows(self, tickers):
+        new=[t for t in tickers if t not in self.pos]
+        if new:
+            n=len(new)
+            for t in new: self.pos[t]=len(self.pos)
+            self.close=np.vstack([self.close, np.full((n, self.W_CLOSE), np.nan)])
+            self.tr=np.vstack([self.tr, np.full((n, self.W_TR), np.nan)])
+            self.h50=np.concatenate([self.h50, np.zeros(n, dtype=np.int64)])
+            self.h14=np.concatenate([self.h14, np.zeros(n, dtype=np.int64)])
+            self.sums=np.vstack([self.sums, np.zeros((n, 3))])
+            self.cnts=np.vstack([self.cnts, np.zeros((n, 3), dtype=np.int64)])
+            self.prev=np.concatenate([self.prev, np.full(n, np.nan)])
+            self.last_date=np.concatenate([self.last_date, np.full(n, np.datetime64("NaT"), dtype="datetime64[ns]")])
+        return np.array([self.pos[t] for t in tickers], dtype=np.int64)
+
+    def _resum(self, k):
+        """Sommes recalculées depuis les anneaux (à chaque tour d’anneau : pas de dérive flottante)."""
+        ar=np.arange(self.W_MA20)
+        last20=self.close[k[:, None], (self.h50[k, None]-self.W_MA20+ar) % self.W_CLOSE]
+        for j, a in enumerate((self.tr[k], last20, self.close[k])):
+            self.sums[k, j]=np.nansum(a, axis=1); self.cnts[k, j]=np.isfinite(a).sum(axis=1)
+
+    def seed(self, tickers, close, high, low, dates):
+        """Initialise des tickers depuis des tableaux denses séances × tickers (alignés en bas, NaN en tête)."""
+        k=self._rows(list(tickers))
+        tr=indicator_panel(close, high, low)["TR"]
+        pad=lambda a, w: np.vstack([np.full((max(0, w-len(a)), a.shape[1]), np.nan), a[-w:]]) if w else a
+        self.close[k]=pad(close, self.W_CLOSE).T; self.tr[k]=pad(tr, self.W_TR).T
+        self.h50[k]=0; self.h14[k]=0
+        self.prev[k]=close[-1] if len(close) else np.nan
+        self.last_date[k]=dates
+        self._resum(k)
+
+    def _step(self, k, c, h, l, commit):
+        """Ajoute une barre aux tickers k (distincts) ; sans commit, renvoie seulement les indicateurs."""
+        with np.errstate(invalid="ignore"):
+            tr=np.maximum(h-l, np.maximum(np.abs(h-self.prev[k]), np.abs(l-self.prev[k])))
+        out_tr=self.tr[k, self.h14[k]]
+        out50=self.close[k, self.h50[k]]
+        out20=self.close[k, (self.h50[k]-self.W_MA20) % self.W_CLOSE]
+        z=lambda a: np.where(np.isfinite(a), a, 0.0); f=lambda a: np.isfinite(a).astype(np.int64)
+        sums=self.sums[k]+np.column_stack([z(tr)-z(out_tr), z(c)-z(out20), z(c)-z(out50)])
+        cnts=self.cnts[k]+np.column_stack([f(tr)-f(out_tr), f(c)-f(out20), f(c)-f(out50)])
+        if commit:
+            self.tr[k, self.h14[k]]=tr; self.close[k, self.h50[k]]=c
+            self.h14[k]=(self.h14[k]+1) % self.W_TR; self.h50[k]=(self.h50[k]+1) % self.W_CLOSE
+            self.sums[k]=sums; self.cnts[k]=cnts; self.prev[k]=c
+            wrap=k[(self.h14[k]==0) | (self.h50[k]==0)]
+            if len(wrap): self._resum(wrap)
+        return self._values(sums, cnts)
+
+    def _values(self, sums, cnts):
+        mins=np.array([self.MIN_PERIODS[c] for c in ("ATR14", "MA20", "MA50")])
+        with np.errstate(divide="ignore", invalid="ignore"):
+            v=np.where(cnts>=mins, sums/np.maximum(cnts, 1), np.nan)
+        return {"ATR14": v[:, 0], "MA20": v[:, 1], "MA50": v[:, 2]}
+
+    def append(self, bars):
+        """Barres closes (Ticker, Date, High, Low, Close), une ou plusieurs par ticker, postérieures à l’état."""
+        bars=bars.sort_values(["Ticker", "Date"], kind="stable")
+        rnd=bars.groupby("Ticker", sort=False).cumcount().to_numpy()
+        for r in range(int(rnd.max())+1 if len(rnd) else 0):
+            b=bars[rnd==r]
+            k=self._rows(b["Ticker"].tolist())
+            self._step(k, *(b[c].to_numpy(dtype=float) for c in ("Close", "High", "Low")), commit=True)
+            self.last_date[k]=pd.to_datetime(b["Date"]).to_numpy(dtype="datetime64[ns]")
+
+    def values(self, tickers):
+        k=np.array([self.pos[t] for t in tickers], dtype=np.int64)
+        return self._values(self.sums[k], self.cnts[k])
+
+    # ---------- synchronisation sur un historique long ----------
+    def sync(self, df):
+        """
+        df long trié Ticker/Date → indicateurs de la dernière barre (DataFrame indexé par Ticker).
+        Seules les dernières lignes de chaque ticker sont lues : barre d’ancrage (dernière barre
+        intégrée) retrouvée parmi les W_CLOSE+1 dernières, barres suivantes ajoutées une à une.
+        Ticker inconnu, ancrage absent ou révisé (dividende / split) → réamorçage depuis df.
+        """
+        with self.lock:
+            tk=df["Ticker"].to_numpy(); n=len(tk)
+            if not n: return pd.DataFrame(columns=["ATR14", "MA20", "MA50"])
+            brk=np.flatnonzero(tk[1:]!=tk[:-1])+1
+            starts, ends = np.r_[0, brk], np.r_[brk, n]-1
+            names=tk[ends].tolist()
+            dates=pd.to_datetime(df["Date"]).to_numpy(dtype="datetime64[ns]")
+            col=lambda c: pd.to_numeric(df[c], errors="coerce").to_numpy(dtype=float)
+            close, high, low = col("Close"), col("High"), col("Low")
+
+            at=pd.Index(list(self.pos)).get_indexer(names); known=at>=0
+            anchor=np.full(len(names), np.datetime64("NaT"), dtype="datetime64[ns]"); anchor[known]=self.last_date[at[known]]
+            cand=ends[:, None]-np.arange(self.W_CLOSE+2)[None, :]
+            inside=cand>=starts[:, None]; cand=np.where(inside, cand, starts[:, None])
+            hit=inside & (dates[cand]==anchor[:, None])
+            good=known & hit.any(axis=1)
+            behind=np.where(good, hit.argmax(axis=1), 0)          # barres après l’ancrage (dernière incluse)
+            g=np.flatnonzero(good)
+            if len(g):                                              # historique révisé sur la fenêtre ?
+                ka=at[g]; ar=np.arange(self.W_CLOSE)
+                ring=self.close[ka[:, None], (self.h50[ka, None]+ar) % self.W_CLOSE]   # plus ancienne → ancrage
+                idx=(ends[g]-behind[g])[:, None]-ar[::-1]
+                seen=idx>=starts[g, None]
+                same=np.isclose(close[np.where(seen, idx, 0)], ring, rtol=1e-9, atol=0, equal_nan=True) | ~seen
+                good[g[~same.all(axis=1)]]=False
+                behind[~good]=0
+
+            rs=np.flatnonzero(~good)
+            if len(rs):
+                sizes=ends[rs]-starts[rs]                           # sans la dernière barre (provisoire)
+                rows=np.concatenate([np.arange(st, en) for st, en in zip(starts[rs], ends[rs])]) if sizes.sum() else np.zeros(0, dtype=np.int64)
+                seeded=[names[i] for i in rs[sizes>0]]
+                if seeded:
+                    part=df.iloc[rows]
+                    codes, prow, n_rows, n_tk = _panel_index(part)
+                    wide=lambda c: _to_wide(part[c], codes, prow, n_rows, n_tk)
+                    self.seed(seeded, wide("Close"), wide("High"), wide("Low"), dates[ends[rs[sizes>0]]-1])
+                for i in rs[sizes==0]:                              # une seule barre : état vide
+                    self._reset(self._rows([names[i]])[0])
+            k=self._rows(names)
+
+            for r in range(1, int(behind.max()) if len(behind) else 0):   # barres closes manquantes
+                sel=np.flatnonzero(good & (behind>r))
+                idx=ends[sel]-behind[sel]+r
+                self._step(k[sel], close[idx], high[idx], low[idx], commit=True)
+                self.last_date[k[sel]]=dates[idx]
+
+            out=self._values(self.sums[k], self.cnts[k])
+            pending=~good | (behind>0)
+            if pending.any():
+                e=ends[pending]
+                peek=self._step(k[pending], close[e], high[e], low[e], commit=False)
+                for c in out: out[c][pending]=peek[c]
+            return pd.DataFrame(out, index=pd.Index(names, name="Ticker"))
+
+    def _reset(self, i):
+        self.close[i]=np.nan; self.tr[i]=np.nan; self.h50[i]=0; self.h14[i]=0
+        self.sums[i]=0; self.cnts[i]=0; self.prev[i]=np.nan; self.last_date[i]=np.datetime64("NaT")
+
+    # ---------- persistance ----------
+    def save(self, path=INDICATOR_STATE_PATH):
+        with self.lock:
+            arrays={"tickers": np.array(list(self.pos), dtype=str), "close": self.close.copy(), "tr": self.tr.copy(),
+                    "h50": self.h50.copy(), "h14": self.h14.copy(), "sums": self.sums.copy(), "cnts": self.cnts.copy(),
+                    "prev": self.prev.copy(), "last_date": self.last_date.astype("int64")}
+        def write(tmp):
+            with open(tmp, "wb") as f: np.savez(f, **arrays)
+        _write_atomic(path, write)
+
+    @classmethod
+    def load(cls, path=INDICATOR_STATE_PATH):
+        st=cls()
+        try:
+            with np.load(path, allow_pickle=False) as z:
+                st.pos={t: i for i, t in enumerate(z["tickers"].tolist())}
+                st.close, st.tr, st.h50, st.h14 = z["close"], z["tr"], z["h50"], z["h14"]
+                st.sums, st.cnts, st.prev = z["sums"], z["cnts"], z["prev"]
+                st.last_date=z["last_date"].astype("datetime64[ns]")
+        except Exception:
+            return cls()
+        return st
+
+_STREAM = None
+_STREAM_LOCK = threading.Lock()
+
+def indicator_stream():
+    """État incrémental partagé par le processus (relu depuis data/indicators.npz au premier appel)."""
+    global _STREAM
+    with _STREAM_LOCK:
+        if _STREAM is None: _STREAM=IndicatorStream.load()
+        return _STREAM
+
 # =========================
 # INFOS SOCIÉTÉ & DIVIDENDES
 # =========================
-@lru_cache(maxsize=1024)
+@ttl_cache(ttl=7*86400, maxsize=1024)
 def company_name_from_ticker(ticker: str) -> str:
     if not ticker: return ""
     try:
@@ -380,11 +1314,11 @@ def dividends_summary(ticker: str):
 # =========================
 # NEWS (avec dates) & RÉSUMÉ
 # =========================
-@lru_cache(maxsize=256)
+@ttl_cache(ttl=1800, maxsize=256)
 def google_news_titles(query, lang="fr"):
-    url = f"https://news.google.com/rss/search?q={requests.utils.quote(query)}&hl={lang}-{lang.upper()}&gl={lang.upper()}&ceid={lang.upper()}:{lang.upper()}"
+    url = f"https://news.google.com/rss/search?q={quote(query)}&hl={lang}-{lang.upper()}&gl={lang.upper()}&ceid={lang.upper()}:{lang.upper()}"
     try:
-        xml = requests.get(url, headers=UA, timeout=12).text
+        xml = http_client.get(url, timeout=12).text
         import xml.etree.ElementTree as ET
         root = ET.fromstring(xml)
         items = []
@@ -409,24 +1343,98 @@ def filter_company_news(ticker, company_name, items):
             keep.append((title, link, pub))
     return keep
 
-def news_summary(name, ticker, lang="fr"):
+NEWS_POS=["résultats","bénéfice","contrat","relève","guidance","record","upgrade","partenariat","dividende","approbation"]
+NEWS_NEG=["profit warning","retard","procès","amende","downgrade","abaisse","enquête","rappel","départ","incident"]
+_POS_RE=re.compile("|".join(map(re.escape, NEWS_POS)))   # un seul passage multi-motifs par titre
+_NEG_RE=re.compile("|".join(map(re.escape, NEWS_NEG)))
+
+HEADLINES_DB = os.path.join(DATA_DIR, "headlines.db")
+HEADLINE_MEM_MAX = 20000
+_HEADLINE_MEM = OrderedDict() # hash → (compound, pos, neg), borné (les plus anciens sortent d’abord)
+_HEADLINE_UNSCORED = set()    # stockés sans compound (pas de lexique) : inutile de les relire tant qu’il manque
+_HEADLINES_LOCK = threading.Lock()
+
+def _headline_put(k, v):
+    _HEADLINE_MEM[k]=v
+    _HEADLINE_MEM.move_to_end(k)
+    while len(_HEADLINE_MEM)>HEADLINE_MEM_MAX: _HEADLINE_MEM.popitem(last=False)
+
+def _headline_key(title):
+    norm=" ".join(unicodedata.normalize("NFKC", title or "").lower().split())
+    return hashlib.sha1(norm.encode("utf-8")).hexdigest()
+
+def _headlines_db():
+    _ensure_data_dir()
+    conn=sqlite3.connect(HEADLINES_DB, timeout=10)
+    conn.execute("""CREATE TABLE IF NOT EXISTS headlines (
+        h TEXT PRIMARY KEY, title TEXT, compound REAL, pos INTEGER, neg INTEGER, pub TEXT, scored_at REAL)""")
+    return conn
+
+def score_headlines(items):
+    """
+    items: [(title, link, pub)] ou [title] → score par titre (VADER compound ± 0.2 mots-clés).
+    Chaque titre n’est évalué qu’une fois : mémoire → SQLite → calcul groupé des nouveaux.
+    Sans lexique VADER, le compound n’est pas mémorisé (réévalué quand il sera disponible).
+    """
+    rows=[(it, "", "") if isinstance(it, str) else tuple(it)[:3] for it in items]
+    keys=[_headline_key(t) for t, _, _ in rows]
+    no_sia=_SIA_READY and _SIA is None
+    fresh={}                  # scores de cet appel (indépendants des évictions de _HEADLINE_MEM)
+    todo=[k for k in dict.fromkeys(keys) if k not in _HEADLINE_MEM and not (no_sia and k in _HEADLINE_UNSCORED)]
+    if todo:
+        try:
+            with _HEADLINES_LOCK:
+                conn=_headlines_db()
+                try:
+                    for i in range(0, len(todo), 500):
+                        part=todo[i:i+500]
+                        q=f"SELECT h, compound, pos, neg FROM headlines WHERE h IN ({','.join('?'*len(part))}) AND compound IS NOT NULL"
+                        for h, c, p, n in conn.execute(q, part):
+                            _headline_put(h, (c, p, n)); fresh[h]=(c, p, n)
+                    new={}
+                    sia=_get_sia() if any(k not in _HEADLINE_MEM for k in todo) else None
+                    pending=set(todo)
+                    for k, (t, _, pub) in zip(keys, rows):
+                        if k not in pending or k in _HEADLINE_MEM or k in new: continue
+                        tl=t.lower()
+                        c=None
+                        if sia:
+                            try: c=sia.polarity_scores(tl)["compound"]
+                            except Exception: c=0.0
+                        new[k]=(t, c, int(bool(_POS_RE.search(tl))), int(bool(_NEG_RE.search(tl))), pub)
+                    if new:
+                        now=time.time()
+                        with conn:
+                            conn.executemany("INSERT OR REPLACE INTO headlines VALUES (?,?,?,?,?,?,?)",
+                                             [(k, t, c, p, n, pub, now) for k, (t, c, p, n, pub) in new.items()])
+                        for k, (_, c, p, n, _) in new.items():
+                            if c is not None:
+                                _headline_put(k, (c, p, n)); fresh[k]=(c, p, n); _HEADLINE_UNSCORED.discard(k)
+                            else:
+                                if len(_HEADLINE_UNSCORED)>=HEADLINE_MEM_MAX: _HEADLINE_UNSCORED.clear()
+                                _HEADLINE_UNSCORED.add(k)
+                finally:
+                    conn.close()
+        except Exception:
+            pass
+    scores=[]
+    for k, (t, _, _) in zip(keys, rows):
+        hit=fresh.get(k) or _HEADLINE_MEM.get(k)
+        if hit is None:   # pas de lexique ou base indisponible → calcul direct
+            tl=t.lower(); hit=(0.0, int(bool(_POS_RE.search(tl))), int(bool(_NEG_RE.search(tl))))
+        c, p, n = hit
+        scores.append((c or 0.0) + 0.2*p - 0.2*n)
+    return scores
+
+def news_summary(name, ticker, lang="fr", precomputed=True):
+    if precomputed:
+        pre=_precomputed_news(name, ticker, lang)
+        if pre is not None: return pre
     items = google_news_titles(f"{name} {ticker}", lang) or google_news_titles(name, lang)
     items = filter_company_news(ticker, name, items)
-    titles = [t for t, _, _ in items]
-    if not titles:
+    if not items:
         return ("Pas d’actualité saillante — mouvement technique / macro.", 0.0, [])
-    POS=["résultats","bénéfice","contrat","relève","guidance","record","upgrade","partenariat","dividende","approbation"]
-    NEG=["profit warning","retard","procès","amende","downgrade","abaisse","enquête","rappel","départ","incident"]
-    scores=[]
-    for t in titles:
-        s=0.0
-        if SIA:
-            try: s=SIA.polarity_scores(t.lower())["compound"]
-            except Exception: s=0.0
-        tl=t.lower()
-        if any(k in tl for k in POS): s += 0.2
-        if any(k in tl for k in NEG): s -= 0.2
-        scores.append(s)
+    scores=score_headlines(items)
     m=float(np.mean(scores)) if scores else 0.0
     txt = ("Hausse soutenue par des nouvelles positives."
            if m>0.15 else
@@ -435,6 +1443,30 @@ def news_summary(name, ticker, lang="fr"):
            "Actualité mitigée/neutre — mouvement surtout technique.")
     return (txt, m, items)
 
+NEWS_WORKERS = 8
+
+def news_summary_batch(pairs, lang="fr", deadline=15.0, max_workers=NEWS_WORKERS, precomputed=True):
+    """
+    pairs: [(name, ticker), ...] → {(name, ticker): (txt, score, items)}.
+    Flux RSS récupérés en parallèle (pool borné) ; seuls les résultats arrivés avant
+    l’échéance globale sont renvoyés (les retardataires alimentent quand même le cache).
+    """
+    from concurrent.futures import ThreadPoolExecutor, wait
+    pairs=list(dict.fromkeys((str(n or ""), str(t or "")) for n, t in pairs))
+    if not pairs: return {}
+    ex=ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(pairs))))
+    run=diagnostics.carry(news_summary)
+    futs={ex.submit(run, n, t, lang, precomputed): (n, t) for n, t in pairs}
+    done, _ = wait(futs, timeout=deadline)
+    ex.shutdown(wait=False, cancel_futures=True)
+    out={}
+    for f in done:
+        try:
+            out[futs[f]]=f.result()
+        except Exception:
+            continue
+    return out
+
 # =========================
 # DÉCISION IA & NIVEAUX
 # =========================
@@ -473,6 +1505,58 @@ def price_levels_from_row(row, profile="Neutre"):
         "stop":   round(base*p["stop_mult"],   2),
     }
 
+# --- Versions vectorisées (tableau de métriques entier → tableaux NumPy), mêmes résultats que ci-dessus
+def _num_col(df, col):
+    if col not in df.columns: return np.full(len(df), np.nan)
+    return pd.to_numeric(df[col], errors="coerce").to_numpy(dtype=float)
+
+def _decision_score(px, ma20, ma50, atr, pru, vol_max):
+    """Score de decision_label_from_row sur des tableaux de forme quelconque (lignes, séances × tickers…)."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        vol=np.where(np.isfinite(atr) & (px>0), atr/px, 0.03)
+    with np.errstate(invalid="ignore"):
+        trend=(np.isfinite(ma20) & (px>=ma20)).astype(int)+(np.isfinite(ma50) & (px>=ma50)).astype(int)
+        score=0.0+0.5*np.where(trend==2, 1, np.where(trend==1, 0, -1))
+        pru_ok=np.isfinite(pru) & (pru>0)
+        score=np.where(pru_ok, score+0.2*np.where(px>pru*1.02, 1, np.where(px<pru*0.98, -1, 0)), score)
+    return score+0.3*np.where(vol>vol_max, -1, 1)
+
+def decision_labels(df, held=False, vol_max=0.05):
+    """Équivalent de decision_label_from_row sur toutes les lignes → np.ndarray de libellés."""
+    px, ma20, ma50, atr, pru = (_num_col(df, c) for c in ("Close","MA20","MA50","ATR14","PRU"))
+    score=_decision_score(px, ma20, ma50, atr, pru, vol_max)
+    if held:
+        lab=np.where(score>0.5, "🟢 Acheter", np.where(score<-0.2, "🔴 Vendre", "🟠 Garder"))
+    else:
+        lab=np.where(score>0.3, "🟢 Acheter", np.where(score<-0.2, "🚫 Éviter", "👁️ Surveiller"))
+    return np.where(np.isfinite(px), lab, "👁️ Surveiller").astype(object)
+
+def _round2(a):
+    """Arrondi au centime identique à round(v, 2), pour un tableau de forme quelconque.
+    np.round ne diffère de round() qu’au voisinage d’un demi-centime : seules ces cases repassent par Python."""
+    a=np.asarray(a, dtype=float)
+    out=np.round(a, 2)
+    with np.errstate(invalid="ignore"):
+        f=a*100
+        amb=np.abs(f-np.floor(f)-0.5)<=1e-7*np.maximum(1.0, np.abs(f))
+    if amb.any():
+        out[amb]=[round(v, 2) for v in a[amb].tolist()]
+    return out
+
+def price_levels(df, profile="Neutre"):
+    """
+    Équivalent de price_levels_from_row sur toutes les lignes →
+    {"entry","target","stop","prox"} (prox = écart % du cours à l’entrée).
+    """
+    p=get_profile_params(profile)
+    px, ma20 = _num_col(df, "Close"), _num_col(df, "MA20")
+    base=np.where(np.isfinite(ma20), ma20, px)
+    out={k: _round2(base*p[f"{k}_mult"]) for k in ("entry","target","stop")}
+    e=out["entry"]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out["prox"]=np.where(np.isfinite(px) & np.isfinite(e) & (e>0), (px/e-1)*100, np.nan)
+    return out
+
 # =========================
 # STYLE TABLEAUX (couleurs)
 # =========================
@@ -488,46 +1572,184 @@ def style_variations(df, cols):
     return sty
 
 # =========================
-# AGGRÉGATION MARCHÉS (multi-indices)
+# PRÉCALCULS (planificateur)
 # =========================
-def fetch_all_markets(markets, days_hist=120):
+# scheduler.py dépose ici, après chaque clôture, les métriques par indice et les actualités
+# Top/Flop ; les pages les lisent tant qu’elles sont valides (jusqu’à la clôture suivante).
+PRECOMP_DIR = os.path.join(DATA_DIR, "precomputed")
+PRECOMP_NEWS_TTL = 4*3600
+_PRECOMP_MEM = {}             # chemin → (mtime, contenu)
+_PRECOMP_LOCK = threading.Lock()
+
+def _precomp_markets_path(days):
+    return os.path.join(PRECOMP_DIR, f"markets_{int(days)}d.parquet")
+
+def _precomp_news_path():
+    return os.path.join(PRECOMP_DIR, "news.json")
+
+def _precomp_read(path, loader):
+    """Relit le fichier seulement si son mtime a changé (les pages le consultent à chaque rendu)."""
+    try:
+        mtime=os.path.getmtime(path)
+    except OSError:
+        return None
+    with _PRECOMP_LOCK:
+        hit=_PRECOMP_MEM.get(path)
+    if hit is not None and hit[0]==mtime: return hit[1]
+    try:
+        val=loader(path)
+    except Exception:
+        val=None
+    with _PRECOMP_LOCK: _PRECOMP_MEM[path]=(mtime, val)
+    return val
+
+def _write_atomic(path, write):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp=f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    write(tmp)
+    os.replace(tmp, path)
+
+def _market_signature(idx):
+    """Le précalcul « LS Exchange » n’est valable que pour la watchlist avec laquelle il a été fait."""
+    if idx!="LS Exchange": return ""
+    return hashlib.sha1(json.dumps(load_watchlist_ls(), ensure_ascii=False).encode("utf-8")).hexdigest()[:12]
+
+def _market_expiry(tickers):
+    """Prochaine clôture (epoch) parmi les places des tickers — une évaluation par place."""
+    reps={}
+    for t in tickers: reps.setdefault(_session_of(t), t)
+    return min((session_state(t)[1] for t in reps.values()), default=time.time())
+
+def _load_precomputed_markets(path):
+    import pyarrow.parquet as pq
+    tbl=pq.read_table(path)
+    meta=json.loads((tbl.schema.metadata or {}).get(b"precomputed", b"{}"))
+    return tbl.to_pandas(), meta
+
+def save_precomputed_markets(df, days, indices):
     """
-    markets: liste de tuples (Indice, source) – ex:
-      [("CAC 40", None), ("DAX", None), ("NASDAQ 100", None), ("S&P 500", None)]
+    Remplace dans le précalcul `days` les lignes des `indices` fournis (les autres indices
+    restent tels quels) ; chaque indice garde sa propre échéance de validité.
     """
-    frames=[]
-    for idx, _ in markets:
-        if idx=="CAC 40":
-            mem=members_cac40()
-        elif idx=="DAX":
-            mem=members_dax()
-        elif idx=="NASDAQ 100":
-            mem=members_nasdaq100()
-        elif idx=="S&P 500":
-            mem=members_sp500()
-        elif idx=="LS Exchange":
-            ls_list = load_watchlist_ls()
-            tickers=[maybe_guess_yahoo(x) or x for x in ls_list] if ls_list else []
-            mem=pd.DataFrame({"ticker": tickers, "name": ls_list})
-        else:
-            continue
+    import pyarrow as pa, pyarrow.parquet as pq
+    path=_precomp_markets_path(days)
+    old=_precomp_read(path, _load_precomputed_markets)
+    frames, meta = [], {"days": int(days), "indices": {}}
+    if old is not None:
+        prev, pmeta = old
+        keep=[i for i in pmeta.get("indices", {}) if i not in indices]
+        if keep:
+            frames.append(prev[prev["Indice"].isin(keep)])
+            meta["indices"].update({i: pmeta["indices"][i] for i in keep})
+    now=time.time()
+    for idx in indices:
+        part=df[df["Indice"]==idx] if not df.empty else df
+        if part.empty: continue
+        frames.append(part)
+        meta["indices"][idx]={"computed_at": now, "valid_until": _market_expiry(part["Ticker"].unique()),
+                              "sig": _market_signature(idx), "rows": int(len(part))}
+    if not frames: return None
+    out=pd.concat(frames, ignore_index=True, sort=False)
+    tbl=pa.Table.from_pandas(out, preserve_index=False)
+    tbl=tbl.replace_schema_metadata({**(tbl.schema.metadata or {}), b"precomputed": json.dumps(meta).encode()})
+    _write_atomic(path, lambda tmp: pq.write_table(tbl, tmp))
+    return meta
 
-        if mem.empty: 
-            continue
+def precomputed_markets_status(days=120):
+    """{indice: {computed_at, valid_until, sig, rows}} du précalcul `days` (vide s’il n’existe pas)."""
+    got=_precomp_read(_precomp_markets_path(days), _load_precomputed_markets)
+    return dict(got[1].get("indices", {})) if got is not None else {}
 
-        px=fetch_prices(mem["ticker"].tolist(), days=days_hist)
-        if px.empty: 
-            continue
+def _precomputed_frames(indices, days):
+    """Indices encore valides dans le précalcul → {indice: DataFrame}."""
+    got=_precomp_read(_precomp_markets_path(days), _load_precomputed_markets)
+    if got is None: return {}
+    df, meta = got
+    now=time.time(); out={}
+    for idx in indices:
+        m=meta.get("indices", {}).get(idx)
+        if not m or m.get("valid_until", 0)<=now or m.get("sig", "")!=_market_signature(idx): continue
+        part=df[df["Indice"]==idx]
+        if not part.empty: out[idx]=part.reset_index(drop=True)
+    return out
 
-        met=compute_metrics(px).merge(mem, left_on="Ticker", right_on="ticker", how="left")
+def _news_key(name, ticker, lang):
+    return f"{lang}|{name}|{ticker}"
+
+def save_precomputed_news(results, lang="fr"):
+    """results: {(name, ticker): (txt, score, items)} (news_summary_batch) → fusion dans news.json."""
+    path=_precomp_news_path()
+    cur=dict(_precomp_read(path, lambda p: json.load(open(p, "r", encoding="utf-8"))) or {})
+    now=time.time()
+    cur={k: v for k, v in cur.items() if now-v.get("ts", 0)<PRECOMP_NEWS_TTL}
+    for (name, ticker), (txt, score, items) in results.items():
+        cur[_news_key(name, ticker, lang)]={"ts": now, "txt": txt, "score": float(score),
+                                            "items": [list(i) for i in items]}
+    def write(tmp):
+        with open(tmp, "w", encoding="utf-8") as f: json.dump(cur, f, ensure_ascii=False)
+    _write_atomic(path, write)
+    return len(cur)
+
+def _precomputed_news(name, ticker, lang="fr"):
+    cur=_precomp_read(_precomp_news_path(), lambda p: json.load(open(p, "r", encoding="utf-8")))
+    hit=(cur or {}).get(_news_key(name, ticker, lang))
+    if not hit or time.time()-hit.get("ts", 0)>=PRECOMP_NEWS_TTL: return None
+    return (hit["txt"], hit["score"], [tuple(i) for i in hit["items"]])
+
+# =========================
+# AGGRÉGATION MARCHÉS (multi-indices)
+# =========================
+def _compute_markets(indices, days_hist):
+    """Calcul direct → {indice: DataFrame} (une seule passe cours + métriques pour tous les indices)."""
+    mems=[]
+    for idx in indices:
+        mem=members(idx)
+        if not mem.empty:
+            mems.append((idx, mem))
+    if not mems: return {}
+
+    union=list(dict.fromkeys(t for _, mem in mems for t in mem["ticker"].tolist()))
+    px=fetch_prices(union, days=days_hist)
+    if px.empty: return {}
+    stream=indicator_stream()
+    met_all=compute_metrics(px, stream=stream)
+    try: stream.save()
+    except Exception: pass
+
+    out={}
+    for idx, mem in mems:
+        keep=set(mem["ticker"].astype(str).str.upper())
+        met=met_all[met_all["Ticker"].isin(keep)]
+        if met.empty:
+            continue
+        met=met.merge(mem, left_on="Ticker", right_on="ticker", how="left")
         met["Indice"]=idx
-        frames.append(met)
+        out[idx]=met
+    return out
 
+def fetch_all_markets(markets, days_hist=120, precomputed=True):
+    """
+    markets: liste de tuples (Indice, source) – ex:
+      [("CAC 40", None), ("DAX", None), ("NASDAQ 100", None), ("S&P 500", None)]
+    Les indices précalculés par le planificateur et encore valides sont lus tels quels ;
+    pour les autres, les membres sont dédoublonnés, téléchargés une seule fois
+    (lots parallèles), puis les métriques sont redistribuées par Indice.
+    """
+    indices=list(dict.fromkeys(idx for idx, _ in markets))
+    got=_precomputed_frames(indices, days_hist) if precomputed else {}
+    todo=[idx for idx in indices if idx not in got]
+    if todo: got.update(_compute_markets(todo, days_hist))
+    frames=[got[idx] for idx in indices if idx in got]
     return pd.concat(frames, ignore_index=True, sort=False) if frames else pd.DataFrame()
 
 # =========================
 # SÉLECTION IA OPTIMALE (TOP N)
 # =========================
+def ia_score(df):
+    """Score IA global (pondérations douces) : tendance + momentum 30j / 7j − volatilité."""
+    col=lambda c: df[c].fillna(0) if c in df.columns else 0.0
+    return col("trend_score")*50.0 + col("pct_30d")*100.0 + col("pct_7d")*50.0 - col("Volatilité")*10.0
+
 def select_top_actions(df, profile="Neutre", n=10):
     """
     Retourne les meilleures actions (≤ n) selon IA :
@@ -549,36 +1771,20 @@ def select_top_actions(df, profile="Neutre", n=10):
     data = data.dropna(subset=["Close"])
     data["Volatilité"] = data["ATR14"] / data["Close"]
 
-    # Score IA global (pondérations douces)
-    data["IA_Score"] = (
-        (data["trend_score"].fillna(0) * 50.0)
-        + (data["pct_30d"].fillna(0) * 100.0)
-        + (data["pct_7d"].fillna(0) * 50.0)
-        - (data["Volatilité"].fillna(0) * 10.0)
-    )
+    data["IA_Score"] = ia_score(data)
 
-    data["Décision_IA"] = data.apply(lambda r: decision_label_from_row(r, held=False, vol_max=vol_max), axis=1)
+    data["Décision_IA"] = decision_labels(data, held=False, vol_max=vol_max)
     filt = (data["Décision_IA"].str.contains("🟢", na=False)) & (data["Volatilité"] <= vol_max * 1.5)
-    data = data[filt].sort_values("IA_Score", ascending=False)
-
-    def _levels(r):
-        lev = price_levels_from_row(r, profile)
-        ecart_euro = None
-        prox_pct = None
-        if lev["entry"] and lev["target"] and lev["entry"] > 0:
-            ecart_euro = lev["target"] - lev["entry"]
-        if lev["entry"] and r.get("Close") and lev["entry"] > 0:
-            prox_pct = ((r["Close"] / lev["entry"]) - 1) * 100
-        return pd.Series({
-            "Entrée (€)": lev["entry"],
-            "Objectif (€)": lev["target"],
-            "Stop (€)": lev["stop"],
-            "Potentiel (€)": ecart_euro,
-            "Proximité (%)": prox_pct
-        })
-
-    levs = data.apply(_levels, axis=1)
-    top = pd.concat([data.reset_index(drop=True), levs.reset_index(drop=True)], axis=1).head(n)
+    top = data[filt].sort_values("IA_Score", ascending=False).head(n).reset_index(drop=True)
+
+    lev = price_levels(top, profile)
+    entry, close = lev["entry"], top["Close"].to_numpy(dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        top["Entrée (€)"] = entry
+        top["Objectif (€)"] = lev["target"]
+        top["Stop (€)"] = lev["stop"]
+        top["Potentiel (€)"] = np.where(entry > 0, lev["target"] - entry, np.nan)
+        top["Proximité (%)"] = np.where((entry > 0) & (close != 0), ((close / entry) - 1) * 100, np.nan)
 
     keep = ["Ticker","name","Close","MA20","MA50","trend_score","pct_7d","pct_30d",
             "Volatilité","IA_Score","Décision_IA",
@@ -604,3 +1810,929 @@ def select_top_actions(df, profile="Neutre", n=10):
     top["Proximité (%)"] = top["Proximité (%)"].round(2)
 
     return top.reset_index(drop=True)
+
+# =========================
+# PORTEFEUILLE — STOCKAGE TRANSACTIONNEL
+# =========================
+# Journal d’opérations (achat / vente / ajustement) dans SQLite ; les positions (quantité, PRU
+# moyen pondéré) en sont dérivées dans la même transaction. WAL + BEGIN IMMEDIATE : plusieurs
+# sessions écrivent sans se marcher dessus ni réécrire tout le fichier.
+PORTFOLIO_DB = os.path.join(DATA_DIR, "portfolio.db")
+PORTFOLIO_JSON = os.path.join(DATA_DIR, "portfolio.json")     # ancien format, importé une fois (laissé en place)
+PORTFOLIO_COLS = ["Ticker", "Type", "Qty", "PRU", "Name"]
+PORTFOLIO_SIDES = ("BUY", "SELL", "ADJ", "DEL")                # ADJ : quantité et PRU fixés tels quels ; DEL : ligne retirée
+_PORTFOLIO_LOCK = threading.Lock()
+
+def _portfolio_db():
+    _ensure_data_dir()
+    conn=sqlite3.connect(PORTFOLIO_DB, timeout=10, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS operations (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, ts REAL, date TEXT, ticker TEXT, account TEXT,
+            side TEXT, qty REAL, price REAL, name TEXT, note TEXT);
+        CREATE INDEX IF NOT EXISTS ops_ticker_account ON operations (ticker, account);
+        CREATE TABLE IF NOT EXISTS positions (
+            ticker TEXT, account TEXT, qty REAL, pru REAL, name TEXT, updated_at REAL,
+            PRIMARY KEY (ticker, account));
+        CREATE TABLE IF NOT EXISTS meta (k TEXT PRIMARY KEY, v TEXT);""")
+    return conn
+
+def _portfolio_pending_migration(conn):
+    return os.path.exists(PORTFOLIO_JSON) and conn.execute("SELECT 1 FROM meta WHERE k='json_migrated'").fetchone() is None
+
+def _portfolio_migrate(conn):
+    """portfolio.json (ancien format) → opérations ADJ, une seule fois (base vide uniquement)."""
+    if not _portfolio_pending_migration(conn): return
+    try:
+        rows=json.load(open(PORTFOLIO_JSON, "r", encoding="utf-8"))
+    except Exception:
+        rows=[]
+    if conn.execute("SELECT 1 FROM operations LIMIT 1").fetchone() is None:
+        for r in rows if isinstance(rows, list) else []:
+            if not _norm(r.get("Ticker") if isinstance(r.get("Ticker"), str) else ""): continue
+            _apply_operation(conn, r.get("Ticker"), r.get("Type") or "PEA", "ADJ", r.get("Qty"), r.get("PRU"),
+                             name=r.get("Name") or "", note="import portfolio.json")
+    conn.execute("INSERT OR REPLACE INTO meta VALUES ('json_migrated', ?)", (datetime.now().isoformat(timespec="seconds"),))
+
+def _num(v):
+    try:
+        v=float(v)
+    except (TypeError, ValueError):
+        return 0.0
+    return v if math.isfinite(v) else 0.0
+
+def _position_after(q0, pru0, side, qty, price):
+    if side=="BUY":
+        q1=q0+qty
+        return q1, ((q0*pru0+qty*price)/q1 if q1>0 else price)   # ligne à 0 titre : PRU = prix saisi
+    if side=="SELL":
+        q1=max(q0-qty, 0.0)
+        return q1, (pru0 if q1>0 else 0.0)
+    if side=="DEL":
+        return 0.0, 0.0
+    return qty, price
+
+def _upsert_position(conn, t, acc, qty, pru, name, now):
+    conn.execute("""INSERT INTO positions VALUES (?,?,?,?,?,?) ON CONFLICT (ticker, account) DO UPDATE
+                    SET qty=excluded.qty, pru=excluded.pru, name=excluded.name, updated_at=excluded.updated_at""",
+                 (t, acc, qty, pru, name, now))
+
+def _apply_operation(conn, ticker, account, side, qty, price, date=None, name="", note=""):
+    """Insère l’opération et met à jour la position (dans la transaction ouverte par l’appelant)."""
+    t, acc, side = _norm(ticker), str(account or "PEA"), str(side).upper()
+    if not t: raise ValueError("Ticker vide")
+    if side not in PORTFOLIO_SIDES: raise ValueError(f"Opération inconnue : {side}")
+    qty, price = _num(qty), _num(price)
+    cur=conn.execute("SELECT qty, pru, name FROM positions WHERE ticker=? AND account=?", (t, acc)).fetchone()
+    q0, pru0, name0 = cur if cur else (0.0, 0.0, "")
+    q1, pru1 = _position_after(q0, pru0, side, qty, price)
+    now=time.time()
+    conn.execute("INSERT INTO operations (ts, date, ticker, account, side, qty, price, name, note) VALUES (?,?,?,?,?,?,?,?,?)",
+                 (now, date or datetime.now().date().isoformat(), t, acc, side, qty, price, name or "", note or ""))
+    if side=="DEL":
+        conn.execute("DELETE FROM positions WHERE ticker=? AND account=?", (t, acc))
+    else:
+        _upsert_position(conn, t, acc, q1, pru1, name or name0 or "", now)
+    return {"Ticker": t, "Type": acc, "Qty": q1, "PRU": pru1, "Name": name or name0 or ""}
+
+def _portfolio_write(fn):
+    """Exécute fn(conn) dans une transaction d’écriture exclusive (BEGIN IMMEDIATE)."""
+    with _PORTFOLIO_LOCK:
+        conn=_portfolio_db()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                _portfolio_migrate(conn)
+                out=fn(conn)
+            except BaseException:
+                conn.execute("ROLLBACK"); raise
+            conn.execute("COMMIT")
+            invalidate_search_index()
+            return out
+        finally:
+            conn.close()
+
+def record_operation(ticker, account, side, qty, price, date=None, name="", note=""):
+    """
+    Enregistre un achat (BUY), une vente (SELL) ou un ajustement (ADJ) → position résultante.
+    PRU = moyenne pondérée des achats ; une vente ne le modifie pas (remis à 0 si la ligne est soldée).
+    """
+    return _portfolio_write(lambda c: _apply_operation(c, ticker, account, side, qty, price, date, name, note))
+
+def load_portfolio():
+    """Lignes du portefeuille, y compris à 0 titre (comme l’ancien JSON) → DataFrame Ticker / Type / Qty / PRU / Name."""
+    try:
+        conn=_portfolio_db()
+        try:
+            if _portfolio_pending_migration(conn): _portfolio_write(lambda c: None)
+            rows=conn.execute("SELECT ticker, account, qty, pru, name FROM positions ORDER BY rowid").fetchall()
+        finally:
+            conn.close()
+    except Exception:
+        rows=[]
+    return pd.DataFrame(rows, columns=PORTFOLIO_COLS).astype({"Qty": float, "PRU": float})
+
+def portfolio_position(ticker, account=None):
+    """Lecture indexée d’une ligne (ou de toutes les lignes du ticker si account=None)."""
+    conn=_portfolio_db()
+    try:
+        q="SELECT ticker, account, qty, pru, name FROM positions WHERE ticker=?"+(" AND account=?" if account else "")
+        rows=conn.execute(q, (_norm(ticker), account) if account else (_norm(ticker),)).fetchall()
+    finally:
+        conn.close()
+    return [dict(zip(PORTFOLIO_COLS, r)) for r in rows]
+
+def portfolio_operations(ticker=None, account=None, limit=500):
+    """Journal des opérations (plus récentes d’abord), filtrable par ticker / compte."""
+    where, args = [], []
+    if ticker: where.append("ticker=?"); args.append(_norm(ticker))
+    if account: where.append("account=?"); args.append(account)
+    conn=_portfolio_db()
+    try:
+        rows=conn.execute("SELECT id, date, ticker, account, side, qty, price, name, note FROM operations"
+                          + (" WHERE "+" AND ".join(where) if where else "") + " ORDER BY id DESC LIMIT ?",
+                          (*args, int(limit))).fetchall()
+    finally:
+        conn.close()
+    return pd.DataFrame(rows, columns=["id", "date", "ticker", "account", "side", "qty", "price", "name", "note"])
+
+def _portfolio_rows(df):
+    """Tableau Ticker / Type / Qty / PRU / Name → {(ticker, compte): (qty, pru, nom)} (doublons fusionnés)."""
+    out={}
+    for r in (df if df is not None else pd.DataFrame(columns=PORTFOLIO_COLS)).to_dict("records"):
+        t=_norm(r.get("Ticker") if isinstance(r.get("Ticker"), str) else "")
+        if not t: continue
+        acc=str(r.get("Type") or "PEA")
+        q, pru, nm = out.get((t, acc), (0.0, 0.0, ""))
+        q1=_num(r.get("Qty"))
+        pru=(q*pru+q1*_num(r.get("PRU")))/(q+q1) if q+q1 else _num(r.get("PRU"))
+        out[(t, acc)]=(q+q1, pru, nm or (r.get("Name") if isinstance(r.get("Name"), str) else "") or "")
+    return out
+
+def _same_row(a, b):
+    return a is not None and b is not None and abs(a[0]-b[0])<1e-9 and abs(a[1]-b[1])<1e-9 and (a[2] or "")==(b[2] or "")
+
+def sync_portfolio(df, base=None, note="édition"):
+    """
+    Tableau édité (Ticker / Type / Qty / PRU / Name) → une opération par ligne modifiée (ADJ),
+    ajoutée (ADJ) ou supprimée (DEL), le tout dans une seule transaction. Renvoie le nombre d’opérations.
+    base : tableau à partir duquel l’édition a été faite ; seules les lignes qui en diffèrent sont
+    écrites, si bien qu’une opération enregistrée entre-temps par une autre session est conservée.
+    Sans base (import), le tableau remplace tout le portefeuille.
+    """
+    want=_portfolio_rows(df)
+    def run(conn):
+        have={(t, a): (q, p, n) for t, a, q, p, n in conn.execute("SELECT ticker, account, qty, pru, name FROM positions")}
+        ref=have if base is None else _portfolio_rows(base)
+        n=0
+        for key in dict.fromkeys([*ref, *want]):
+            new=want.get(key)
+            if _same_row(ref.get(key), new): continue          # inchangée dans l’éditeur
+            if new is None:
+                if key not in have: continue                   # déjà retirée ailleurs
+                _apply_operation(conn, key[0], key[1], "DEL", 0.0, 0.0, note=note)
+            elif _same_row(have.get(key), new):
+                continue
+            else:
+                _apply_operation(conn, key[0], key[1], "ADJ", new[0], new[1], name=new[2], note=note)
+            n+=1
+        return n
+    return _portfolio_write(run)
+
+def reset_portfolio():
+    """Efface positions et journal."""
+    def run(conn):
+        conn.execute("DELETE FROM operations"); conn.execute("DELETE FROM positions")
+    _portfolio_write(run)
+
+def rebuild_positions():
+    """Recalcule toutes les positions depuis le journal (contrôle / réparation)."""
+    def run(conn):
+        ops=conn.execute("SELECT ticker, account, side, qty, price, name FROM operations ORDER BY id").fetchall()
+        conn.execute("DELETE FROM positions")
+        pos={}
+        for t, acc, side, qty, price, name in ops:
+            if side=="DEL":
+                pos.pop((t, acc), None); continue
+            q0, pru0, n0 = pos.get((t, acc), (0.0, 0.0, ""))
+            pos[(t, acc)]=(*_position_after(q0, pru0, side, qty, price), name or n0)
+        now=time.time()
+        for (t, a), (q, p, n) in pos.items(): _upsert_position(conn, t, a, q, p, n, now)
+        return len(pos)
+    return _portfolio_write(run)
+
+# =========================
+# PORTEFEUILLE — VALORISATION & BENCHMARK
+# =========================
+def portfolio_nav(holdings, prices, benchmark=None, benchmark_label=None):
+    """
+    holdings : lignes Ticker / Type (PEA, CTO…) / Qty ; prices : historique long (fetch_prices).
+    → valeur quotidienne (Date × [comptes…, "Total", benchmark_label]) : cours pivotés une fois
+    en matrice séances × tickers (report du dernier cours connu), puis un seul produit matriciel
+    par la matrice des quantités tickers × comptes. Le benchmark est ramené à la valeur initiale du Total.
+    La série démarre à la première séance où chaque ligne détenue a un cours.
+    """
+    if holdings is None or holdings.empty or prices is None or prices.empty or "Date" not in prices.columns:
+        return pd.DataFrame()
+    h=pd.DataFrame({
+        "Ticker": holdings["Ticker"].fillna("").astype(str).map(_norm),
+        "Type": holdings["Type"].fillna("PEA").astype(str) if "Type" in holdings.columns else "PEA",
+        "Qty": pd.to_numeric(holdings["Qty"], errors="coerce").fillna(0.0),
+    })
+    h=h[(h["Ticker"]!="") & (h["Qty"]!=0)]
+    b=_norm(benchmark) if benchmark else ""
+    tk_codes, tk_names = pd.factorize(prices["Ticker"])
+    col={str(t).upper(): j for j, t in enumerate(tk_names)}
+    want=[t for t in dict.fromkeys([*h["Ticker"], b]) if t in col]
+    d_codes, dates = pd.factorize(prices["Date"], sort=True)
+    grid=np.full((len(dates), len(tk_names)), np.nan)
+    grid[d_codes, tk_codes]=pd.to_numeric(prices["Close"], errors="coerce").to_numpy(dtype=float)
+    wide=pd.DataFrame(grid[:, [col[t] for t in want]], index=dates, columns=want).ffill()
+    held=[t for t in dict.fromkeys(h["Ticker"]) if t in wide.columns and wide[t].notna().any()]
+    if not held: return pd.DataFrame()
+    close=wide[held]
+    close=close[close.notna().all(axis=1)]
+    if close.empty: return pd.DataFrame()
+
+    accounts=list(dict.fromkeys(h.loc[h["Ticker"].isin(held), "Type"]))
+    qty=h.pivot_table(index="Ticker", columns="Type", values="Qty", aggfunc="sum")
+    qty=qty.reindex(index=held, columns=accounts, fill_value=0.0).fillna(0.0).to_numpy(dtype=float)
+    qty=np.column_stack([qty, qty.sum(axis=1)])               # dernière colonne : Total
+    nav=pd.DataFrame(close.to_numpy(dtype=float) @ qty, index=close.index, columns=[*accounts, "Total"])
+
+    if b and b in wide.columns:
+        bmk=wide[b].reindex(nav.index)
+        first=bmk.first_valid_index()
+        if first is not None and bmk[first]:
+            nav[benchmark_label or b]=bmk/bmk[first]*nav["Total"].iloc[0]
+    nav.index.name="Date"
+    return nav
+
+def nav_paths(nav):
+    """Valeurs (portfolio_nav) → variation % depuis la première valeur connue de chaque colonne."""
+    if nav is None or nav.empty: return pd.DataFrame()
+    base=nav.bfill().iloc[0]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return (nav/base.where(base!=0)-1)*100
+
+# =========================
+# SCREENER (multi-univers)
+# =========================
+# Table de facteurs colonnaire (1 ligne par ticker, tous univers confondus) + requêtes
+# « filtre / classement » évaluées en une passe NumPy sur les colonnes entières :
+#   screen("pct_30d > 5% and Volatilité < vol_max", rank_by="trend_score", k=20)
+SCREEN_UNIVERSES = ("CAC 40", "DAX", "NASDAQ 100", "S&P 500", "LS Exchange")
+SCREEN_FACTORS = ["Close", "trend_score", "gap20", "gap50", *CALENDAR_HORIZONS,
+                  "Volatilité", "ATR14", "MA20", "MA50", "IA_Score", "decision",
+                  "entry", "target", "stop", "prox", "Indices"]
+_SCREEN_ALIASES = {"atr_pct": "Volatilité", "vol": "Volatilité", "score": "IA_Score"}
+_SCREEN_FUNCS = {"abs": lambda a: np.abs(a), "min": lambda a, b: np.minimum(a, b),
+                 "max": lambda a, b: np.maximum(a, b), "isnan": lambda a: ~np.isfinite(a),
+                 "notnan": lambda a: np.isfinite(a)}
+_SCREEN_ARITY = {k: f.__code__.co_argcount for k, f in _SCREEN_FUNCS.items()}
+_PCT_RE = re.compile(r"(\d+(?:\.\d*)?|\.\d+)\s*%")
+_SCREEN_EXPR = OrderedDict()   # texte → AST validé (les mêmes requêtes reviennent à chaque rendu)
+_SCREEN_LOCK = threading.Lock()
+
+def factor_table(df, profile="Neutre"):
+    """
+    Métriques de fetch_all_markets → table de facteurs, 1 ligne par ticker :
+    rendements, écarts aux moyennes, Volatilité (ATR14 / cours), Score IA, décision et niveaux.
+    Un ticker présent dans plusieurs indices garde une ligne ; `Indices` les liste tous.
+    """
+    if df is None or df.empty or "Ticker" not in df.columns: return pd.DataFrame(columns=["Ticker", "name", *SCREEN_FACTORS])
+    data=df.dropna(subset=["Close"]) if "Close" in df.columns else df.iloc[0:0]
+    idx=(data.groupby("Ticker", sort=False)["Indice"].agg(lambda s: ", ".join(dict.fromkeys(s.astype(str))))
+         if "Indice" in data.columns else None)
+    t=data.drop_duplicates("Ticker").reset_index(drop=True)
+    for c in ("name", "trend_score", "gap20", "gap50", "ATR14", "MA20", "MA50", *CALENDAR_HORIZONS):
+        if c not in t.columns: t[c]=np.nan
+    px=t["Close"].to_numpy(dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t["Volatilité"]=np.where(px>0, t["ATR14"].to_numpy(dtype=float)/px, np.nan)
+    t["IA_Score"]=ia_score(t)
+    t["Décision_IA"]=decision_labels(t, held=False, vol_max=get_profile_params(profile)["vol_max"])
+    t["decision"]=t["Décision_IA"].str.split(" ", n=1).str[-1]   # libellé sans emoji (requêtes)
+    for k, v in price_levels(t, profile).items(): t[k]=v
+    t["Indices"]=t["Ticker"].map(idx) if idx is not None else ""
+    return t[["Ticker", "name", *SCREEN_FACTORS, "Décision_IA"]]
+
+@ttl_cache(ttl=900, maxsize=32)
+def screener_table(universes=SCREEN_UNIVERSES, days_hist=120, profile="Neutre"):
+    """Table de facteurs des univers demandés (précalculs du planificateur lus en priorité)."""
+    return factor_table(fetch_all_markets([(u, None) for u in universes], days_hist=days_hist), profile)
+
+SCREEN_MAX_POW = 4           # a**b : exposant littéral uniquement, borné
+
+def _screen_parse(expr):
+    import ast
+    expr=(expr or "").strip()
+    with _SCREEN_LOCK:
+        hit=_SCREEN_EXPR.get(expr)
+    if hit is not None: return hit
+    try:
+        tree=ast.parse(_PCT_RE.sub(r"(\1/100)", expr), mode="eval")
+    except SyntaxError as e:
+        raise ValueError(f"Expression invalide : {expr!r} ({e.msg})") from None
+    allowed=(ast.Expression, ast.BoolOp, ast.And, ast.Or, ast.UnaryOp, ast.Not, ast.USub, ast.UAdd,
+             ast.BinOp, ast.Add, ast.Sub, ast.Mult, ast.Div, ast.Pow, ast.Compare, ast.Lt, ast.LtE,
+             ast.Gt, ast.GtE, ast.Eq, ast.NotEq, ast.In, ast.NotIn, ast.Name, ast.Load, ast.Constant, ast.Call)
+    for node in ast.walk(tree):
+        if not isinstance(node, allowed):
+            raise ValueError(f"Élément non autorisé dans {expr!r} : {type(node).__name__}")
+        if isinstance(node, ast.Call) and not (isinstance(node.func, ast.Name) and node.func.id in _SCREEN_FUNCS and not node.keywords):
+            raise ValueError(f"Fonction inconnue dans {expr!r} (autorisées : {', '.join(_SCREEN_FUNCS)})")
+        if isinstance(node, ast.Call) and len(node.args)!=_SCREEN_ARITY[node.func.id]:
+            n=_SCREEN_ARITY[node.func.id]
+            raise ValueError(f"{node.func.id}() attend {n} argument{'s' if n>1 else ''} dans {expr!r}")
+        if isinstance(node, ast.BinOp) and isinstance(node.op, ast.Pow):   # 10**10**10 bloquerait la page
+            e=node.right.operand if isinstance(node.right, ast.UnaryOp) and isinstance(node.right.op, (ast.USub, ast.UAdd)) else node.right
+            if not (isinstance(e, ast.Constant) and type(e.value) in (int, float) and abs(e.value)<=SCREEN_MAX_POW):
+                raise ValueError(f"Puissance non autorisée dans {expr!r} : exposant numérique littéral, |exposant| ≤ {SCREEN_MAX_POW}")
+    with _SCREEN_LOCK:
+        _SCREEN_EXPR[expr]=tree.body
+        while len(_SCREEN_EXPR)>256: _SCREEN_EXPR.popitem(last=False)
+    return tree.body
+
+def _screen_text(v):
+    return isinstance(v, str) or (isinstance(v, np.ndarray) and v.dtype.kind in "OUS")
+
+def _screen_eval(node, env):
+    """Évaluation vectorisée : and / or / not → & | ~ ; comparaisons enchaînées ; NaN → faux."""
+    import ast, operator as op
+    ev=lambda n: _screen_eval(n, env)
+    if isinstance(node, ast.Constant): return node.value
+    if isinstance(node, ast.Name):
+        name=_SCREEN_ALIASES.get(node.id, node.id)
+        if name not in env: raise ValueError(f"Colonne ou paramètre inconnu : {node.id}")
+        return env[name]
+    if isinstance(node, ast.BoolOp):
+        vals=[np.asarray(ev(v), dtype=bool) for v in node.values]
+        out=vals[0]
+        for v in vals[1:]: out=(out & v) if isinstance(node.op, ast.And) else (out | v)
+        return out
+    if isinstance(node, ast.UnaryOp):
+        v=ev(node.operand)
+        if isinstance(node.op, ast.Not): return ~np.asarray(v, dtype=bool)
+        if _screen_text(v): raise ValueError("Signe appliqué à du texte non autorisé")
+        return -v if isinstance(node.op, ast.USub) else v
+    if isinstance(node, ast.BinOp):
+        f={ast.Add: op.add, ast.Sub: op.sub, ast.Mult: op.mul, ast.Div: op.truediv, ast.Pow: op.pow}[type(node.op)]
+        left, right = ev(node.left), ev(node.right)
+        if _screen_text(left) or _screen_text(right):   # 'x'*10**9 : pas d’arithmétique sur du texte
+            raise ValueError("Opération arithmétique sur du texte non autorisée")
+        with np.errstate(divide="ignore", invalid="ignore"): return f(left, right)
+    if isinstance(node, ast.Call):
+        return _SCREEN_FUNCS[node.func.id](*[ev(a) for a in node.args])
+    if isinstance(node, ast.Compare):
+        cmp={ast.Lt: op.lt, ast.LtE: op.le, ast.Gt: op.gt, ast.GtE: op.ge, ast.Eq: op.eq, ast.NotEq: op.ne}
+        out, left = True, ev(node.left)
+        for o, r in zip(node.ops, node.comparators):
+            right=ev(r)
+            if isinstance(o, (ast.In, ast.NotIn)):   # "DAX" in Indices → sous-chaîne, ligne à ligne
+                hit=np.array([str(left) in str(s) for s in right], dtype=bool)
+                res=~hit if isinstance(o, ast.NotIn) else hit
+            else:
+                with np.errstate(invalid="ignore"): res=np.asarray(cmp[type(o)](left, right), dtype=bool)
+            out=out & res; left=right
+        return out
+    raise ValueError(f"Élément non autorisé : {type(node).__name__}")
+
+def _screen_run(expr, env, dtype, n):
+    """Expression → tableau de n valeurs ; toute erreur d’évaluation (types, débordement…) → ValueError."""
+    node=_screen_parse(expr)
+    try:
+        with np.errstate(over="ignore"):
+            return np.broadcast_to(np.asarray(_screen_eval(node, env), dtype=dtype), (n,))
+    except ValueError:
+        raise
+    except (TypeError, ArithmeticError) as e:   # UFuncTypeError est un TypeError
+        raise ValueError(f"Expression invalide : {expr!r} ({e})") from None
+
+def screen(where="", rank_by="trend_score", k=20, universes=SCREEN_UNIVERSES, days_hist=120,
+           profile="Neutre", ascending=False, table=None):
+    """
+    Filtre + classement sur la table de facteurs → top-k (DataFrame, colonne `rank_value`).
+      where   : expression booléenne, ex. "pct_30d > 5% and Volatilité < vol_max"
+      rank_by : expression numérique, ex. "trend_score" ou "pct_30d - 2*Volatilité"
+    Colonnes : SCREEN_FACTORS (+ alias atr_pct, vol, score) ; paramètres du profil (vol_max…) ;
+    fonctions abs/min/max/isnan/notnan ; « 5% » vaut 0.05. ValueError si l’expression est invalide.
+    """
+    t=screener_table(tuple(universes), days_hist, profile) if table is None else table
+    if t.empty: return t.assign(rank_value=pd.Series(dtype=float))
+    env={c: t[c].to_numpy() for c in t.columns}
+    env.update(get_profile_params(profile))
+    mask=np.ones(len(t), dtype=bool)
+    if (where or "").strip():
+        mask=_screen_run(where, env, bool, len(t))
+    score=_screen_run(rank_by or "IA_Score", env, float, len(t))
+    sel=np.flatnonzero(mask & np.isfinite(score))
+    key=score[sel] if ascending else -score[sel]
+    if 0 < k < len(sel):
+        part=np.argpartition(key, k-1)[:k]          # top-k sans tri complet
+        sel, key = sel[part], key[part]
+    sel=sel[np.argsort(key, kind="stable")]
+    return t.iloc[sel].assign(rank_value=score[sel]).reset_index(drop=True)
+
+# =========================
+# MODE LIVE (cotations intraday)
+# =========================
+# Interrogation périodique des derniers cours du portefeuille et de la watchlist, par lots. Seuls
+# les tickers dont le cours a changé sont recalculés : indicateurs de la barre du jour en O(1)
+# (barre provisoire d’IndicatorStream), décision, niveaux, proximités et P&L. La source est un
+# simple callable tickers → {ticker: prix} : Yahoo par défaut, ReplayQuotes pour rejouer un fichier.
+LIVE_INTERVAL_S = 30
+LIVE_BATCH = 100
+
+def yahoo_quotes(tickers):
+    """Dernier cours de la séance (bougies 1 min) → {ticker: prix} ; un seul téléchargement groupé."""
+    tickers=list(dict.fromkeys(t for t in tickers if t))
+    if not tickers: return {}
+    try:
+        raw=yf.download(tickers, period="1d", interval="1m", group_by="ticker", auto_adjust=False,
+                        progress=False, threads=True)
+    except Exception:
+        return {}
+    if raw is None or raw.empty: return {}
+    if getattr(raw.columns, "nlevels", 1)==1:   # un seul symbole, colonnes à plat
+        parts={tickers[0].upper(): raw} if len(tickers)==1 else {}
+    else:
+        parts={str(t).upper(): raw[t] for t in set(raw.columns.get_level_values(0))}
+    out={}
+    for t, part in parts.items():
+        c=pd.to_numeric(part["Close"], errors="coerce").dropna() if "Close" in part.columns else ()
+        if len(c): out[t]=float(c.iloc[-1])
+    return out
+
+class ReplayQuotes:
+    """
+    Cotations rejouées depuis un fichier local (CSV, JSONL ou tableau JSON ; champs ts / ticker / price).
+    Chaque LiveBoard.poll() avance d’un horodatage ; les cours non cités gardent leur dernière valeur,
+    comme une source réelle.
+    """
+    def __init__(self, path):
+        ext=os.path.splitext(str(path))[1].lower()
+        df=pd.read_json(path, lines=ext==".jsonl") if ext in (".jsonl", ".json") else pd.read_csv(path)
+        df=df.assign(ticker=df["ticker"].astype(str).str.strip().str.upper(),
+                     price=pd.to_numeric(df["price"], errors="coerce"))
+        self.steps=[dict(zip(g["ticker"], g["price"])) for _, g in df.groupby("ts", sort=True)]
+        self.i=-1; self.cur={}
+
+    @property
+    def done(self):
+        return self.i>=len(self.steps)-1
+
+    def advance(self):
+        if not self.done:
+            self.i+=1; self.cur.update(self.steps[self.i])
+
+    def __call__(self, tickers):
+        return {t: self.cur[t] for t in tickers if t in self.cur}
+
+class LiveBoard:
+    """
+    Tableau live portefeuille + watchlist. start() pose la base journalière une fois (historique,
+    état incrémental, toutes les lignes) ; poll() interroge la source par lots et ne renvoie que
+    les lignes recalculées. `table` = état complet courant (1 ligne par position / valeur suivie).
+    """
+    WATCH = "Watchlist"
+
+    def __init__(self, holdings=None, watch=(), profile=None, source=None, days=120, batch=LIVE_BATCH, now=None):
+        self.profile=profile or load_profile()
+        self.source=source or yahoo_quotes
+        self.days, self.batch, self.now = days, batch, now
+        h=pd.DataFrame(columns=PORTFOLIO_COLS) if holdings is None else holdings[PORTFOLIO_COLS]
+        h=h.assign(Ticker=[_norm(t) for t in h["Ticker"]])
+        h=h[h["Ticker"]!=""]
+        w=[t for t in dict.fromkeys(_norm(x) for x in watch) if t and t not in set(h["Ticker"])]
+        wdf=pd.DataFrame({"Ticker": w, "Type": self.WATCH, "Qty": np.nan, "PRU": np.nan, "Name": ""})
+        self.rows=pd.concat([h, wdf], ignore_index=True) if len(wdf) else h.reset_index(drop=True)
+        self.tickers=list(dict.fromkeys(self.rows["Ticker"]))
+        self.pos={t: i for i, t in enumerate(self.tickers)}
+        self.code=np.array([self.pos[t] for t in self.rows["Ticker"]], dtype=np.int64)
+        self.held=(self.rows["Type"]!=self.WATCH).to_numpy()
+        self.table=None; self.polls=0
+        self.lock=threading.Lock()
+
+    def start(self):
+        """Historique journalier → état incrémental + table complète (une seule fois par tableau)."""
+        n=len(self.tickers)
+        self.stream=IndicatorStream()
+        self.last, self.hi, self.lo, self.ref = (np.full(n, np.nan) for _ in range(4))
+        self.fresh=np.zeros(n, dtype=bool)           # barre du jour pas encore commencée
+        self.ind={c: np.full(n, np.nan) for c in ("ATR14", "MA20", "MA50")}
+        px=fetch_prices(self.tickers, days=self.days)
+        if not px.empty:
+            px=px.assign(Ticker=px["Ticker"].astype(str).str.upper())
+            px=px[px["Ticker"].isin(self.pos)].sort_values(["Ticker", "Date"], kind="stable").reset_index(drop=True)
+        if px.empty:
+            self.k=self.stream._rows(self.tickers)
+        else:
+            ind=self.stream.sync(px)
+            self.k=self.stream._rows(self.tickers)
+            last=px.groupby("Ticker", sort=False).tail(1)
+            j=np.array([self.pos[t] for t in last["Ticker"]], dtype=np.int64)
+            for c, a in (("Close", self.last), ("High", self.hi), ("Low", self.lo)):
+                a[j]=pd.to_numeric(last[c], errors="coerce").to_numpy(dtype=float)
+            self.ref[j]=self.stream.prev[self.k[j]]   # clôture précédant la dernière barre
+            for c in self.ind: self.ind[c][j]=ind[c].reindex(last["Ticker"]).to_numpy(dtype=float)
+            # dernière barre déjà close (hors séance) → intégrée ; la prochaine cotation ouvre une barre
+            closed=np.array([pd.Timestamp(d).normalize()<=pd.Timestamp(session_state(t, self.now)[0])
+                             for t, d in zip(last["Ticker"], last["Date"])], dtype=bool)
+            if closed.any():
+                self.stream.append(last[closed]); self.fresh[j[closed]]=True
+        self.table=self._derive(np.arange(len(self.rows)))
+        return self.table
+
+    def poll(self):
+        """Un passage : cotations par lots → lignes recalculées (DataFrame vide si rien n’a bougé)."""
+        if self.table is None: self.start()
+        advance=getattr(self.source, "advance", None)
+        if advance: advance()
+        quotes={}
+        for i in range(0, len(self.tickers), self.batch):
+            try:
+                quotes.update(self.source(self.tickers[i:i+self.batch]) or {})
+            except Exception:
+                pass
+        with self.lock:
+            self.polls+=1
+            got=[(self.pos[t], v) for t, v in quotes.items() if t in self.pos]
+            j=np.array([g[0] for g in got], dtype=np.int64); p=np.array([g[1] for g in got], dtype=float)
+            chg=np.isfinite(p) & ~np.isclose(p, self.last[j], rtol=1e-12, atol=0)
+            j, p = j[chg], p[chg]
+            if not len(j): return self.table.iloc[0:0]
+            f=j[self.fresh[j]]
+            if len(f):
+                self.hi[f]=np.nan; self.lo[f]=np.nan; self.ref[f]=self.stream.prev[self.k[f]]; self.fresh[f]=False
+            self.last[j]=p; self.hi[j]=np.fmax(self.hi[j], p); self.lo[j]=np.fmin(self.lo[j], p)
+            ind=self.stream._step(self.k[j], p, self.hi[j], self.lo[j], commit=False)
+            for c in self.ind: self.ind[c][j]=ind[c]
+            delta=self._derive(np.flatnonzero(np.isin(self.code, j)))
+            self.table.loc[delta.index, delta.columns]=delta
+            return delta
+
+    def _derive(self, rows):
+        """Lignes `rows` recalculées depuis l’état courant (cours, indicateurs, niveaux, décision, P&L)."""
+        r=self.rows.iloc[rows]; c=self.code[rows]
+        px, ref = self.last[c], self.ref[c]
+        qty, pru = r["Qty"].to_numpy(dtype=float), r["PRU"].to_numpy(dtype=float)
+        df=pd.DataFrame({"Ticker": r["Ticker"].to_numpy(), "Name": r["Name"].fillna("").to_numpy(),
+                         "Type": r["Type"].to_numpy(), "Qty": qty, "PRU": pru, "Close": px,
+                         **{k: v[c] for k, v in self.ind.items()}}, index=rows)
+        lev=price_levels(df, self.profile)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            df["pct_1d"]=np.where(ref>0, px/ref-1, np.nan)
+            for k in ("entry", "target", "stop", "prox"): df[k]=lev[k]
+            df["to_stop"]=np.where(lev["stop"]>0, (px/lev["stop"]-1)*100, np.nan)
+            df["to_target"]=np.where(px>0, (lev["target"]/px-1)*100, np.nan)
+            df["value"]=px*qty
+            df["pnl"]=(px-pru)*qty
+            df["pnl_pct"]=np.where(pru>0, (px/pru-1)*100, np.nan)
+        vm=get_profile_params(self.profile)["vol_max"]
+        dec=decision_labels(df, held=False, vol_max=vm)
+        held=self.held[rows]
+        if held.any(): dec[held]=decision_labels(df[held], held=True, vol_max=vm)
+        df["Décision_IA"]=dec
+        df["updated"]=time.time()
+        return df
+
+# =========================
+# BACKTEST (signal IA + niveaux)
+# =========================
+# Rejoue l’historique journalier d’un univers. À chaque clôture : score de decision_labels
+# (« 🟢 Acheter » hors portefeuille) et niveaux du profil (base MA20, comme price_levels) →
+# ordre limite à `entry` valable entry_days séances ; une fois exécuté, sortie au `stop`
+# (prioritaire si les deux niveaux sont touchés le même jour, y compris le jour d’achat), au
+# `target`, ou à la clôture après max_hold séances. Gaps exécutés à l’ouverture. Une position
+# au plus par ticker. Boucle sur les séances, vectorisée sur les tickers ; tickers répartis par
+# lots sur un pool de processus.
+BACKTEST_MAX_HOLD = 20
+BACKTEST_ENTRY_DAYS = 5
+BACKTEST_EXITS = ("stop", "target", "durée", "fin")
+
+def _backtest_panel(part, cal):
+    """Lot de tickers (long, trié Ticker/Date) → tableaux séances × tickers + n° de séance dans `cal`."""
+    codes, rows, n_rows, n_tk = _panel_index(part)
+    wide=lambda col: _to_wide(part[col], codes, rows, n_rows, n_tk) if col in part.columns else np.full((n_rows, n_tk), np.nan)
+    day=np.zeros((n_rows, n_tk), dtype=np.int64)
+    day[rows, codes]=np.searchsorted(cal, part["Date"].to_numpy(dtype="datetime64[ns]"))
+    return {"open": wide("Open"), "high": wide("High"), "low": wide("Low"), "close": wide("Close"),
+            "day": day, "tickers": np.asarray(sorted(part["Ticker"].unique()))}
+
+def _backtest_sim(P, ind, params, max_hold, entry_days, n_cal):
+    """Un jeu de paramètres sur un lot → transactions (tableaux) + P&L quotidien (somme, effectif) par séance."""
+    c, h, l, o, day = P["close"], P["high"], P["low"], P["open"], P["day"]
+    n_rows, n_tk = c.shape
+    buy=np.isfinite(c) & (_decision_score(c, ind["MA20"], ind["MA50"], ind["ATR14"], np.nan, params["vol_max"])>0.3)
+    base=np.where(np.isfinite(ind["MA20"]), ind["MA20"], c)
+    lv={k: _round2(base*params[f"{k}_mult"]) for k in ("entry", "target", "stop")}
+    buy&=np.isfinite(lv["entry"]) & (lv["entry"]>0)
+
+    held=np.zeros(n_tk, dtype=bool); pend=np.zeros(n_tk, dtype=bool)
+    p_exp=np.zeros(n_tk, dtype=np.int64); d_in=np.zeros(n_tk, dtype=np.int64); e_day=np.zeros(n_tk, dtype=np.int64)
+    p_e, p_t, p_s, e_px, t_px, s_px, mark = (np.full(n_tk, np.nan) for _ in range(7))
+    pnl_sum=np.zeros(n_cal); pnl_cnt=np.zeros(n_cal, dtype=np.int64)
+    tr={k: [] for k in ("tk", "entry_day", "exit_day", "entry", "exit", "reason")}
+
+    def close_out(sel, xp, why, dt):
+        tr["tk"].append(sel); tr["entry_day"].append(e_day[sel]); tr["exit_day"].append(dt)
+        tr["entry"].append(e_px[sel]); tr["exit"].append(xp); tr["reason"].append(why)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        for t in range(n_rows):
+            ct, ht, lt, ot, dt = c[t], h[t], l[t], o[t], day[t]
+            bar=np.isfinite(ct); gap=np.isfinite(ot)
+            # 1) sorties des positions ouvertes avant t
+            pos=held & bar
+            if pos.any():
+                stp=pos & (lt<=s_px); tgt=pos & ~stp & (ht>=t_px); tmo=pos & ~stp & ~tgt & (t-d_in>=max_hold)
+                xp=np.where(stp, np.where(gap, np.minimum(s_px, ot), s_px),
+                            np.where(tgt, np.where(gap, np.maximum(t_px, ot), t_px), ct))
+                k=np.flatnonzero(pos)
+                np.add.at(pnl_sum, dt[k], xp[k]/mark[k]-1); np.add.at(pnl_cnt, dt[k], 1)
+                mark[k]=ct[k]
+                for why, m in enumerate((stp, tgt, tmo)):
+                    sel=np.flatnonzero(m)
+                    if len(sel): close_out(sel, xp[sel], np.full(len(sel), why), dt[sel])
+                held&=~(stp | tgt | tmo)
+            # 2) ordres en attente : exécution si le plus bas touche l’entrée
+            fill=pend & bar & (lt<=p_e)
+            if fill.any():
+                k=np.flatnonzero(fill)
+                fp=np.where(gap[k], np.minimum(p_e[k], ot[k]), p_e[k])
+                held[k]=True; d_in[k]=t; e_day[k]=dt[k]
+                e_px[k]=fp; t_px[k]=p_t[k]; s_px[k]=p_s[k]
+                out=lt[k]<=s_px[k]                       # stop touché dans la séance d’achat
+                xp=np.where(out, np.minimum(s_px[k], fp), ct[k])
+                np.add.at(pnl_sum, dt[k], xp/fp-1); np.add.at(pnl_cnt, dt[k], 1)
+                mark[k]=ct[k]
+                if out.any():
+                    sel=k[out]; close_out(sel, xp[out], np.zeros(len(sel), dtype=np.int64), dt[sel])
+                    held[sel]=False
+            pend&=~fill & (t<p_exp)
+            # 3) signaux de clôture → nouvel ordre pour les séances suivantes
+            new=buy[t] & ~held & ~pend
+            if new.any():
+                pend|=new; p_exp[new]=t+entry_days
+                p_e[new]=lv["entry"][t][new]; p_t[new]=lv["target"][t][new]; p_s[new]=lv["stop"][t][new]
+
+    if held.any():                                      # positions encore ouvertes : clôturées au dernier cours
+        sel=np.flatnonzero(held)
+        close_out(sel, mark[sel], np.full(len(sel), 3), day[-1][sel])
+    cat=lambda v, dt: np.concatenate(v) if v else np.zeros(0, dtype=dt)
+    trades={k: cat(v, float if k in ("entry", "exit") else np.int64) for k, v in tr.items()}
+    return {"trades": trades, "pnl_sum": pnl_sum, "pnl_cnt": pnl_cnt}
+
+def _backtest_shard(part, cal, param_sets, max_hold, entry_days):
+    """Tâche d’un processus : indicateurs du lot une seule fois, puis chaque jeu de paramètres."""
+    P=_backtest_panel(part, cal)
+    ind=indicator_panel(P["close"], P["high"], P["low"])
+    return P["tickers"], [_backtest_sim(P, ind, p, max_hold, entry_days, len(cal)) for p in param_sets]
+
+def _backtest_stats(trades, pnl_sum, pnl_cnt):
+    """Transactions + P&L quotidien → statistiques d’un jeu de paramètres."""
+    ret=trades["exit"]/trades["entry"]-1
+    why=trades["reason"]
+    daily=np.where(pnl_cnt>0, pnl_sum/np.maximum(pnl_cnt, 1), 0.0)   # équipondéré entre positions, 0 hors marché
+    equity=np.cumprod(1+daily)
+    n=len(ret)
+    return {
+        "trades": n,
+        "hit_rate": float((ret>0).mean()) if n else np.nan,
+        "target_rate": float((why==1).mean()) if n else np.nan,
+        "stop_rate": float((why==0).mean()) if n else np.nan,
+        "avg_return": float(ret.mean()) if n else np.nan,
+        "median_return": float(np.median(ret)) if n else np.nan,
+        "avg_hold": float((trades["exit_day"]-trades["entry_day"]).mean()) if n else np.nan,
+        "total_return": float(equity[-1]-1) if len(equity) else np.nan,
+        "max_drawdown": float((equity/np.maximum.accumulate(equity)-1).min()) if len(equity) else np.nan,
+        "exposure": float((pnl_cnt>0).mean()) if len(pnl_cnt) else np.nan,
+    }, equity
+
+def _backtest_run(df, param_sets, max_hold, entry_days, workers, shard):
+    """Découpe par lots de tickers, exécution (pool de processus si workers > 1), fusion par jeu de paramètres."""
+    df=df.assign(Ticker=df["Ticker"].astype(str).str.upper(), Date=pd.to_datetime(df["Date"]))
+    df=df.sort_values(["Ticker", "Date"], kind="stable").reset_index(drop=True)
+    cal=np.unique(df["Date"].to_numpy(dtype="datetime64[ns]"))
+    tk=df["Ticker"].to_numpy()
+    starts=np.r_[0, np.flatnonzero(tk[1:]!=tk[:-1])+1]
+    workers=max(1, min(workers or os.cpu_count() or 1, len(starts)))
+    shard=shard or -(-len(starts)//workers)      # par défaut un lot par processus (la boucle sur les séances coûte par lot)
+    cuts=np.r_[starts[::shard], len(df)]
+    parts=[df.iloc[a:b] for a, b in zip(cuts[:-1], cuts[1:])]
+    args=(parts, [cal]*len(parts), [param_sets]*len(parts), [max_hold]*len(parts), [entry_days]*len(parts))
+    workers=min(workers, len(parts))
+    if workers>1:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=workers) as ex:
+            res=list(ex.map(_backtest_shard, *args))
+    else:
+        res=list(map(_backtest_shard, *args))
+
+    out=[]
+    for j in range(len(param_sets)):
+        names=[tks[r[j]["trades"]["tk"]] for tks, r in res]
+        trades={k: np.concatenate([r[j]["trades"][k] for _, r in res]) for k in res[0][1][j]["trades"]}
+        trades["Ticker"]=np.concatenate(names) if names else np.zeros(0, dtype=object)
+        pnl_sum=np.sum([r[j]["pnl_sum"] for _, r in res], axis=0)
+        pnl_cnt=np.sum([r[j]["pnl_cnt"] for _, r in res], axis=0)
+        out.append((trades, pnl_sum, pnl_cnt))
+    return cal, out
+
+def backtest(df, profiles=None, max_hold=BACKTEST_MAX_HOLD, entry_days=BACKTEST_ENTRY_DAYS,
+             workers=None, shard=None):
+    """
+    Backtest du signal IA + niveaux sur un historique long (Ticker, Date, Open, High, Low, Close).
+    profiles : noms de PROFILE_PARAMS (tous par défaut). workers : processus (cœurs par défaut, 1 = sans pool) ;
+    shard : tickers par lot (défaut : un lot par processus).
+    → {"summary": statistiques par profil (trades, hit_rate, target_rate, stop_rate, avg_return,
+       median_return, avg_hold, total_return, max_drawdown, exposure),
+       "trades": une ligne par transaction, "equity": courbe équipondérée par profil}
+    """
+    profiles=list(profiles or PROFILE_PARAMS)
+    if df is None or df.empty:
+        return {"summary": pd.DataFrame(index=pd.Index(profiles, name="Profil")), "trades": pd.DataFrame(), "equity": pd.DataFrame()}
+    cal, runs = _backtest_run(df, [get_profile_params(p) for p in profiles], max_hold, entry_days, workers, shard)
+    stats, trades, equity = {}, [], {}
+    for prof, (tr, pnl_sum, pnl_cnt) in zip(profiles, runs):
+        stats[prof], equity[prof] = _backtest_stats(tr, pnl_sum, pnl_cnt)
+        trades.append(pd.DataFrame({
+            "Profil": prof, "Ticker": tr["Ticker"],
+            "entry_date": cal[tr["entry_day"]], "exit_date": cal[tr["exit_day"]],
+            "entry": tr["entry"], "exit": tr["exit"], "return": tr["exit"]/tr["entry"]-1,
+            "reason": np.asarray(BACKTEST_EXITS, dtype=object)[tr["reason"]],
+        }))
+    return {
+        "summary": pd.DataFrame.from_dict(stats, orient="index").rename_axis("Profil"),
+        "trades": pd.concat(trades, ignore_index=True).sort_values(["Profil", "entry_date", "Ticker"], kind="stable").reset_index(drop=True),
+        "equity": pd.DataFrame(equity, index=pd.DatetimeIndex(cal, name="Date")),
+    }
+
+def backtest_index(index, years=5, **kw):
+    """Backtest sur les membres actuels d’un indice (historique `years` ans via fetch_prices)."""
+    mem=members(index)
+    if mem.empty: return backtest(None, kw.get("profiles"))
+    return backtest(fetch_prices(mem["ticker"].tolist(), days=int(years*365.25)+90), **kw)
+
+# =========================
+# OPTIMISATION DES PROFILS (balayage de paramètres)
+# =========================
+# Évalue des jeux (vol_max, target_mult, stop_mult, entry_mult) autour de chaque profil de
+# PROFILE_PARAMS avec le moteur de backtest. Le panneau cours + indicateurs est calculé une fois
+# puis partagé en lecture seule (mémoire partagée) par les processus, qui reçoivent des lots de
+# jeux à évaluer. Entièrement hors ligne : stock Parquet local (stored_prices) ou données synthétiques.
+SWEEP_KEYS = ("vol_max", "target_mult", "stop_mult", "entry_mult")
+SWEEP_SCALES = {                                  # vol_max × échelle ; multiplicateurs : écart à 1 × échelle
+    "vol_max": (0.6, 0.8, 1.0, 1.25, 1.5),
+    "target_mult": (0.5, 0.75, 1.0, 1.5, 2.0),
+    "stop_mult": (0.5, 0.75, 1.0, 1.5, 2.0),
+    "entry_mult": (0.0, 0.5, 1.0, 2.0),
+}
+SWEEP_MIN_TRADES = 30
+_SWEEP_SHARED = {}          # côté processus : vues NumPy sur les blocs partagés
+
+def stored_prices(tickers=None, days=None):
+    """Historique long lu uniquement dans le stock Parquet local (aucun appel réseau) ; tous les tickers stockés par défaut."""
+    if tickers is None:
+        from urllib.parse import unquote
+        try:
+            tickers=sorted(unquote(f[:-8]) for f in os.listdir(PRICE_STORE_DIR) if f.endswith(".parquet"))
+        except OSError:
+            tickers=[]
+    tickers=[t for t in dict.fromkeys(_norm(t) for t in tickers) if t]
+    tables=[(t, tbl) for t, (tbl, _) in _store_load_many(tickers).items() if tbl is not None]
+    if not tables: return pd.DataFrame()
+    df=_tables_to_frame(tables)
+    df["Date"]=pd.to_datetime(df["Date"])
+    if days: df=df[df["Date"]>=pd.Timestamp.today().normalize()-pd.Timedelta(days=days)]
+    return df.reset_index(drop=True)
+
+def sweep_space(profile):
+    """Valeurs candidates par paramètre, centrées sur celles du profil."""
+    p=get_profile_params(profile)
+    out={"vol_max": sorted({round(p["vol_max"]*s, 4) for s in SWEEP_SCALES["vol_max"]})}
+    for k in ("target_mult", "stop_mult", "entry_mult"):
+        out[k]=sorted({round(1+(p[k]-1)*s, 4) for s in SWEEP_SCALES[k]})
+    return out
+
+def _sweep_candidates(profile, mode, n, rng):
+    """Jeux à évaluer (valeurs actuelles en tête) : grille complète ou n tirages uniformes dans ses bornes."""
+    space=sweep_space(profile)
+    base={k: get_profile_params(profile)[k] for k in SWEEP_KEYS}
+    if mode=="grid":
+        import itertools
+        cands=[dict(zip(SWEEP_KEYS, v)) for v in itertools.product(*(space[k] for k in SWEEP_KEYS))]
+    else:
+        cands=[{k: round(float(rng.uniform(min(space[k]), max(space[k]))), 4) for k in SWEEP_KEYS} for _ in range(n)]
+    ok=lambda c: c["stop_mult"]<c["entry_mult"]<c["target_mult"] and c["vol_max"]>0
+    return [base]+[c for c in cands if ok(c) and c!=base]
+
+def _pareto_front(ret, dd):
+    """Masque du front rendement (max) / drawdown (max, c.-à-d. le moins négatif)."""
+    ret, dd = np.asarray(ret, dtype=float), np.asarray(dd, dtype=float)
+    ok=np.isfinite(ret) & np.isfinite(dd)
+    idx=np.flatnonzero(ok)
+    order=idx[np.lexsort((-dd[idx], -ret[idx]))]
+    d=dd[order]
+    front=np.zeros(len(ret), dtype=bool)
+    front[order]=d>np.maximum.accumulate(np.r_[-np.inf, d[:-1]])
+    return front
+
+def _sweep_attach(spec):
+    """Initialisation d’un processus : vues en lecture seule sur les blocs partagés (aucune copie)."""
+    from multiprocessing import shared_memory
+    _SWEEP_SHARED.clear()
+    blocks=[]
+    for k, (name, shape, dtype) in spec.items():
+        shm=shared_memory.SharedMemory(name=name); blocks.append(shm)
+        a=np.ndarray(shape, dtype=dtype, buffer=shm.buf); a.flags.writeable=False
+        _SWEEP_SHARED[k]=a
+    _SWEEP_SHARED["_blocks"]=blocks
+
+def _sweep_task(param_sets, max_hold, entry_days, n_cal):
+    """Lot de jeux de paramètres sur le panneau partagé → statistiques (une par jeu)."""
+    S=_SWEEP_SHARED
+    P={k: S[k] for k in ("open", "high", "low", "close", "day")}
+    ind={k: S[k] for k in ("ATR14", "MA20", "MA50")}
+    return [_backtest_stats(**_backtest_sim(P, ind, p, max_hold, entry_days, n_cal))[0] for p in param_sets]
+
+def _sweep_eval(arrays, param_sets, max_hold, entry_days, n_cal, workers, chunk):
+    workers=max(1, min(workers or os.cpu_count() or 1, len(param_sets)))
+    chunk=chunk or max(1, -(-len(param_sets)//(workers*4)))
+    batches=[param_sets[i:i+chunk] for i in range(0, len(param_sets), chunk)]
+    rest=lambda x: [x]*len(batches)
+    if workers==1:
+        _SWEEP_SHARED.clear(); _SWEEP_SHARED.update(arrays)
+        try:
+            res=[_sweep_task(b, max_hold, entry_days, n_cal) for b in batches]
+        finally:
+            _SWEEP_SHARED.clear()
+    else:
+        from multiprocessing import shared_memory
+        from concurrent.futures import ProcessPoolExecutor
+        blocks, spec = [], {}
+        try:
+            for k, a in arrays.items():
+                shm=shared_memory.SharedMemory(create=True, size=max(1, a.nbytes)); blocks.append(shm)
+                np.ndarray(a.shape, dtype=a.dtype, buffer=shm.buf)[...]=a
+                spec[k]=(shm.name, a.shape, a.dtype.str)
+            with ProcessPoolExecutor(max_workers=workers, initializer=_sweep_attach, initargs=(spec,)) as ex:
+                res=list(ex.map(_sweep_task, batches, rest(max_hold), rest(entry_days), rest(n_cal)))
+        finally:
+            for shm in blocks:
+                shm.close(); shm.unlink()
+    return [s for r in res for s in r]
+
+def optimize_profiles(df, profiles=None, mode="random", n=64, seed=0, max_hold=BACKTEST_MAX_HOLD,
+                      entry_days=BACKTEST_ENTRY_DAYS, workers=None, chunk=None, min_trades=SWEEP_MIN_TRADES):
+    """
+    Balayage des paramètres de chaque profil sur un historique long (stored_prices, synthétique…).
+    mode : "random" (n tirages, graine `seed`) ou "grid" (produit complet de sweep_space).
+    Score = total_return / |max_drawdown| (NaN sous min_trades transactions).
+    → {"ranked": une ligne par (profil, jeu) : paramètres, statistiques de backtest, score, rank,
+       current (valeurs actuelles de PROFILE_PARAMS), pareto ;
+       "pareto": front rendement / drawdown de chaque profil}
+    """
+    profiles=list(profiles or PROFILE_PARAMS)
+    if df is None or df.empty: return {"ranked": pd.DataFrame(), "pareto": pd.DataFrame()}
+    rng=np.random.default_rng(seed)
+    jobs=[(prof, c) for prof in profiles for c in _sweep_candidates(prof, mode, n, rng)]
+    uniq=list(dict.fromkeys(tuple(c[k] for k in SWEEP_KEYS) for _, c in jobs))
+
+    df=df.assign(Ticker=df["Ticker"].astype(str).str.upper(), Date=pd.to_datetime(df["Date"]))
+    df=df.sort_values(["Ticker", "Date"], kind="stable").reset_index(drop=True)
+    cal=np.unique(df["Date"].to_numpy(dtype="datetime64[ns]"))
+    P=_backtest_panel(df, cal)
+    ind=indicator_panel(P["close"], P["high"], P["low"])
+    arrays={**{k: np.ascontiguousarray(P[k]) for k in ("open", "high", "low", "close", "day")},
+            **{k: np.ascontiguousarray(ind[k]) for k in ("ATR14", "MA20", "MA50")}}
+    stats=dict(zip(uniq, _sweep_eval(arrays, [dict(zip(SWEEP_KEYS, u)) for u in uniq],
+                                     max_hold, entry_days, len(cal), workers, chunk)))
+
+    t=pd.DataFrame([{"Profil": prof, **c, **stats[tuple(c[k] for k in SWEEP_KEYS)],
+                     "current": i==0} for prof in profiles
+                    for i, c in enumerate(c for p_, c in jobs if p_==prof)])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t["score"]=np.where(t["trades"]>=min_trades, t["total_return"]/np.maximum(-t["max_drawdown"], 1e-3), np.nan)
+    enough=t["trades"]>=min_trades
+    t["pareto"]=False
+    for prof, g in t[enough].groupby("Profil", sort=False):
+        t.loc[g.index, "pareto"]=_pareto_front(g["total_return"], g["max_drawdown"])
+    ranked=pd.concat([t[t["Profil"]==p].sort_values("score", ascending=False, kind="stable", na_position="last")
+                      for p in profiles], ignore_index=True)
+    ranked.insert(1, "rank", ranked.groupby("Profil", sort=False).cumcount()+1)
+    order={p: i for i, p in enumerate(profiles)}
+    pareto=(ranked[ranked["pareto"]].assign(_o=lambda d: d["Profil"].map(order))
+            .sort_values(["_o", "total_return"], ascending=[True, False], kind="stable").drop(columns="_o"))
+    return {"ranked": ranked, "pareto": pareto.reset_index(drop=True)}
+
+# =========================
+# DIAGNOSTICS
+# =========================
+# Toutes les fonctions publiques + les étapes réseau / calcul internes les plus lourdes.
+diagnostics.instrument_module(globals(), private=(
+    "_read_tables", "_members_snapshot", "_yf_download", "_fetch_with_store", "_calendar_returns",
+    "_compute_markets", "_precomputed_frames",
+))
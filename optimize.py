@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""
+Optimisation hors ligne des profils (PROFILE_PARAMS) : balayage de vol_max / target_mult /
+stop_mult / entry_mult autour de chaque profil, évalué par le moteur de backtest sur tous les cœurs.
+Aucun appel réseau : stock Parquet local (data/prices) ou marché synthétique.
+
+    python optimize.py --years 5                               # tout le stock local, 64 tirages / profil
+    python optimize.py --index "S&P 500" --mode grid           # membres du dernier snapshot, grille complète
+    python optimize.py --synthetic 500 --years 5 --out sweep.csv
+"""
+import sys, argparse, time
+import lib
+
+TOP = 5
+
+
+def _load(a):
+    if a.synthetic:
+        from bench import synthetic
+        return synthetic.synthetic_market(a.synthetic, int(a.years * 252), seed=a.seed)
+    tickers = None
+    if a.index:
+        mem = lib.members(a.index, offline=True)
+        if mem.empty:
+            print(f"Aucun snapshot local des membres de {a.index}.")
+            return None
+        tickers = mem["ticker"].tolist()
+    return lib.stored_prices(tickers, days=int(a.years * 365.25) + 90)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    src = ap.add_mutually_exclusive_group()
+    src.add_argument("--index", choices=sorted(lib.MEMBER_INDEXES), help="membres du snapshot local (défaut : tout le stock)")
+    src.add_argument("--synthetic", type=int, metavar="N", help="marché synthétique de N tickers")
+    ap.add_argument("--years", type=float, default=5)
+    ap.add_argument("--profile", action="append", choices=sorted(lib.PROFILE_PARAMS), help="répétable ; tous par défaut")
+    ap.add_argument("--mode", choices=["random", "grid"], default="random")
+    ap.add_argument("-n", type=int, default=64, help="tirages par profil (mode random)")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--max-hold", type=int, default=lib.BACKTEST_MAX_HOLD)
+    ap.add_argument("--entry-days", type=int, default=lib.BACKTEST_ENTRY_DAYS)
+    ap.add_argument("--min-trades", type=int, default=lib.SWEEP_MIN_TRADES)
+    ap.add_argument("--workers", type=int, default=None, help="processus (défaut : nombre de cœurs)")
+    ap.add_argument("--out", help="export CSV du classement complet")
+    a = ap.parse_args(argv)
+
+    df = _load(a)
+    if df is None or df.empty:
+        print("Aucun historique disponible hors ligne (stock local vide ?).")
+        return 1
+    t0 = time.perf_counter()
+    res = lib.optimize_profiles(df, profiles=a.profile, mode=a.mode, n=a.n, seed=a.seed, max_hold=a.max_hold,
+                                entry_days=a.entry_days, workers=a.workers, min_trades=a.min_trades)
+    ranked = res["ranked"]
+    print(f"{df['Ticker'].nunique()} tickers, {len(ranked)} évaluations en {time.perf_counter() - t0:.1f} s\n")
+
+    cols = ["rank", *lib.SWEEP_KEYS, "trades", "hit_rate", "avg_return", "total_return", "max_drawdown", "score"]
+    for prof, g in ranked.groupby("Profil", sort=False):
+        cur = g[g["current"]]
+        print(f"=== {prof} — actuel : rang {int(cur['rank'].iloc[0])} / {len(g)}")
+        print(g.head(TOP)[cols].round(4).to_string(index=False))
+        front = res["pareto"][res["pareto"]["Profil"] == prof]
+        print(f"--- front de Pareto rendement / drawdown ({len(front)})")
+        print(front[cols].round(4).to_string(index=False), "\n")
+    if a.out:
+        ranked.to_csv(a.out, index=False)
+        print(f"→ {a.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
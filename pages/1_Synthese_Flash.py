@@ -1,16 +1,20 @@
 # -*- coding: utf-8 -*-
 import streamlit as st, pandas as pd, numpy as np, altair as alt
+import diagnostics
 from lib import (
     fetch_all_markets, style_variations, load_profile, save_profile,
-    news_summary, select_top_actions
+    news_summary_batch, select_top_actions, resolve_watchlist_ls
 )
 
 st.set_page_config(page_title="Synthèse Flash", page_icon="⚡", layout="wide")
 st.title("⚡ Synthèse Flash — Marché Global")
 
 # ---------------- Sidebar ----------------
-periode = st.sidebar.radio("Période d’analyse", ["Jour","7 jours","30 jours"], index=0)
-value_col = {"Jour":"pct_1d","7 jours":"pct_7d","30 jours":"pct_30d"}[periode]
+PERIODES = {"Jour":"pct_1d","7 jours":"pct_7d","30 jours":"pct_30d","90 jours":"pct_90d","YTD":"pct_ytd","1 an":"pct_1y"}
+periode = st.sidebar.radio("Période d’analyse", list(PERIODES), index=0)
+value_col = PERIODES[periode]
+# historique suffisant pour les horizons longs (YTD / 1 an)
+days_hist = 400 if value_col in ("pct_ytd","pct_1y") else 120
 
 profil = st.sidebar.radio("Profil IA", ["Prudent","Neutre","Agressif"], 
                           index=["Prudent","Neutre","Agressif"].index(load_profile()))
@@ -24,6 +28,8 @@ include_eu = st.sidebar.checkbox("🇫🇷 CAC 40 + 🇩🇪 DAX", value=True)
 include_us = st.sidebar.checkbox("🇺🇸 NASDAQ 100 + S&P 500", value=False)
 include_ls = st.sidebar.checkbox("🧠 LS Exchange (perso)", value=False)
 
+diag = diagnostics.page("Synthèse Flash", st)
+
 # ---------------- Données marchés ----------------
 MARKETS = []
 if include_eu:
@@ -37,17 +43,23 @@ if not MARKETS:
     st.warning("Aucun marché sélectionné. Active au moins un marché dans la barre latérale.")
     st.stop()
 
-data = fetch_all_markets(MARKETS, days_hist=120)
+data = fetch_all_markets(MARKETS, days_hist=days_hist)
+if include_ls:
+    ls_unresolved = resolve_watchlist_ls()["unresolved"]
+    if ls_unresolved:
+        st.sidebar.caption(f"⚠️ LS non résolues ({len(ls_unresolved)}) : {', '.join(ls_unresolved)}")
 
 if data.empty:
     st.warning("Aucune donnée disponible (vérifie la connectivité ou ta sélection de marchés).")
     st.stop()
 
-for c in ["pct_1d","pct_7d","pct_30d"]:
+for c in PERIODES.values():
     if c not in data.columns:
         data[c] = np.nan
 valid = data.dropna(subset=["Close"]).copy()
 
+diag.mark("Données marchés")
+
 # ---------------- Résumé global ----------------
 avg = (valid[value_col].dropna().mean() * 100.0) if not valid.empty else np.nan
 up = int((valid[value_col] > 0).sum())
@@ -70,6 +82,8 @@ if np.isfinite(disp):
 
 st.divider()
 
+diag.mark("Résumé global")
+
 # ---------------- Top / Flop élargi (10 + / -) ----------------
 st.subheader(f"🏆 Top 10 hausses & ⛔ Baisses — {periode}")
 
@@ -96,6 +110,8 @@ with col2:
 
 st.divider()
 
+diag.mark("Top / Flop")
+
 # ---------------- Sélection IA TOP 10 ----------------
 st.subheader("🚀 Sélection IA — Opportunités idéales (TOP 10)")
 top_actions = select_top_actions(valid, profile=profil, n=10)
@@ -164,6 +180,8 @@ else:
 
 st.divider()
 
+diag.mark("Sélection IA")
+
 # ---------------- Charts simples ----------------
 st.markdown("### 📊 Visualisation rapide")
 def bar_chart(df, title):
@@ -189,22 +207,32 @@ col3, col4 = st.columns(2)
 with col3: bar_chart(top, f"Top 10 hausses ({periode})")
 with col4: bar_chart(flop, f"Top 10 baisses ({periode})")
 
+diag.mark("Graphiques")
+
 # ---------------- Actualités ----------------
 st.markdown("### 📰 Actualités principales")
-def short_news(row):
-    nm = str(row.get("Société") or "")
-    tk = str(row.get("Ticker") or "")
-    txt, score, items = news_summary(nm, tk, lang="fr")
-    return txt
-
-if not top.empty:
-    st.markdown("**Top hausses — explication probable :**")
-    for _, r in top.iterrows():
-        st.markdown(f"- **{r['Société']} ({r['Ticker']})** : {short_news(r)}")
-if not flop.empty:
-    st.markdown("**Baisses — explication probable :**")
-    for _, r in flop.iterrows():
-        st.markdown(f"- **{r['Société']} ({r['Ticker']})** : {short_news(r)}")
+# Les cours sont déjà affichés : on pose des emplacements puis on les remplit
+# avec ce que le lot d’actualités (parallèle, échéance globale) a pu récupérer.
+slots = []
+for title, df in (("**Top hausses — explication probable :**", top),
+                  ("**Baisses — explication probable :**", flop)):
+    if df.empty: continue
+    st.markdown(title)
+    for _, r in df.iterrows():
+        nm, tk = str(r.get("Société") or ""), str(r.get("Ticker") or "")
+        ph = st.empty()
+        ph.markdown(f"- **{nm} ({tk})** : ⏳ …")
+        slots.append((ph, nm, tk))
+
+if slots:
+    news = news_summary_batch([(nm, tk) for _, nm, tk in slots], lang="fr", deadline=15.0)
+    for ph, nm, tk in slots:
+        res = news.get((nm, tk))
+        txt = res[0] if res else "Actualités indisponibles pour le moment (délai dépassé)."
+        ph.markdown(f"- **{nm} ({tk})** : {txt}")
 
 st.divider()
 st.caption("💡 Active ou désactive les marchés US dans la barre latérale pour ajuster la vision mondiale.")
+
+diag.mark("Actualités")
+diag.finish()
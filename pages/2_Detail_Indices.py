@@ -10,8 +10,9 @@ Analyse IA complète d’un indice boursier :
 """
 
 import streamlit as st, pandas as pd, numpy as np, altair as alt
+import diagnostics
 from lib import (
-    fetch_all_markets, price_levels_from_row, decision_label_from_row,
+    fetch_all_markets, price_levels, decision_labels,
     style_variations, get_profile_params, load_profile
 )
 
@@ -26,22 +27,29 @@ indice = st.sidebar.selectbox(
     index=0
 )
 
-periode = st.sidebar.radio("Période d’analyse", ["Jour", "7 jours", "30 jours"], index=1)
-value_col = {"Jour": "pct_1d", "7 jours": "pct_7d", "30 jours": "pct_30d"}[periode]
+PERIODES = {"Jour": "pct_1d", "7 jours": "pct_7d", "30 jours": "pct_30d",
+            "90 jours": "pct_90d", "YTD": "pct_ytd", "1 an": "pct_1y"}
+periode = st.sidebar.radio("Période d’analyse", list(PERIODES), index=1)
+value_col = PERIODES[periode]
+days_hist = 400 if value_col in ("pct_ytd", "pct_1y") else 120
 
 profil = load_profile()
 st.sidebar.markdown(f"**Profil IA actif :** {profil}")
 
 st.divider()
 
+diag = diagnostics.page("Détails Indice", st)
+
 # ---------------- DONNÉES ----------------
-data = fetch_all_markets([(indice, None)], days_hist=120)
+data = fetch_all_markets([(indice, None)], days_hist=days_hist)
 if data.empty:
     st.warning("Aucune donnée disponible (vérifie la connectivité).")
     st.stop()
 
 merged = data.copy()
 
+diag.mark("Données")
+
 # ---------------- ANALYSE GLOBALE ----------------
 avg = merged[value_col].mean() * 100
 disp = merged[value_col].std() * 100
@@ -57,30 +65,26 @@ else:
 
 st.divider()
 
+diag.mark("Analyse globale")
+
 # ---------------- CLASSEMENT IA ----------------
-rows = []
 volmax = get_profile_params(profil)["vol_max"]
-for _, r in merged.iterrows():
-    levels = price_levels_from_row(r, profil)
-    dec = decision_label_from_row(r, held=False, vol_max=volmax)
-    entry, target, stop = levels["entry"], levels["target"], levels["stop"]
-    px = r.get("Close", np.nan)
-    prox = ((px / entry) - 1) * 100 if np.isfinite(px) and np.isfinite(entry) and entry > 0 else np.nan
-    emoji = "🟢" if abs(prox) <= 2 else ("⚠️" if abs(prox) <= 5 else "🔴")
-    rows.append({
-        "Société": r.get("name", ""),
-        "Ticker": r["Ticker"],
-        "Cours (€)": round(px, 2) if np.isfinite(px) else None,
-        "Variation (%)": round(r[value_col] * 100, 2) if np.isfinite(r[value_col]) else None,
-        "Entrée (€)": entry,
-        "Objectif (€)": target,
-        "Stop (€)": stop,
-        "Décision IA": dec,
-        "Proximité (%)": round(prox, 2) if np.isfinite(prox) else np.nan,
-        "Signal": emoji
-    })
-
-out = pd.DataFrame(rows)
+lev = price_levels(merged, profil)
+prox = lev["prox"]
+px = merged["Close"].astype(float)
+var = merged[value_col].astype(float) * 100
+out = pd.DataFrame({
+    "Société": merged.get("name", pd.Series("", index=merged.index)).to_numpy(),
+    "Ticker": merged["Ticker"].to_numpy(),
+    "Cours (€)": px.round(2).to_numpy(),
+    "Variation (%)": var.round(2).to_numpy(),
+    "Entrée (€)": lev["entry"],
+    "Objectif (€)": lev["target"],
+    "Stop (€)": lev["stop"],
+    "Décision IA": decision_labels(merged, held=False, vol_max=volmax),
+    "Proximité (%)": np.round(prox, 2),
+    "Signal": np.where(np.abs(prox) <= 2, "🟢", np.where(np.abs(prox) <= 5, "⚠️", "🔴")),
+})
 if out.empty:
     st.info("Aucune donnée exploitable pour cet indice.")
     st.stop()
@@ -94,6 +98,8 @@ def sort_key(val):
 out["sort"] = out["Décision IA"].apply(sort_key)
 out = out.sort_values(["sort", "Proximité (%)"], ascending=[True, True]).drop(columns="sort")
 
+diag.mark("Classement IA")
+
 # ---------------- TABLEAU PRINCIPAL ----------------
 def color_decision(v):
     if pd.isna(v): return ""
@@ -116,6 +122,8 @@ st.dataframe(
     use_container_width=True, hide_index=True
 )
 
+diag.mark("Tableau")
+
 # ---------------- GRAPHIQUES ----------------
 st.divider()
 st.subheader("📈 Distribution IA — Synthèse visuelle")
@@ -138,6 +146,8 @@ with col2:
     ).properties(height=320, title=f"Tendances — {periode}")
     st.altair_chart(chart2, use_container_width=True)
 
+diag.mark("Graphiques")
+
 # ---------------- CONCLUSION ----------------
 st.divider()
 st.markdown(f"""
@@ -147,3 +157,6 @@ st.markdown(f"""
 - Actions **⚠️ modérément proches** : { (out['Signal'] == '⚠️').sum() }
 - Actions **🔴 éloignées** : { (out['Signal'] == '🔴').sum() }
 """)
+
+diag.mark("Conclusion")
+diag.finish()
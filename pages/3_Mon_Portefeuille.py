@@ -4,13 +4,17 @@ v6.9 — Mon Portefeuille (benchmark + IA + répartition + volatilité)
 - Profil IA chargé depuis lib.load_profile() (cohérence inter-pages)
 - Surbrillance lisible en thème sombre
 - Tri intelligent par Perf% décroissante
+- Positions et PRU dérivés du journal d’opérations (lib : data/portfolio.db)
 """
 
-import os, json, numpy as np, pandas as pd, altair as alt, streamlit as st
+import json, numpy as np, pandas as pd, altair as alt, streamlit as st
+import diagnostics
 from lib import (
-    fetch_prices, compute_metrics, price_levels_from_row, decision_label_from_row,
+    fetch_prices, compute_metrics, price_levels, decision_labels,
     style_variations, company_name_from_ticker, get_profile_params, load_profile,
-    resolve_identifier, find_ticker_by_name, load_mapping, save_mapping, maybe_guess_yahoo
+    resolve_identifier, find_ticker_by_name, map_identifier, maybe_guess_yahoo,
+    clear_caches, portfolio_nav, nav_paths,
+    load_portfolio, sync_portfolio, record_operation, reset_portfolio, portfolio_operations
 )
 
 # --- Config
@@ -30,51 +34,37 @@ benchmark_label = st.sidebar.selectbox(
 benchmark_tickers = {"CAC 40": "^FCHI", "DAX": "^GDAXI", "S&P 500": "^GSPC", "NASDAQ 100": "^NDX"}
 benchmark_symbol = benchmark_tickers[benchmark_label]
 
-# --- Chargement portefeuille JSON
-DATA_PATH = "data/portfolio.json"
-os.makedirs("data", exist_ok=True)
-if not os.path.exists(DATA_PATH):
-    pd.DataFrame(columns=["Ticker", "Type", "Qty", "PRU", "Name"]).to_json(
-        DATA_PATH, orient="records", indent=2, force_ascii=False
-    )
-try:
-    pf = pd.read_json(DATA_PATH)
-except Exception:
-    pf = pd.DataFrame(columns=["Ticker", "Type", "Qty", "PRU", "Name"])
-for c, default in [("Ticker", ""), ("Type", "PEA"), ("Qty", 0.0), ("PRU", 0.0), ("Name", "")]:
-    if c not in pf.columns:
-        pf[c] = default
+diag = diagnostics.page("Mon Portefeuille", st)
+
+# --- Chargement portefeuille (positions dérivées du journal d’opérations)
+pf = load_portfolio()
+# Base de l’éditeur : figée jusqu’à l’enregistrement, pour n’écrire que les lignes réellement modifiées
+pf_base = st.session_state.setdefault("pf_base", pf)
+
+def reload_after_write():
+    st.session_state.pop("pf_base", None); st.rerun()
+
+diag.mark("Chargement")
 
 # --- Boutons gestion
-cols = st.columns(4)
+cols = st.columns(3)
 with cols[0]:
-    if st.button("💾 Sauvegarder"):
-        pf.to_json(DATA_PATH, orient="records", indent=2, force_ascii=False)
-        st.success("✅ Sauvegardé.")
-with cols[1]:
     if st.button("🗑 Réinitialiser"):
-        try:
-            os.remove(DATA_PATH)
-        except FileNotFoundError:
-            pass
-        pd.DataFrame(columns=["Ticker","Type","Qty","PRU","Name"]).to_json(DATA_PATH, orient="records", indent=2)
-        st.success("♻️ Réinitialisé."); st.rerun()
-with cols[2]:
+        reset_portfolio()
+        st.success("♻️ Réinitialisé."); reload_after_write()
+with cols[1]:
     st.download_button(
         "⬇️ Exporter",
         json.dumps(pf.to_dict(orient="records"), ensure_ascii=False, indent=2),
         file_name="portfolio.json", mime="application/json"
     )
-with cols[3]:
+with cols[2]:
     up = st.file_uploader("📥 Importer JSON", type=["json"], label_visibility="collapsed")
-    if up:
+    if up and st.session_state.get("pf_import") != up.file_id:
         try:
-            imp = pd.DataFrame(json.load(up))
-            for c in ["Ticker","Type","Qty","PRU","Name"]:
-                if c not in imp.columns:
-                    imp[c] = "" if c in ("Ticker","Type","Name") else 0.0
-            imp.to_json(DATA_PATH, orient="records", indent=2, force_ascii=False)
-            st.success("✅ Importé."); st.rerun()
+            sync_portfolio(pd.DataFrame(json.load(up)), note="import JSON")
+            st.session_state["pf_import"] = up.file_id
+            st.success("✅ Importé."); reload_after_write()
         except Exception as e:
             st.error(f"Erreur : {e}")
 
@@ -102,7 +92,7 @@ with st.expander("🔁 Convertisseur LS Exchange → Yahoo"):
                 st.warning("Aucune conversion active.")
             else:
                 src, dst = pair
-                m = load_mapping(); m[src] = dst; save_mapping(m)
+                map_identifier(src, dst)
                 st.success(f"Ajouté : {src} → {dst}")
 
 st.divider()
@@ -112,6 +102,7 @@ with st.expander("🔎 Recherche par nom / ISIN / WKN / Ticker"):
     q = st.text_input("Nom ou identifiant", "")
     t = st.selectbox("Type", ["PEA", "CTO"])
     qty = st.number_input("Qté", min_value=0.0, step=1.0)
+    prix = st.number_input("Prix d’achat (€)", min_value=0.0, step=0.01)
     if st.button("Rechercher"):
         if not q.strip():
             st.warning("Entre un terme.")
@@ -129,16 +120,35 @@ with st.expander("🔎 Recherche par nom / ISIN / WKN / Ticker"):
             i = labels.index(sel)
             sym = res[i]["symbol"]
             nm = res[i].get("shortname", sym)
-            pf = pd.concat([pf, pd.DataFrame([{"Ticker": sym.upper(), "Type": t, "Qty": qty, "PRU": 0.0, "Name": nm}])], ignore_index=True)
-            pf.to_json(DATA_PATH, orient="records", indent=2, force_ascii=False)
-            st.success(f"Ajouté : {nm} ({sym})"); st.rerun()
+            record_operation(sym, t, "BUY", qty, prix, name=nm)
+            st.success(f"Ajouté : {nm} ({sym})"); reload_after_write()
+
+# --- Opérations (achat / vente) + journal
+with st.expander("🧾 Opérations (achat / vente)"):
+    o1, o2, o3, o4, o5, o6 = st.columns(6)
+    with o1: op_tkr = st.selectbox("Ligne", pf["Ticker"].tolist() or [""], key="op_tkr")
+    with o2: op_acc = st.selectbox("Compte", ["PEA", "CTO"], key="op_acc")
+    with o3: op_side = st.selectbox("Sens", ["Achat", "Vente"], key="op_side")
+    with o4: op_qty = st.number_input("Qté", min_value=0.0, step=1.0, key="op_qty")
+    with o5: op_px = st.number_input("Prix (€)", min_value=0.0, step=0.01, key="op_px")
+    with o6: op_date = st.date_input("Date", key="op_date")
+    if st.button("✅ Enregistrer l’opération"):
+        if not op_tkr or op_qty <= 0:
+            st.warning("Choisis une ligne et une quantité.")
+        else:
+            pos = record_operation(op_tkr, op_acc, "BUY" if op_side == "Achat" else "SELL",
+                                   op_qty, op_px, date=op_date.isoformat())
+            st.success(f"{pos['Ticker']} ({pos['Type']}) : {pos['Qty']:g} titres, PRU {pos['PRU']:.2f} €"); reload_after_write()
+    st.dataframe(portfolio_operations(limit=100), use_container_width=True, hide_index=True)
 
 st.divider()
 
+diag.mark("Gestion / recherche")
+
 # --- Tableau principal
 st.subheader("📝 Mon Portefeuille")
 edited = st.data_editor(
-    pf, num_rows="dynamic", use_container_width=True, hide_index=True,
+    pf_base, num_rows="dynamic", use_container_width=True, hide_index=True,
     column_config={
         "Ticker": st.column_config.TextColumn("Ticker"),
         "Type": st.column_config.SelectboxColumn("Type", options=["PEA","CTO"]),
@@ -148,19 +158,24 @@ edited = st.data_editor(
     }
 )
 
+if not pf.equals(pf_base):
+    st.caption("ℹ️ Portefeuille modifié par ailleurs depuis l’ouverture de l’éditeur : seules les lignes changées ici "
+               "seront écrites. 🔄 Rafraîchir pour recharger.")
+
 c1, c2 = st.columns(2)
 with c1:
     if st.button("💾 Enregistrer les modifs"):
-        edited["Ticker"] = edited["Ticker"].astype(str).str.upper()
-        edited.to_json(DATA_PATH, orient="records", indent=2, force_ascii=False)
-        st.success("✅ Sauvegardé."); st.rerun()
+        n = sync_portfolio(edited, base=pf_base)
+        st.success(f"✅ Sauvegardé ({n} ligne(s) modifiée(s))."); reload_after_write()
 with c2:
     if st.button("🔄 Rafraîchir"):
-        st.cache_data.clear(); st.rerun()
+        st.cache_data.clear(); clear_caches(); reload_after_write()
 
 if edited.empty:
     st.info("Ajoute une action pour commencer."); st.stop()
 
+diag.mark("Tableau")
+
 # --- Analyse IA stable (120j)
 tickers = edited["Ticker"].dropna().unique().tolist()
 hist_full = fetch_prices(tickers, days=120)
@@ -171,65 +186,42 @@ merged = edited.merge(met, on="Ticker", how="left")
 profil = load_profile()
 volmax = get_profile_params(profil)["vol_max"]
 
-rows = []
-for _, r in merged.iterrows():
-    px = float(r.get("Close", np.nan))
-    qty = float(r.get("Qty", 0))
-    pru = float(r.get("PRU", np.nan))
-    name = r.get("Name") or company_name_from_ticker(r.get("Ticker"))
-    levels = price_levels_from_row(r, profil)
-    val = px * qty if np.isfinite(px) else np.nan
-    gain_eur = (px - pru) * qty if np.isfinite(px) and np.isfinite(pru) else np.nan
-    perf = ((px / pru) - 1) * 100 if (np.isfinite(px) and np.isfinite(pru) and pru > 0) else np.nan
-    dec = decision_label_from_row(r, held=True, vol_max=volmax)
-
-    # 🔹 Volatilité simple MA20/MA50
-    ma20 = float(r.get("MA20", np.nan))
-    ma50 = float(r.get("MA50", np.nan))
-    if np.isfinite(ma20) and np.isfinite(ma50):
-        vola = abs(ma20 - ma50) / ma50 * 100
-    else:
-        vola = np.nan
-    if np.isnan(vola): vol_ind = "⚪️"
-    elif vola < 2:    vol_ind = "🟢 Faible"
-    elif vola < 5:    vol_ind = "🟡 Moyenne"
-    else:             vol_ind = "🔴 Élevée"
-
-    rows.append({
-        "Type": r["Type"],
-        "Nom": name,
-        "Ticker": r["Ticker"],
-        "Cours (€)": round(px,2) if np.isfinite(px) else None,
-        "Qté": qty,
-        "PRU (€)": round(pru,2) if np.isfinite(pru) else None,
-        "Valeur (€)": round(val,2) if np.isfinite(val) else None,
-        "Gain/Perte (€)": round(gain_eur,2) if np.isfinite(gain_eur) else None,
-        "Perf%": round(perf,2) if np.isfinite(perf) else None,
-        "Volatilité": vol_ind,
-        "Entrée (€)": levels["entry"],
-        "Objectif (€)": levels["target"],
-        "Stop (€)": levels["stop"],
-        "Décision IA": dec
-    })
-
-out = pd.DataFrame(rows)
+px = pd.to_numeric(merged["Close"], errors="coerce")
+qty = pd.to_numeric(merged["Qty"], errors="coerce")
+pru = pd.to_numeric(merged["PRU"], errors="coerce")
+names = [n or company_name_from_ticker(t) for n, t in zip(merged["Name"], merged["Ticker"])]
+lev = price_levels(merged, profil)
+val = px * qty
+gain_eur = (px - pru) * qty
+perf = ((px / pru) - 1).where(pru > 0) * 100
+
+# 🔹 Volatilité simple MA20/MA50
+ma20 = pd.to_numeric(merged["MA20"], errors="coerce")
+ma50 = pd.to_numeric(merged["MA50"], errors="coerce")
+vola = (ma20 - ma50).abs() / ma50 * 100
+vol_ind = np.select([vola.isna(), vola < 2, vola < 5], ["⚪️", "🟢 Faible", "🟡 Moyenne"], "🔴 Élevée")
+
+out = pd.DataFrame({
+    "Type": merged["Type"].to_numpy(),
+    "Nom": names,
+    "Ticker": merged["Ticker"].to_numpy(),
+    "Cours (€)": px.round(2).to_numpy(),
+    "Qté": qty.to_numpy(),
+    "PRU (€)": pru.round(2).to_numpy(),
+    "Valeur (€)": val.round(2).to_numpy(),
+    "Gain/Perte (€)": gain_eur.round(2).to_numpy(),
+    "Perf%": perf.round(2).to_numpy(),
+    "Volatilité": vol_ind,
+    "Entrée (€)": lev["entry"],
+    "Objectif (€)": lev["target"],
+    "Stop (€)": lev["stop"],
+    "Décision IA": decision_labels(merged, held=True, vol_max=volmax),
+})
 
 # --- Proximité Entrée (%, + emoji)
-def proximity_info(row):
-    entry = row.get("Entrée (€)")
-    px = row.get("Cours (€)")
-    if not np.isfinite(entry) or not np.isfinite(px) or entry == 0:
-        return np.nan, ""
-    prox = ((px / entry) - 1) * 100
-    if abs(prox) <= 2:
-        emoji = "🟢"
-    elif abs(prox) <= 5:
-        emoji = "⚠️"
-    else:
-        emoji = "🔴"
-    return round(prox, 2), emoji
-
-out[["Proximité (%)", "Signal Entrée"]] = out.apply(lambda r: proximity_info(r), axis=1, result_type="expand")
+prox = np.round(lev["prox"], 2)
+out["Proximité (%)"] = prox
+out["Signal Entrée"] = np.select([np.isnan(prox), np.abs(prox) <= 2, np.abs(prox) <= 5], ["", "🟢", "⚠️"], "🔴")
 
 # --- Styles lisibles (mode sombre ok)
 def color_proximity(v):
@@ -262,6 +254,8 @@ st.dataframe(
     use_container_width=True, hide_index=True
 )
 
+diag.mark("Analyse IA")
+
 # --- Synthèse performance
 def synthese_perf(df, t):
     df = df[df["Type"] == t]
@@ -297,34 +291,19 @@ if not repart.empty:
 else:
     st.caption("Aucune donnée pour le camembert.")
 
+diag.mark("Synthèse / répartition")
+
 # --- Graphique comparé au benchmark
 st.subheader(f"📈 Portefeuille vs {benchmark_label} ({periode})")
 hist_graph = fetch_prices(tickers + [benchmark_symbol], days=days_hist)
 if hist_graph.empty or "Date" not in hist_graph.columns:
     st.caption("Pas assez d'historique.")
 else:
-    df_val = []
-    for _, r in edited.iterrows():
-        tkr, q, pru, tp = r["Ticker"], r["Qty"], r["PRU"], r["Type"]
-        d = hist_graph[hist_graph["Ticker"] == tkr].copy()
-        if d.empty: continue
-        d["Valeur"] = d["Close"] * q
-        d["Type"] = tp
-        df_val.append(d[["Date","Valeur","Type"]])
-    if df_val:
-        D = pd.concat(df_val)
-        agg = D.groupby(["Date","Type"]).agg({"Valeur":"sum"}).reset_index()
-        tot = agg.groupby("Date")["Valeur"].sum().reset_index().assign(Type="Total")
-
-        bmk = hist_graph[hist_graph["Ticker"] == benchmark_symbol].copy()
-        # normalise le benchmark sur la valeur initiale du portefeuille total
-        base_val = float(tot["Valeur"].iloc[0]) if not tot.empty else 1.0
-        bmk = bmk.assign(Type=benchmark_label, Valeur=bmk["Close"] / bmk["Close"].iloc[0] * base_val)
-
-        full = pd.concat([agg, tot, bmk])
-        base = full.groupby("Type").apply(
-            lambda g: g.assign(Pct=(g["Valeur"]/g["Valeur"].iloc[0]-1)*100)
-        ).reset_index(drop=True)
+    nav = portfolio_nav(edited, hist_graph, benchmark_symbol, benchmark_label)
+    if nav.empty:
+        st.caption("Pas assez d'historique.")
+    else:
+        base = nav_paths(nav).reset_index().melt(id_vars="Date", var_name="Type", value_name="Pct").dropna()
 
         try:
             perf_port = base[base["Type"]=="Total"]["Pct"].iloc[-1]
@@ -346,3 +325,6 @@ else:
             tooltip=["Date:T","Type:N","Pct:Q"]
         ).properties(height=400)
         st.altair_chart(chart, use_container_width=True)
+
+diag.mark("Benchmark")
+diag.finish()
@@ -1,33 +1,30 @@
 # -*- coding: utf-8 -*-
 """
 v7.0 — Recherche universelle
-- Recherche intégrée (Nom / Ticker LS / ISIN / WKN / Yahoo)
+- Recherche intégrée (Nom / Ticker LS / ISIN / WKN / Yahoo) + suggestions de l’index local
 - Mémoire de la dernière recherche
 - Analyse IA complète (MA20/MA50/ATR, Entrée / Objectif / Stop, Décision IA)
 - Graphique avec lignes de niveaux
 - Actualités ciblées (liens + dates + résumé IA)
-- ➕ Bouton "Ajouter au portefeuille" (sauvegarde directe dans portfolio.json)
+- ➕ Bouton "Ajouter au portefeuille" (achat enregistré dans le journal du portefeuille)
 """
 
-import streamlit as st, pandas as pd, numpy as np, altair as alt, requests, html, re, os, json
+import streamlit as st, pandas as pd, numpy as np, altair as alt, html, re
+from urllib.parse import quote
 from datetime import datetime
+import http_client
+import diagnostics
 from lib import (
     fetch_prices, compute_metrics, price_levels_from_row, decision_label_from_row,
     company_name_from_ticker, get_profile_params, resolve_identifier,
-    find_ticker_by_name, maybe_guess_yahoo, load_profile   # 👈 profil cohérent
+    find_ticker_by_name, maybe_guess_yahoo, load_profile,  # 👈 profil cohérent
+    record_operation, search_instruments
 )
 
 # ---------------- CONFIG ----------------
 st.set_page_config(page_title="Recherche universelle", page_icon="🔍", layout="wide")
 st.title("🔍 Recherche universelle — Analyse IA complète")
 
-DATA_PATH = "data/portfolio.json"
-os.makedirs("data", exist_ok=True)
-if not os.path.exists(DATA_PATH):
-    pd.DataFrame(columns=["Ticker", "Type", "Qty", "PRU", "Name"]).to_json(
-        DATA_PATH, orient="records", indent=2, force_ascii=False
-    )
-
 # ---------------- HELPERS ----------------
 def remember_last_search(symbol=None, query=None, period=None):
     if symbol is not None:
@@ -46,9 +43,9 @@ def get_last_search(default_period="30 jours"):
 
 def google_news_titles_and_links(q, lang="fr", limit=6):
     """Mini fetch Google News RSS → [(title, link, pubdate)]."""
-    url = f"https://news.google.com/rss/search?q={requests.utils.quote(q)}&hl={lang}-{lang.upper()}&gl={lang.upper()}&ceid={lang.upper()}:{lang.upper()}"
+    url = f"https://news.google.com/rss/search?q={quote(q)}&hl={lang}-{lang.upper()}&gl={lang.upper()}&ceid={lang.upper()}:{lang.upper()}"
     try:
-        xml = requests.get(url, timeout=10).text
+        xml = http_client.get(url, timeout=10).text
         items = re.findall(r"<item>(.*?)</item>", xml, flags=re.S)
         out = []
         for it in items:
@@ -91,6 +88,8 @@ def short_news_summary(titles):
 def pretty_pct(x):
     return f"{x*100:+.2f}%" if pd.notna(x) else "—"
 
+diag = diagnostics.page("Recherche universelle", st)
+
 # ---------------- RECHERCHE ----------------
 last_symbol, last_query, last_period = get_last_search()
 
@@ -98,6 +97,11 @@ with st.expander("🔎 Recherche d’une valeur", expanded=True):
     c1, c2, c3 = st.columns([2, 1, 1])
     with c1:
         query = st.text_input("Nom / Ticker LS / ISIN / WKN / Yahoo", value=last_query)
+        suggestions = search_instruments(query, limit=8) if query.strip() else []
+        choice = st.selectbox(
+            "Suggestions (index local)", ["—"] + [f"{r['symbol']} — {r['shortname']}" for r in suggestions],
+            disabled=not suggestions
+        )
     with c2:
         period = st.selectbox("Période du graphique", ["Jour", "7 jours", "30 jours", "1 an", "5 ans"],
                               index=["Jour","7 jours","30 jours","1 an","5 ans"].index(last_period))
@@ -106,7 +110,9 @@ with st.expander("🔎 Recherche d’une valeur", expanded=True):
             if not query.strip():
                 st.warning("Entre un terme de recherche.")
             else:
-                sym, src = resolve_identifier(query)
+                sym = choice.split(" — ")[0] if choice != "—" else None
+                if not sym:
+                    sym, src = resolve_identifier(query)
                 if not sym:
                     results = find_ticker_by_name(query) or []
                     if results:
@@ -121,6 +127,8 @@ if not symbol:
     st.info("🔍 Entre un nom ou ticker ci-dessus pour lancer l’analyse IA complète.")
     st.stop()
 
+diag.mark("Recherche")
+
 # ---------------- DONNÉES ----------------
 days_map = {"Jour": 5, "7 jours": 10, "30 jours": 40, "1 an": 400, "5 ans": 1300}
 days_graph = days_map[period]
@@ -135,6 +143,8 @@ if metrics.empty:
 row = metrics.iloc[0]
 name = company_name_from_ticker(symbol)
 
+diag.mark("Données")
+
 # ---------------- ANALYSE ----------------
 col1, col2, col3, col4 = st.columns([1.6, 1, 1, 1])
 with col1:
@@ -191,15 +201,7 @@ with cA:
     pru = st.number_input("Prix d’achat estimé (PRU €)", min_value=0.0, step=0.01, value=float(row["Close"]))
     if st.button("💼 Ajouter au portefeuille"):
         try:
-            pf = pd.read_json(DATA_PATH)
-            pf = pd.concat([pf, pd.DataFrame([{
-                "Ticker": symbol.upper(),
-                "Type": type_port,
-                "Qty": qty,
-                "PRU": pru,
-                "Name": name
-            }])], ignore_index=True)
-            pf.to_json(DATA_PATH, orient="records", indent=2, force_ascii=False)
+            record_operation(symbol, type_port, "BUY", qty, pru, name=name)
             st.success(f"✅ {name} ({symbol}) ajouté au portefeuille {type_port}.")
         except Exception as e:
             st.error(f"Erreur lors de l’ajout : {e}")
@@ -224,6 +226,8 @@ with cB:
 
 st.divider()
 
+diag.mark("Analyse")
+
 # ---------------- ACTUALITÉS ----------------
 st.subheader("📰 Actualités récentes ciblées")
 news = google_news_titles_and_links(f"{name} {symbol}", lang="fr", limit=6)
@@ -240,5 +244,10 @@ if news:
 else:
     st.caption("Aucune actualité disponible pour cette valeur.")
 
+diag.mark("Actualités")
+
 # ---------------- MÉMO ----------------
 remember_last_search(symbol=symbol, query=query if 'query' in locals() else last_query, period=period)
+
+diag.mark("Mémo")
+diag.finish()
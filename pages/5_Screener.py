@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""
+Screener multi-univers
+- Table de facteurs commune (CAC40, DAX, NASDAQ100, S&P500, LS Exchange)
+- Filtre et classement libres, évalués sur les colonnes entières
+- Top-k en quelques millisecondes
+"""
+
+import time
+import streamlit as st, numpy as np
+import diagnostics
+from lib import (
+    screen, screener_table, SCREEN_UNIVERSES, SCREEN_FACTORS,
+    style_variations, get_profile_params, load_profile
+)
+
+st.set_page_config(page_title="Screener", page_icon="🧮", layout="wide")
+st.title("🧮 Screener — Filtrer et classer tous les marchés")
+
+# ---------------- Sidebar ----------------
+universes = st.sidebar.multiselect("Univers", list(SCREEN_UNIVERSES), default=["CAC 40", "DAX"])
+long_hist = st.sidebar.checkbox("Historique long (YTD / 1 an)", value=False)
+days_hist = 400 if long_hist else 120
+
+profil = load_profile()
+params = get_profile_params(profil)
+st.sidebar.markdown(f"**Profil IA actif :** {profil}")
+
+diag = diagnostics.page("Screener", st)
+
+if not universes:
+    st.warning("Sélectionne au moins un univers dans la barre latérale.")
+    st.stop()
+
+# ---------------- Requête ----------------
+EXEMPLES = {
+    "Momentum raisonnable": ("pct_30d > 5% and Volatilité < vol_max", "trend_score"),
+    "Proches de l’entrée": ("decision == 'Acheter' and abs(prox) <= 2", "IA_Score"),
+    "Rebonds sur MA50": ("gap50 > 0 and gap20 < 0 and pct_1d > 0", "pct_7d"),
+    "Plus fortes baisses (1 an)": ("notnan(pct_1y)", "-pct_1y"),
+}
+exemple = st.selectbox("Exemple", ["—"] + list(EXEMPLES))
+where0, rank0 = EXEMPLES.get(exemple, ("pct_30d > 5% and Volatilité < vol_max", "trend_score"))
+
+c1, c2, c3 = st.columns([3, 2, 1])
+with c1:
+    where = st.text_input("Filtre", value=where0, help="and / or / not, comparaisons, + - * /, « 5% » = 0.05")
+with c2:
+    rank_by = st.text_input("Classer par", value=rank0)
+with c3:
+    k = st.number_input("Top", min_value=1, max_value=500, value=20, step=5)
+ascending = st.checkbox("Ordre croissant", value=False)
+
+with st.expander("Colonnes et paramètres disponibles"):
+    st.markdown(
+        "**Facteurs :** " + ", ".join(f"`{c}`" for c in SCREEN_FACTORS)
+        + "  \n**Alias :** `atr_pct`, `vol` (= Volatilité), `score` (= IA_Score)"
+        + "  \n**Profil :** " + ", ".join(f"`{k_}` = {v}" for k_, v in params.items())
+        + "  \n**Fonctions :** `abs`, `min`, `max`, `isnan`, `notnan`"
+        + "  \n**Texte :** `decision == 'Acheter'`, `'DAX' in Indices`"
+    )
+
+# ---------------- Données ----------------
+table = screener_table(tuple(universes), days_hist, profil)
+if table.empty:
+    st.warning("Aucune donnée disponible (vérifie la connectivité).")
+    st.stop()
+
+diag.mark("Table de facteurs")
+
+t0 = time.perf_counter()
+try:
+    res = screen(where, rank_by=rank_by, k=int(k), profile=profil, ascending=ascending, table=table)
+except ValueError as e:
+    st.error(str(e))
+    st.stop()
+dt = (time.perf_counter() - t0) * 1000
+
+diag.mark("Requête")
+
+# ---------------- Résultats ----------------
+st.caption(f"{len(res)} résultat(s) sur {len(table)} valeurs — requête évaluée en {dt:.1f} ms")
+if res.empty:
+    st.info("Aucune valeur ne satisfait le filtre.")
+    st.stop()
+
+pct_cols = ["pct_1d", "pct_7d", "pct_30d", "pct_90d", "pct_ytd", "pct_1y"]
+out = res[["Ticker", "name", "Indices", "Close", "rank_value", "trend_score", *pct_cols,
+           "Volatilité", "Décision_IA", "entry", "target", "stop", "prox"]].copy()
+for c in pct_cols + ["Volatilité"]:
+    out[c] = (out[c] * 100).round(2)
+for c in ["Close", "entry", "target", "stop", "prox", "trend_score", "rank_value"]:
+    out[c] = out[c].astype(float).round(2 if c != "trend_score" else 4)
+out = out.rename(columns={
+    "name": "Société", "Close": "Cours", "rank_value": "Classement", "trend_score": "Tendance",
+    "Volatilité": "Risque (%)", "Décision_IA": "Décision IA",
+    "entry": "Entrée", "target": "Objectif", "stop": "Stop", "prox": "Proximité (%)",
+})
+out.insert(0, "#", np.arange(1, len(out) + 1))
+
+st.dataframe(style_variations(out, pct_cols), use_container_width=True, hide_index=True)
+st.download_button("⬇️ Export CSV", out.to_csv(index=False).encode("utf-8"),
+                   file_name="screener.csv", mime="text/csv")
+
+diag.mark("Tableau")
+diag.finish()
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""
+Mode live — Portefeuille & watchlist LS
+- Activation volontaire : aucune cotation demandée tant que le mode est coupé
+- Derniers cours interrogés par lots, à intervalle réglable
+- Seules les valeurs dont le cours a bougé sont recalculées (décision, niveaux, P&L)
+- Seule la zone live est rafraîchie, pas la page entière
+- DASH_LIVE_REPLAY=fichier.csv / .jsonl / .json (ts, ticker, price) : rejoue un fichier local au lieu de Yahoo
+"""
+
+import os, time
+import streamlit as st
+import diagnostics
+from lib import (
+    LiveBoard, ReplayQuotes, LIVE_INTERVAL_S, load_portfolio, resolve_watchlist_ls,
+    load_profile, style_variations
+)
+
+st.set_page_config(page_title="Mode live", page_icon="📡", layout="wide")
+st.title("📡 Mode live — Portefeuille & watchlist LS")
+
+# ---------------- Sidebar ----------------
+live_on = st.sidebar.toggle("Activer le mode live", value=False)
+interval = st.sidebar.slider("Intervalle (secondes)", 5, 300, LIVE_INTERVAL_S, step=5)
+suivis = st.sidebar.multiselect("Lignes suivies", ["Portefeuille", "Watchlist LS"],
+                                default=["Portefeuille", "Watchlist LS"])
+profil = load_profile()
+st.sidebar.markdown(f"**Profil IA actif :** {profil}")
+
+diag = diagnostics.page("Mode live", st)
+
+if not live_on:
+    st.info("Active le mode live dans la barre latérale pour suivre les cours en séance.")
+    st.stop()
+if not suivis:
+    st.warning("Sélectionne au moins une source de lignes.")
+    st.stop()
+
+# ---------------- Base journalière (une fois par configuration) ----------------
+replay = os.environ.get("DASH_LIVE_REPLAY")
+key = (tuple(suivis), profil, replay)
+reload = st.sidebar.button("🔄 Recharger la base")
+if reload or st.session_state.get("live_key") != key:
+    holdings = load_portfolio() if "Portefeuille" in suivis else None
+    watch = []
+    if "Watchlist LS" in suivis:
+        ls = resolve_watchlist_ls()
+        watch = list(ls["resolved"].values())
+        if ls["unresolved"]:
+            st.sidebar.caption(f"⚠️ LS non résolues ({len(ls['unresolved'])}) : {', '.join(ls['unresolved'])}")
+    board = LiveBoard(holdings, watch, profile=profil, source=ReplayQuotes(replay) if replay else None)
+    board.start()
+    st.session_state.update(live_board=board, live_key=key)
+board = st.session_state["live_board"]
+
+if board.table.empty:
+    st.info("Aucune ligne à suivre (portefeuille vide et watchlist non résolue).")
+    st.stop()
+
+diag.mark("Base journalière")
+
+# ---------------- Affichage ----------------
+COLS = {
+    "Type": "Type", "Name": "Nom", "Ticker": "Ticker", "Close": "Cours", "pct_1d": "Var. jour (%)",
+    "Décision_IA": "Décision IA", "entry": "Entrée", "target": "Objectif", "stop": "Stop",
+    "prox": "Proximité (%)", "to_stop": "Marge stop (%)", "to_target": "Potentiel (%)",
+    "Qty": "Qté", "PRU": "PRU", "value": "Valeur (€)", "pnl": "Gain/Perte (€)", "pnl_pct": "Perf%",
+}
+
+def view(df):
+    out = df[list(COLS)].rename(columns=COLS)
+    out["Var. jour (%)"] = out["Var. jour (%)"] * 100
+    num = out.select_dtypes("number").columns
+    out[num] = out[num].astype(float).round(2)
+    return out
+
+fragment = getattr(st, "fragment", None) or st.experimental_fragment
+
+@fragment(run_every=interval)
+def live_zone():
+    t0 = time.perf_counter()
+    delta = board.poll()
+    dt = (time.perf_counter() - t0) * 1000
+    st.caption(f"Passage n°{board.polls} à {time.strftime('%H:%M:%S')} — "
+               f"{len(delta)} ligne(s) recalculée(s) sur {len(board.table)} en {dt:.0f} ms")
+
+    if not delta.empty:
+        st.markdown("**Dernières variations**")
+        st.dataframe(style_variations(view(delta), ["Var. jour (%)", "Perf%"]),
+                     use_container_width=True, hide_index=True)
+
+    tab = board.table
+    held = tab["Type"] != LiveBoard.WATCH
+    if held.any():
+        gain, val = tab.loc[held, "pnl"].sum(), tab.loc[held, "value"].sum()
+        pct = gain / (val - gain) * 100 if val - gain else 0
+        st.metric("Portefeuille (valeur live)", f"{val:,.2f} €", f"{gain:+,.2f} € ({pct:+.2f}%)")
+
+    recent = tab.index.isin(delta.index)
+    full = view(tab)
+    st.dataframe(
+        style_variations(full, ["Var. jour (%)", "Perf%"]).apply(
+            lambda r: ["font-weight:600" if recent[full.index.get_loc(r.name)] else ""] * len(r), axis=1),
+        use_container_width=True, hide_index=True
+    )
+
+live_zone()
+
+diag.mark("Mode live")
+diag.finish()
@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+"""
+Planificateur de préchargement : après chaque clôture (Europe, puis New York) il rafraîchit
+membres d’indices, cours, métriques et actualités Top/Flop, et dépose le résultat dans
+data/precomputed — les pages n’ont plus qu’à lire.
+
+    python scheduler.py             # boucle (processus à côté du serveur Streamlit)
+    python scheduler.py --once      # un passage complet puis sortie
+    python scheduler.py --status    # dernier passage, durées, prochaines échéances
+
+Dans le serveur lui-même : DASH_SCHEDULER=1 → app.py lance start_in_background().
+Un seul planificateur actif à la fois (verrou data/scheduler.lock).
+"""
+import os, sys, json, time, argparse, threading, traceback
+import lib
+
+STATUS_PATH = os.path.join(lib.DATA_DIR, "scheduler_status.json")
+LOCK_PATH = os.path.join(lib.DATA_DIR, "scheduler.lock")
+
+# groupe → indices rafraîchis + ticker « horloge » donnant la clôture de référence
+GROUPS = {
+    "EU": {"indices": ("CAC 40", "DAX", "LS Exchange"), "clock": "^FCHI"},
+    "US": {"indices": ("NASDAQ 100", "S&P 500", "LS Exchange"), "clock": "^GSPC"},
+}
+DAYS = (400, 120)           # historiques servis aux pages (400 j d’abord : le 120 j est un sous-ensemble)
+NEWS_TOP = 10               # Top / Flop du jour par indice (⊇ Top / Flop de toute union d’indices)
+NEWS_DEADLINE = 120.0
+MARGIN_S = 60               # après la clôture « publiée » (lib.SESSION_SETTLE_MIN)
+HEARTBEAT_S = 300
+
+_status_lock = threading.Lock()
+_thread = None
+_thread_lock = threading.Lock()
+
+
+# ---------------- Statut ----------------
+def _iso(ts):
+    return time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(ts)) if ts else None
+
+def status():
+    try:
+        return json.load(open(STATUS_PATH, "r", encoding="utf-8"))
+    except Exception:
+        return {}
+
+def _update_status(**kw):
+    with _status_lock:
+        cur = status()
+        runs = cur.get("groups", {})
+        runs.update(kw.pop("groups", {}))
+        cur.update(kw, groups=runs)
+        try:
+            lib._write_atomic(STATUS_PATH, lambda tmp: json.dump(cur, open(tmp, "w", encoding="utf-8"),
+                                                                 ensure_ascii=False, indent=2))
+        except Exception:
+            pass
+
+
+# ---------------- Verrou inter-processus ----------------
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+        return True
+    except OSError:
+        return False
+
+def _acquire_lock():
+    os.makedirs(lib.DATA_DIR, exist_ok=True)
+    for _ in range(2):
+        try:
+            fd = os.open(LOCK_PATH, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            os.write(fd, str(os.getpid()).encode()); os.close(fd)
+            return True
+        except FileExistsError:
+            try:
+                pid = int(open(LOCK_PATH).read().strip() or 0)
+            except Exception:
+                pid = 0
+            if pid and pid != os.getpid() and _pid_alive(pid):
+                return False
+            try: os.remove(LOCK_PATH)   # verrou orphelin
+            except OSError: pass
+    return False
+
+def _release_lock():
+    try:
+        if int(open(LOCK_PATH).read().strip() or 0) == os.getpid():
+            os.remove(LOCK_PATH)
+    except Exception:
+        pass
+
+
+# ---------------- Un passage ----------------
+def _members_stale(idx):
+    age = lib.members_age(idx)
+    return age is None or age > lib.MEMBERS_TTL_DAYS * 86400
+
+def _top_flop_pairs(df, col="pct_1d", n=NEWS_TOP):
+    pairs = []
+    valid = df.dropna(subset=["Close", col]) if col in df.columns else df.iloc[0:0]
+    for _, part in valid.groupby("Indice", sort=False):
+        for sub in (part.nlargest(n, col), part.nsmallest(n, col)):
+            pairs += [(str(nm or ""), str(tk or "")) for nm, tk in zip(sub.get("name", sub["Ticker"]), sub["Ticker"])]
+    return list(dict.fromkeys(pairs))
+
+def run_group(name, log=print):
+    """Membres → cours → métriques (par historique) → actualités Top/Flop ; renvoie le compte rendu."""
+    g = GROUPS[name]
+    indices = list(g["indices"])
+    rec = {"started_at": _iso(time.time()), "durations": {}, "ok": False}
+    _update_status(groups={name: {**status().get("groups", {}).get(name, {}), "running": True}})
+    t_all = time.perf_counter()
+
+    def step(key, fn):
+        t0 = time.perf_counter()
+        out = fn()
+        rec["durations"][key] = round(time.perf_counter() - t0, 3)
+        return out
+
+    try:
+        step("members", lambda: [lib.refresh_members(i) for i in indices
+                                 if i in lib.MEMBER_INDEXES and _members_stale(i)])
+        mems = [m for m in (lib.members(i) for i in indices) if not m.empty]
+        union = list(dict.fromkeys(t for m in mems for t in m["ticker"].tolist()))
+        px = step("prices", lambda: lib.fetch_prices(union, days=max(DAYS)))
+        rec["tickers"] = int(px["Ticker"].nunique()) if not px.empty else 0
+
+        frames = {}
+        for d in DAYS:
+            df = step(f"metrics_{d}d", lambda d=d: lib.fetch_all_markets([(i, None) for i in indices],
+                                                                         days_hist=d, precomputed=False))
+            lib.save_precomputed_markets(df, d, indices)
+            frames[d] = df
+        rec["rows"] = int(len(frames[min(DAYS)]))
+
+        pairs = _top_flop_pairs(frames[min(DAYS)])
+        news = step("news", lambda: lib.news_summary_batch(pairs, lang="fr", deadline=NEWS_DEADLINE,
+                                                           precomputed=False))
+        lib.save_precomputed_news(news, lang="fr")
+        rec["news"] = f"{len(news)}/{len(pairs)}"
+        rec["ok"] = True
+    except Exception as e:
+        rec["error"] = f"{type(e).__name__}: {e}"
+        log(traceback.format_exc())
+    rec["total_s"] = round(time.perf_counter() - t_all, 3)
+    rec["finished_at"] = _iso(time.time())
+    rec["running"] = False
+    _update_status(groups={name: rec})
+    log(f"[{name}] {'OK' if rec['ok'] else 'ÉCHEC'} en {rec['total_s']:.1f} s — {rec['durations']}")
+    return rec
+
+
+# ---------------- Boucle ----------------
+def next_run_at(name):
+    return lib.session_state(GROUPS[name]["clock"])[1] + MARGIN_S
+
+def _stale(name):
+    st = lib.precomputed_markets_status(min(DAYS))
+    now = time.time()
+    return any(i not in st or st[i].get("valid_until", 0) <= now for i in GROUPS[name]["indices"])
+
+def run_forever(stop=None, log=print, mode="process"):
+    """Boucle jusqu’à `stop` ; rattrape au démarrage les groupes dont le précalcul est périmé."""
+    stop = stop or threading.Event()
+    if not _acquire_lock():
+        log("Un planificateur est déjà actif (verrou).")
+        return False
+    try:
+        nxt = {g: (0.0 if _stale(g) else next_run_at(g)) for g in GROUPS}
+        _update_status(pid=os.getpid(), mode=mode, started_at=_iso(time.time()))
+        while not stop.is_set():
+            for g in GROUPS:
+                if nxt[g] <= time.time():
+                    run_group(g, log=log)
+                    nxt[g] = next_run_at(g)
+            _update_status(heartbeat=_iso(time.time()), next_run={g: _iso(t) for g, t in nxt.items()})
+            stop.wait(max(1.0, min(HEARTBEAT_S, min(nxt.values()) - time.time())))
+    finally:
+        _release_lock()
+    return True
+
+def start_in_background():
+    """Thread démon dans le serveur Streamlit (idempotent ; sans effet si un autre processus tient le verrou)."""
+    global _thread
+    with _thread_lock:
+        if _thread is None or not _thread.is_alive():
+            _thread = threading.Thread(target=run_forever, kwargs={"log": lambda *a: None, "mode": "thread"},
+                                       name="dash-scheduler", daemon=True)
+            _thread.start()
+    return _thread
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--once", action="store_true", help="un passage de chaque groupe puis sortie")
+    ap.add_argument("--group", choices=sorted(GROUPS), help="avec --once : un seul groupe")
+    ap.add_argument("--status", action="store_true")
+    a = ap.parse_args(argv)
+    if a.status:
+        print(json.dumps(status(), ensure_ascii=False, indent=2))
+        return 0
+    if a.once:
+        if not _acquire_lock():
+            print("Un planificateur est déjà actif (verrou).")
+            return 1
+        try:
+            recs = [run_group(g) for g in ([a.group] if a.group else GROUPS)]
+        finally:
+            _release_lock()
+        return 0 if all(r["ok"] for r in recs) else 1
+    try:
+        run_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,14 @@
+# -*- coding: utf-8 -*-
+import os, sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    """Répertoire de travail jetable : lib écrit sous data/ relatif (portfolio.db, id_mapping…)."""
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "data").mkdir()
+    return tmp_path / "data"
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""Stockage transactionnel du portefeuille : migration JSON, PRU, éditions concurrentes."""
+import json, threading
+
+import pandas as pd
+import pytest
+
+import lib
+
+
+def rows(df=None):
+    df = lib.load_portfolio() if df is None else df
+    return {(r["Ticker"], r["Type"]): (r["Qty"], round(r["PRU"], 6)) for r in df.to_dict("records")}
+
+
+def test_migration_json_une_seule_fois(data_dir):
+    (data_dir / "portfolio.json").write_text(json.dumps([
+        {"Ticker": "air.pa", "Type": "PEA", "Qty": 10, "PRU": 100, "Name": "Airbus"},
+        {"Ticker": "OR.PA", "Type": "CTO", "Qty": 0, "PRU": 350, "Name": "L’Oréal"},
+        {"Ticker": None, "Type": "PEA", "Qty": 1, "PRU": 1},
+    ]), encoding="utf-8")
+    assert rows() == {("AIR.PA", "PEA"): (10.0, 100.0), ("OR.PA", "CTO"): (0.0, 350.0)}
+    (data_dir / "portfolio.json").write_text("[]", encoding="utf-8")   # fichier laissé en place : pas de ré-import
+    assert len(lib.load_portfolio()) == 2
+    assert set(lib.portfolio_operations()["side"]) == {"ADJ"}
+
+
+def test_achat_vente_ajustement(data_dir):
+    lib.record_operation("MC.PA", "PEA", "BUY", 10, 100)
+    pos = lib.record_operation("MC.PA", "PEA", "BUY", 10, 120)
+    assert (pos["Qty"], pos["PRU"]) == (20, 110)
+    pos = lib.record_operation("MC.PA", "PEA", "SELL", 5, 150)
+    assert (pos["Qty"], pos["PRU"]) == (15, 110)                       # une vente ne change pas le PRU
+    pos = lib.record_operation("MC.PA", "PEA", "SELL", 50, 150)
+    assert (pos["Qty"], pos["PRU"]) == (0, 0)                          # soldée, quantité jamais négative
+    pos = lib.record_operation("MC.PA", "PEA", "ADJ", 7, 50)
+    assert (pos["Qty"], pos["PRU"]) == (7, 50)
+    lib.record_operation("MC.PA", "CTO", "BUY", 0, 90)                 # ligne à 0 titre : visible, PRU saisi
+    assert rows() == {("MC.PA", "PEA"): (7.0, 50.0), ("MC.PA", "CTO"): (0.0, 90.0)}
+    with pytest.raises(ValueError):
+        lib.record_operation("MC.PA", "PEA", "GIFT", 1, 1)
+    before = rows()
+    assert lib.rebuild_positions() == 2 and rows() == before           # journal rejoué = positions
+
+
+def test_sauvegarde_concurrente_conserve_les_autres_lignes(data_dir):
+    lib.record_operation("AIR.PA", "PEA", "BUY", 10, 100, name="Airbus")
+    lib.record_operation("OR.PA", "PEA", "BUY", 2, 350, name="L’Oréal")
+    base = lib.load_portfolio()                                        # session A ouvre l’éditeur
+    lib.record_operation("MC.PA", "PEA", "BUY", 3, 700)                # session B achète entre-temps
+    lib.record_operation("OR.PA", "PEA", "BUY", 2, 450)                # … et renforce une ligne non éditée par A
+    edited = base.copy()
+    edited.loc[edited["Ticker"] == "AIR.PA", "Qty"] = 12
+    edited.loc[len(edited)] = ["SAN.PA", "CTO", None, 90.0, "Sanofi"]  # ajout, quantité vide
+    assert lib.sync_portfolio(edited, base=base) == 2
+    assert rows() == {("AIR.PA", "PEA"): (12.0, 100.0), ("OR.PA", "PEA"): (4.0, 400.0),
+                      ("MC.PA", "PEA"): (3.0, 700.0), ("SAN.PA", "CTO"): (0.0, 90.0)}
+
+    base = lib.load_portfolio()
+    assert lib.sync_portfolio(base[base["Ticker"] != "SAN.PA"], base=base) == 1   # suppression → DEL
+    assert ("SAN.PA", "CTO") not in rows()
+    assert lib.rebuild_positions() == 3
+
+
+def test_import_sans_base_remplace_tout(data_dir):
+    lib.record_operation("AIR.PA", "PEA", "BUY", 10, 100)
+    lib.sync_portfolio(pd.DataFrame([{"Ticker": "MC.PA", "Type": "PEA", "Qty": 1, "PRU": 700, "Name": ""}]))
+    assert rows() == {("MC.PA", "PEA"): (1.0, 700.0)}
+
+
+def test_ecritures_paralleles(data_dir):
+    def buy():
+        for _ in range(20):
+            lib.record_operation("AIR.PA", "PEA", "BUY", 1, 100)
+    ts = [threading.Thread(target=buy) for _ in range(4)]
+    for t in ts: t.start()
+    for t in ts: t.join()
+    assert rows() == {("AIR.PA", "PEA"): (80.0, 100.0)}
+    assert len(lib.portfolio_operations()) == 80
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""Mini-langage du screener : validation de l’AST et évaluation vectorisée."""
+import numpy as np
+import pandas as pd
+import pytest
+
+import lib
+
+
+@pytest.fixture
+def table():
+    t = pd.DataFrame({c: np.zeros(4) for c in lib.SCREEN_FACTORS if c not in ("decision", "Indices")})
+    t["Ticker"] = ["A", "B", "C", "D"]
+    t["pct_30d"] = [0.10, 0.02, np.nan, 0.06]
+    t["Volatilité"] = [0.01, 0.01, 0.01, 0.50]
+    t["trend_score"] = [3.0, 1.0, 2.0, 4.0]
+    t["decision"] = ["🟢 Acheter", "⚪ Attendre", "🟢 Acheter", "🔴 Vendre"]
+    t["Indices"] = ["CAC 40", "DAX", "CAC 40, DAX", "S&P 500"]
+    return t
+
+
+def tickers(df):
+    return df["Ticker"].tolist()
+
+
+@pytest.mark.parametrize("where, expected", [
+    ("pct_30d > 5%", ["D", "A"]),                                    # 5% = 0.05 ; NaN → faux
+    ("pct_30d > 5% and Volatilité < vol_max", ["A"]),
+    ("not pct_30d > 5%", ["C", "B"]),
+    ("0 < pct_30d <= 6%", ["D", "B"]),
+    ("'DAX' in Indices", ["C", "B"]),
+    ("'DAX' not in Indices and isnan(pct_30d) == False", ["D", "A"]),
+    ("decision == '🟢 Acheter'", ["A", "C"]),
+    ("abs(-pct_30d) > max(pct_30d, 0.05) - 1", ["D", "A", "B"]),
+])
+def test_filtres(table, where, expected):
+    assert tickers(lib.screen(where, rank_by="trend_score", k=0, table=table)) == expected
+
+
+def test_classement_et_top_k(table):
+    res = lib.screen("", rank_by="pct_30d - 2*Volatilité", k=2, table=table)
+    assert tickers(res) == ["A", "B"]
+    assert res["rank_value"].tolist() == pytest.approx([0.08, 0.0])
+    assert tickers(lib.screen("", rank_by="trend_score", k=2, ascending=True, table=table)) == ["B", "C"]
+
+
+@pytest.mark.parametrize("expr", [
+    "__import__('os')", "Close.real > 0", "[Close][0] > 0", "open('x')", "pct_1d > 2**10**10",
+    "pct_1d > 2**Close", "abs()", "min(pct_1d)", "max(pct_1d, 1, 2)", "abs(x=pct_1d)", "pct_1d >",
+])
+def test_parse_rejette(expr):
+    with pytest.raises(ValueError):
+        lib._screen_parse(expr)
+
+
+@pytest.mark.parametrize("where", [
+    "inconnu > 0", "'x' < Close", "-decision > 0", "Indices > 3", "pct_1d > 1e308**2",
+    "decision * 3 != ''", "'x' * 10 == 'x'",
+])
+def test_evaluation_invalide_en_valueerror(table, where):
+    with pytest.raises(ValueError):
+        lib.screen(where, table=table)